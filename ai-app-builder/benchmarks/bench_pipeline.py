@@ -0,0 +1,191 @@
+"""End-to-end benchmark of the HTTP pipeline against the fake LLM.
+
+Drives /analyze, /generate, /analyze-existing and /enhance-app in-process
+(no server, no network, no API key) at several concurrency levels and
+records throughput, latency percentiles, event-loop lag and peak RSS.
+
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --concurrency 1,8,32 --requests 64
+    python benchmarks/bench_pipeline.py --compare benchmarks/results/baseline.json
+
+Results are written as JSON to benchmarks/results/<timestamp>-<commit>.json.
+FAKE_LLM_* variables shape the stand-in model (see llm_providers.FakeProvider).
+"""
+import argparse
+import asyncio
+import json
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from harness import (
+    LoopLagMonitor, load_app, make_client, peak_rss_mb, run_metadata, scenario_prompt, summarize
+)
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+SCENARIOS = ["analyze", "generate", "analyze-existing", "enhance-app"]
+
+
+class Scenario:
+    """Builds the request for one iteration and knows which endpoint it hits"""
+
+    def __init__(self, name: str, path: str, body: Callable[[int, int], Dict[str, Any]]):
+        self.name = name
+        self.path = path
+        self.body = body
+
+
+def build_scenarios(seeds: List[Path]) -> Dict[str, Scenario]:
+    def existing(worker: int, index: int) -> Dict[str, Any]:
+        return {
+            "project_path": str(seeds[worker % len(seeds)]),
+            "enhancement_request": f"Tambahkan endpoint search dan pagination (request {index})",
+            "enhancement_type": "feature",
+        }
+
+    return {
+        "analyze": Scenario("analyze", "/analyze", lambda worker, index: {"prompt": scenario_prompt(index)}),
+        "generate": Scenario("generate", "/generate", lambda worker, index: {
+            "prompt": scenario_prompt(index),
+            "project_name": f"bench_generate_{index}",
+        }),
+        "analyze-existing": Scenario("analyze-existing", "/analyze-existing", existing),
+        "enhance-app": Scenario("enhance-app", "/enhance-app", existing),
+    }
+
+
+async def seed_projects(client, workdir: Path, count: int) -> List[Path]:
+    """Generate one project and copy it so each worker enhances its own tree"""
+    response = await client.post("/generate", json={"prompt": scenario_prompt(0), "project_name": "bench_seed"})
+    response.raise_for_status()
+    source = Path(response.json()["project_path"])
+
+    seeds = []
+    for worker in range(count):
+        target = workdir / "seeds" / f"seed_{worker}"
+        shutil.copytree(source, target, dirs_exist_ok=True)
+        seeds.append(target)
+    return seeds
+
+
+async def run_level(client, scenario: Scenario, concurrency: int, total: int) -> Dict[str, Any]:
+    """Closed loop: ``concurrency`` workers issue ``total`` requests back to back"""
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    counter = iter(range(total))
+
+    async def worker(worker_id: int):
+        for index in counter:
+            started = time.perf_counter()
+            try:
+                response = await client.post(scenario.path, json=scenario.body(worker_id, index))
+                status = response.status_code
+            except Exception as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - started
+
+            if status == 200:
+                latencies.append(elapsed)
+            else:
+                errors[str(status)] = errors.get(str(status), 0) + 1
+
+    monitor = LoopLagMonitor()
+    monitor.start()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    wall = time.perf_counter() - started
+    loop_lag = await monitor.stop()
+
+    return {
+        "scenario": scenario.name,
+        "concurrency": concurrency,
+        "requests": total,
+        "succeeded": len(latencies),
+        "errors": errors,
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 3) if wall else None,
+        "latency_ms": summarize(latencies),
+        "loop_lag_ms": loop_lag,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def print_table(results: List[Dict[str, Any]], baseline: Optional[Dict[str, Any]] = None):
+    previous = {}
+    if baseline:
+        previous = {(r["scenario"], r["concurrency"]): r for r in baseline.get("results", [])}
+
+    header = f"{'scenario':<18}{'conc':>5}{'ok':>6}{'err':>5}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'lag p99':>9}{'rss MB':>8}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        latency = r["latency_ms"]
+        line = (
+            f"{r['scenario']:<18}{r['concurrency']:>5}{r['succeeded']:>6}{sum(r['errors'].values()):>5}"
+            f"{r['throughput_rps'] or 0:>9.2f}{latency['p50'] or 0:>9.0f}{latency['p95'] or 0:>9.0f}"
+            f"{latency['p99'] or 0:>9.0f}{r['loop_lag_ms']['p99'] or 0:>9.1f}{r['peak_rss_mb'] or 0:>8.0f}"
+        )
+        before = previous.get((r["scenario"], r["concurrency"]))
+        if before and before["latency_ms"]["p95"] and latency["p95"]:
+            change = (latency["p95"] - before["latency_ms"]["p95"]) / before["latency_ms"]["p95"] * 100
+            line += f"   p95 {change:+.1f}% vs {baseline['meta'].get('git_commit')}"
+        print(line)
+
+
+async def main(args) -> int:
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        print(f"Unknown scenario(s): {', '.join(sorted(unknown))}")
+        return 2
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench_pipeline_"))
+    service = load_app(workdir / "generated_apps")
+
+    results = []
+    try:
+        async with make_client(service.app) as client:
+            seeds = await seed_projects(client, workdir, max(levels))
+            catalog = build_scenarios(seeds)
+
+            for name in scenarios:
+                for concurrency in levels:
+                    total = max(args.requests, concurrency)
+                    print(f"▶ {name} x{total} at concurrency {concurrency}")
+                    results.append(await run_level(client, catalog[name], concurrency, total))
+    finally:
+        service.llm_client.shutdown()
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {"meta": run_metadata(), "results": results}
+    output = Path(args.output) if args.output else RESULTS_DIR / (
+        f"{time.strftime('%Y%m%d-%H%M%S')}-{report['meta']['git_commit'] or 'nogit'}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    baseline = json.loads(Path(args.compare).read_text(encoding="utf-8")) if args.compare else None
+    print()
+    print_table(results, baseline)
+    print(f"\n📄 Results written to {output}")
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=16, help="requests per scenario and level")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated subset of scenarios")
+    parser.add_argument("--output", help="result file (default: benchmarks/results/<timestamp>-<commit>.json)")
+    parser.add_argument("--compare", help="earlier result file to compare p95 latency against")
+    parser.add_argument("--keep", action="store_true", help="keep the temporary output directory")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
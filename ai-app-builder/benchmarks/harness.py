@@ -0,0 +1,163 @@
+"""Shared helpers for driving the service in-process against a stand-in LLM."""
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+SERVICES_DIR = ROOT_DIR / "services"
+
+# Benchmarks measure the service, not the quota guards or the disk cache
+IN_PROCESS_DEFAULTS = {
+    "LLM_PROVIDER": "fake",
+    "LLM_CACHE_ENABLED": "0",
+    "SETUP_PROJECT_ENVIRONMENT": "0",
+    "GEMINI_RPM": "0",
+    "GEMINI_TPM": "0",
+    "ADMISSION_ANALYZE_QUEUE": "100000",
+    "ADMISSION_GENERATE_QUEUE": "100000",
+    "ADMISSION_ENHANCE_QUEUE": "100000",
+}
+
+
+@contextmanager
+def _working_directory(path: Path):
+    previous = Path.cwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def load_app(output_dir: Path):
+    """Import services/main.py with offline defaults; generated projects go to output_dir.
+
+    Explicitly set environment variables win over the defaults, so e.g.
+    LLM_PROVIDER=cassette replays recorded traffic instead of the fake.
+    """
+    for key, value in IN_PROCESS_DEFAULTS.items():
+        os.environ.setdefault(key, value)
+
+    if str(SERVICES_DIR) not in sys.path:
+        sys.path.insert(0, str(SERVICES_DIR))
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    # AppBuilderService creates ./generated_apps on import
+    with _working_directory(output_dir):
+        import main
+
+    main.builder_service.output_base = output_dir
+    return main
+
+
+def make_client(app, base_url: str = None) -> httpx.AsyncClient:
+    """HTTP client against a live base_url, or against the ASGI app in-process"""
+    if base_url:
+        return httpx.AsyncClient(base_url=base_url, timeout=None)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://in-process", timeout=None)
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def summarize(values: List[float], scale: float = 1000.0) -> Dict[str, Optional[float]]:
+    """p50/p95/p99/mean/max of seconds, reported in milliseconds by default"""
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "mean": None, "max": None}
+    return {
+        "p50": round(percentile(values, 0.50) * scale, 2),
+        "p95": round(percentile(values, 0.95) * scale, 2),
+        "p99": round(percentile(values, 0.99) * scale, 2),
+        "mean": round(sum(values) / len(values) * scale, 2),
+        "max": round(max(values) * scale, 2),
+    }
+
+
+class LoopLagMonitor:
+    """Samples how late the event loop wakes a sleeping task (blocking-call detector)"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - started - self.interval))
+
+    def start(self):
+        self.samples = []
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> Dict[str, Optional[float]]:
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        return summarize(self.samples)
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process so far (None where unsupported)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_metadata() -> Dict[str, Any]:
+    return {
+        "git_commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": sys.platform,
+        "llm_provider": os.getenv("LLM_PROVIDER"),
+        "fake_llm_latency_ms": os.getenv("FAKE_LLM_LATENCY_MS"),
+        "fake_llm_error_rate": os.getenv("FAKE_LLM_ERROR_RATE"),
+    }
+
+
+ENTITIES = [
+    "users", "products", "orders", "categories", "customers", "posts", "comments",
+    "articles", "tags", "invoices", "payments", "suppliers", "reviews", "tickets",
+]
+
+
+def scenario_prompt(index: int) -> str:
+    """Distinct but realistic prompt per request so single-flight does not merge them"""
+    picked = [ENTITIES[(index * 3 + offset) % len(ENTITIES)] for offset in range(3)]
+    database = ["PostgreSQL", "MySQL", "SQLite"][index % 3]
+    return (
+        f"Buatkan backend service dengan FastAPI dengan {database} database, "
+        f"authentication JWT, dan fitur CRUD untuk {', '.join(picked)}. "
+        f"Sertakan juga Redis untuk caching. (request {index})"
+    )
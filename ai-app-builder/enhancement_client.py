@@ -1,14 +1,30 @@
 import requests
 import json
 import os
+import time
 from pathlib import Path
 
+def iter_sse_events(response):
+    """Yield (event, data) pairs from a streaming server-sent events response"""
+    event, data_lines = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if line is None:
+            continue
+        if line == "":
+            if data_lines:
+                yield event, json.loads("\n".join(data_lines))
+            event, data_lines = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data_lines.append(line[len("data:"):].strip())
+
 class AppEnhancer:
     def __init__(self, base_url="http://localhost:8000"):
         self.base_url = base_url
     
-    def analyze_project(self, project_path: str):
-        """Analyze existing project"""
+    def analyze_project(self, project_path: str, mode: str = "slow"):
+        """Analyze existing project (mode="fast" skips the LLM and returns static analysis)"""
         print(f"🔍 Analyzing project: {project_path}")
         
         try:
@@ -16,7 +32,7 @@ class AppEnhancer:
                 "project_path": project_path,
                 "enhancement_request": "analyze",
                 "enhancement_type": "analysis"
-            }, timeout=60)
+            }, params={"mode": mode}, timeout=60)
             
             if response.status_code == 200:
                 result = response.json()
@@ -90,6 +106,73 @@ class AppEnhancer:
             print(f"❌ Error: {e}")
             return None
     
+    def enhance_project_job(self, project_path: str, enhancement_request: str,
+                            enhancement_type: str = "feature", poll_interval: float = 3.0):
+        """Enhance via the job queue: submit, poll with short requests, fetch the result"""
+        print(f"\n🔧 Submitting enhancement job for: {project_path}")
+        
+        try:
+            response = requests.post(f"{self.base_url}/jobs/enhance-app", json={
+                "project_path": project_path,
+                "enhancement_request": enhancement_request,
+                "enhancement_type": enhancement_type
+            }, timeout=30)
+            if response.status_code != 202:
+                print(f"❌ Submission failed: {response.text}")
+                return None
+            
+            job = response.json()
+            job_url = f"{self.base_url}/jobs/{job['job_id']}"
+            print(f"📨 Job {job['job_id']} queued")
+            
+            while job["status"] in ("queued", "running"):
+                time.sleep(poll_interval)
+                job = requests.get(job_url, timeout=30).json()
+                print(f"   ⏳ {job['status']}")
+            
+            result = requests.get(f"{job_url}/result", timeout=30)
+            if result.status_code == 200:
+                print("✅ Enhancement completed!")
+                return result.json()
+            
+            print(f"❌ Enhancement job {job['status']}: {result.text}")
+            return None
+        except Exception as e:
+            print(f"❌ Error: {e}")
+            return None
+    
+    def generate_project_stream(self, prompt: str, project_name: str = None):
+        """Generate a new project via /generate/stream, printing progress as it arrives"""
+        print(f"🚀 Generating project (streaming): {prompt}")
+        
+        try:
+            with requests.post(f"{self.base_url}/generate/stream", json={
+                "prompt": prompt,
+                "project_name": project_name
+            }, stream=True, timeout=(10, 60)) as response:
+                if response.status_code != 200:
+                    print(f"❌ Generation failed: {response.text}")
+                    return None
+                
+                for event, data in iter_sse_events(response):
+                    if event == "analysis":
+                        print(f"🔍 Analysis: {json.dumps(data['analysis'])}")
+                    elif event == "file_started":
+                        print(f"✍️  Generating {data['file']}...")
+                    elif event == "file_written":
+                        print(f"✅ Written: {data['file']} ({data['bytes']} bytes)")
+                    elif event == "environment_setup_queued":
+                        print(f"🔧 Environment setup queued for {data['project_path']}")
+                    elif event == "done":
+                        print(f"📁 Project path: {data['project_path']}")
+                        return data
+                    elif event == "error":
+                        print(f"❌ Generation failed: {data['detail']}")
+                        return None
+        except Exception as e:
+            print(f"❌ Error: {e}")
+        return None
+    
     def list_projects(self):
         """List available projects"""
         try:
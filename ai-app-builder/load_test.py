@@ -0,0 +1,281 @@
+"""Load generator for capacity planning.
+
+Replays the test_client.py scenarios as a weighted mix of analyze, generate,
+enhance and list calls, either against a running server (--url) or against
+the app in-process with the fake LLM (default, no API key needed).
+
+Two modes:
+
+  ramp  closed loop; virtual users each send a request, wait for the answer,
+        think, repeat. Users are stepped up (--users 1,2,4,8,...) and the
+        saturation point is the last step where throughput still grew
+        without breaking the latency/error targets.
+  open  open loop; requests arrive as a Poisson process at each --rates
+        value regardless of how fast the server answers, which shows the
+        queueing a fixed-size client pool would hide.
+
+    python load_test.py
+    python load_test.py --users 1,4,16,64 --step-seconds 60
+    python load_test.py --mode open --rates 0.5,1,2,4 --url http://localhost:8000
+    python load_test.py --mix analyze=5,generate=1,enhance=1,list=3 --output load.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "benchmarks"))
+
+from harness import load_app, make_client, peak_rss_mb, run_metadata, summarize
+from test_client import ANALYSIS_PROMPT, ENHANCEMENT_REQUEST, GENERATION_PROMPT
+
+DEFAULT_MIX = "analyze=4,generate=2,enhance=1,list=3"
+
+
+class StepStats:
+    """Latencies and failures of one load step, per operation"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, Dict[str, int]] = {}
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def record(self, operation: str, status, elapsed: float):
+        if status == 200 or status == 202:
+            self.latencies.setdefault(operation, []).append(elapsed)
+        else:
+            by_status = self.errors.setdefault(operation, {})
+            by_status[str(status)] = by_status.get(str(status), 0) + 1
+
+    def report(self, wall: float, **extra) -> Dict[str, Any]:
+        succeeded = sum(len(values) for values in self.latencies.values())
+        failed = sum(sum(by_status.values()) for by_status in self.errors.values())
+        total = succeeded + failed
+        every = [value for values in self.latencies.values() for value in values]
+        operations = sorted(set(self.latencies) | set(self.errors))
+        return {
+            **extra,
+            "requests": total,
+            "succeeded": succeeded,
+            "error_rate": round(failed / total, 4) if total else 0.0,
+            "throughput_rps": round(succeeded / wall, 3) if wall else 0.0,
+            "latency_ms": summarize(every),
+            "peak_in_flight": self.peak_in_flight,
+            "operations": {
+                name: {
+                    "succeeded": len(self.latencies.get(name, [])),
+                    "errors": self.errors.get(name, {}),
+                    "latency_ms": summarize(self.latencies.get(name, [])),
+                }
+                for name in operations
+            },
+        }
+
+
+class Workload:
+    """Issues one request of a given operation; prompts vary so responses are not shared"""
+
+    def __init__(self, client, mix: Dict[str, int], seed: int = 7):
+        self.client = client
+        self.operations = list(mix)
+        self.weights = [mix[name] for name in self.operations]
+        self.random = random.Random(seed)
+        self.project_path: Optional[str] = None
+        self.sequence = 0
+
+    async def prepare(self):
+        """Generate one project for the enhance operation to work on"""
+        if "enhance" not in self.operations:
+            return
+        response = await self.client.post("/generate", json={
+            "prompt": GENERATION_PROMPT,
+            "project_name": f"load_test_{int(time.time())}"
+        })
+        response.raise_for_status()
+        self.project_path = response.json()["project_path"]
+
+    def pick(self) -> str:
+        return self.random.choices(self.operations, weights=self.weights)[0]
+
+    async def call(self, operation: str) -> int:
+        self.sequence += 1
+        tag = f" (load test request {self.sequence})"
+
+        if operation == "analyze":
+            response = await self.client.post("/analyze", json={"prompt": ANALYSIS_PROMPT + tag})
+        elif operation == "generate":
+            response = await self.client.post("/generate", json={
+                "prompt": GENERATION_PROMPT + tag,
+                "project_name": f"load_test_{self.sequence}"
+            })
+        elif operation == "enhance":
+            response = await self.client.post("/enhance-app", json={
+                "project_path": self.project_path,
+                "enhancement_request": ENHANCEMENT_REQUEST + tag,
+                "enhancement_type": "feature"
+            })
+        elif operation == "list":
+            response = await self.client.get("/projects")
+        else:
+            raise ValueError(f"Unknown operation: {operation}")
+        return response.status_code
+
+    async def timed(self, operation: str, stats: StepStats):
+        stats.in_flight += 1
+        stats.peak_in_flight = max(stats.peak_in_flight, stats.in_flight)
+        started = time.perf_counter()
+        try:
+            status = await self.call(operation)
+        except Exception as e:
+            status = type(e).__name__
+        finally:
+            stats.in_flight -= 1
+        stats.record(operation, status, time.perf_counter() - started)
+
+
+async def closed_loop_step(workload: Workload, users: int, seconds: float, think_time: float) -> Dict[str, Any]:
+    stats = StepStats()
+    stop_at = time.perf_counter() + seconds
+
+    async def virtual_user():
+        while time.perf_counter() < stop_at:
+            await workload.timed(workload.pick(), stats)
+            if think_time:
+                await asyncio.sleep(workload.random.expovariate(1 / think_time))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(virtual_user() for _ in range(users)))
+    return stats.report(time.perf_counter() - started, users=users)
+
+
+async def open_loop_step(workload: Workload, rate: float, seconds: float, max_in_flight: int) -> Dict[str, Any]:
+    stats = StepStats()
+    tasks = []
+    dropped = 0
+    started = time.perf_counter()
+    next_arrival = started
+
+    while True:
+        next_arrival += workload.random.expovariate(rate)
+        if next_arrival - started >= seconds:
+            break
+        await asyncio.sleep(max(0.0, next_arrival - time.perf_counter()))
+        # Past this point the client, not the server, would be the bottleneck
+        if stats.in_flight >= max_in_flight:
+            dropped += 1
+            continue
+        tasks.append(asyncio.ensure_future(workload.timed(workload.pick(), stats)))
+
+    await asyncio.gather(*tasks)
+    return stats.report(time.perf_counter() - started, offered_rps=rate, dropped=dropped)
+
+
+def find_saturation(steps: List[Dict[str, Any]], slo_p95_ms: float, max_error_rate: float,
+                    min_gain: float = 0.1) -> Optional[Dict[str, Any]]:
+    """Last step that met the targets while still adding throughput"""
+    best = None
+    for step in steps:
+        p95 = step["latency_ms"]["p95"]
+        if step["error_rate"] > max_error_rate or (p95 is not None and p95 > slo_p95_ms):
+            break
+        if best is not None and step["throughput_rps"] < best["throughput_rps"] * (1 + min_gain):
+            break
+        best = step
+    return best
+
+
+def print_steps(steps: List[Dict[str, Any]], key: str):
+    header = f"{key:>10}{'reqs':>7}{'rps':>9}{'err %':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'peak':>6}"
+    print(header)
+    print("-" * len(header))
+    for step in steps:
+        latency = step["latency_ms"]
+        print(
+            f"{step[key]:>10}{step['requests']:>7}{step['throughput_rps']:>9.2f}{step['error_rate'] * 100:>8.1f}"
+            f"{latency['p50'] or 0:>9.0f}{latency['p95'] or 0:>9.0f}{latency['p99'] or 0:>9.0f}{step['peak_in_flight']:>6}"
+        )
+
+
+def parse_mix(text: str) -> Dict[str, int]:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = int(weight or 1)
+    unknown = set(mix) - {"analyze", "generate", "enhance", "list"}
+    if unknown:
+        raise SystemExit(f"Unknown operation(s) in --mix: {', '.join(sorted(unknown))}")
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+async def main(args) -> int:
+    mix = parse_mix(args.mix)
+    service = None
+    if not args.url:
+        service = load_app(Path(tempfile.mkdtemp(prefix="load_test_")) / "generated_apps")
+
+    steps = []
+    async with make_client(service.app if service else None, args.url) as client:
+        workload = Workload(client, mix, seed=args.seed)
+        await workload.prepare()
+
+        if args.mode == "ramp":
+            for users in [int(value) for value in args.users.split(",")]:
+                print(f"▶ {users} virtual user(s) for {args.step_seconds}s")
+                steps.append(await closed_loop_step(workload, users, args.step_seconds, args.think_time))
+        else:
+            for rate in [float(value) for value in args.rates.split(",")]:
+                print(f"▶ {rate} req/s offered for {args.step_seconds}s")
+                steps.append(await open_loop_step(workload, rate, args.step_seconds, args.max_in_flight))
+
+    if service:
+        service.llm_client.shutdown()
+
+    key = "users" if args.mode == "ramp" else "offered_rps"
+    saturation = find_saturation(steps, args.slo_p95_ms, args.max_error_rate)
+
+    print()
+    print_steps(steps, key)
+    if saturation:
+        print(f"\n📈 Saturation point: {saturation[key]} {key.replace('_', ' ')} "
+              f"at {saturation['throughput_rps']:.2f} req/s (p95 {saturation['latency_ms']['p95']} ms)")
+    else:
+        print("\n⚠️  The first step already missed the latency/error targets")
+
+    if args.output:
+        report = {
+            "meta": {**run_metadata(), "target": args.url or "in-process", "mode": args.mode, "mix": mix,
+                     "peak_rss_mb": None if args.url else peak_rss_mb()},
+            "targets": {"slo_p95_ms": args.slo_p95_ms, "max_error_rate": args.max_error_rate},
+            "saturation": saturation,
+            "steps": steps,
+        }
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"📄 Report written to {args.output}")
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load generator for the AI App Builder service")
+    parser.add_argument("--url", help="base URL of a running service (default: in-process app with the fake LLM)")
+    parser.add_argument("--mode", choices=["ramp", "open"], default="ramp")
+    parser.add_argument("--users", default="1,2,4,8,16,32", help="ramp mode: virtual users per step")
+    parser.add_argument("--rates", default="0.5,1,2,4,8", help="open mode: offered requests per second per step")
+    parser.add_argument("--step-seconds", type=float, default=30, help="duration of each step")
+    parser.add_argument("--think-time", type=float, default=1.0, help="ramp mode: mean pause between a user's requests")
+    parser.add_argument("--max-in-flight", type=int, default=1000, help="open mode: drop arrivals beyond this")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="operation weights, e.g. " + DEFAULT_MIX)
+    parser.add_argument("--slo-p95-ms", type=float, default=30000, help="p95 latency target for the saturation point")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="error-rate target for the saturation point")
+    parser.add_argument("--seed", type=int, default=7, help="seed for the operation mix and arrival times")
+    parser.add_argument("--output", help="write the full report as JSON")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
@@ -0,0 +1,96 @@
+import asyncio
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict
+
+
+class Overloaded(Exception):
+    """Raised when an endpoint class is saturated; maps to 429 + Retry-After"""
+
+    def __init__(self, name: str, retry_after: int):
+        super().__init__(f"{name} capacity exhausted, retry in {retry_after}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Concurrency limit plus bounded wait queue for one class of endpoints.
+
+    Up to ``max_concurrent`` requests run at once and up to ``max_waiting``
+    more wait for a slot. Anything beyond that is rejected with
+    :class:`Overloaded`, whose ``retry_after`` is estimated from the queue
+    depth and an EWMA of observed request durations.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_waiting: int, initial_duration: float = 30.0):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.avg_duration = initial_duration
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+
+    @classmethod
+    def from_env(cls, name: str, default_concurrent: int, default_waiting: int) -> "AdmissionController":
+        """Read ADMISSION_<NAME>_CONCURRENCY / ADMISSION_<NAME>_QUEUE"""
+        prefix = f"ADMISSION_{name.upper()}"
+        return cls(
+            name,
+            max_concurrent=int(os.getenv(f"{prefix}_CONCURRENCY", str(default_concurrent))),
+            max_waiting=int(os.getenv(f"{prefix}_QUEUE", str(default_waiting))),
+        )
+
+    @property
+    def saturated(self) -> bool:
+        return self.active >= self.max_concurrent and self.waiting >= self.max_waiting
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely to free up for a new arrival"""
+        ahead = max(self.active + self.waiting - self.max_concurrent + 1, 1)
+        return max(1, math.ceil(ahead / self.max_concurrent * self.avg_duration))
+
+    def check(self):
+        """Reject immediately if both the slots and the wait queue are full"""
+        if self.saturated:
+            self.rejected += 1
+            raise Overloaded(self.name, self.retry_after())
+
+    @asynccontextmanager
+    async def slot(self, enforce_queue_limit: bool = True):
+        """Hold one concurrency slot for the duration of the block.
+
+        Already-accepted work (e.g. queued jobs) passes
+        ``enforce_queue_limit=False`` so it waits instead of being rejected.
+        """
+        if enforce_queue_limit:
+            self.check()
+
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.active += 1
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+            # EWMA keeps the Retry-After estimate responsive to recent load
+            self.avg_duration = 0.8 * self.avg_duration + 0.2 * (time.monotonic() - started)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "max_concurrent": self.max_concurrent,
+            "max_waiting": self.max_waiting,
+            "avg_duration_seconds": round(self.avg_duration, 3),
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,202 @@
+"""Compact, ast-based outline of a project for analysis prompts.
+
+An outline keeps what an architecture review needs -- imports, classes and
+their fields, function signatures, decorators (routes), first docstring
+lines and line counts -- at a fraction of the size of the source. Only
+the few "hotspot" files with the most complex or risky code are sent in
+full.
+"""
+import ast
+import threading
+from pathlib import PurePath
+from typing import Dict, List, Optional, Tuple
+
+from rate_limit import estimate_tokens
+
+# Decision points counted by cyclomatic_complexity
+_BRANCHES = (
+    ast.If, ast.For, ast.AsyncFor, ast.While, ast.IfExp, ast.ExceptHandler,
+    ast.With, ast.AsyncWith, ast.Assert, ast.comprehension,
+)
+
+# Calls worth a reviewer's attention even in simple code (plus anything passing shell=...)
+RISKY_CALLS = {"eval", "exec", "system", "popen", "execute", "executescript"}
+
+# Non-Python files at most this long are included verbatim in the outline
+SMALL_FILE_CHARS = 800
+
+# CPython before 3.12 keeps the AST recursion depth in shared state, so parses
+# on concurrent threads can fail with "AST constructor recursion depth mismatch"
+_PARSE_LOCK = threading.Lock()
+
+
+def parse_source(source: str) -> ast.Module:
+    """ast.parse, safe to call from several worker threads at once"""
+    with _PARSE_LOCK:
+        return ast.parse(source)
+
+
+def cyclomatic_complexity(node: ast.AST) -> int:
+    """McCabe complexity of a function (1 + decision points, boolean operators count per operand)"""
+    complexity = 1
+    for child in ast.walk(node):
+        if isinstance(child, _BRANCHES):
+            complexity += 1
+        elif isinstance(child, ast.BoolOp):
+            complexity += len(child.values) - 1
+    return complexity
+
+
+def _first_doc_line(node: ast.AST) -> Optional[str]:
+    doc = ast.get_docstring(node) if isinstance(node, (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)) else None
+    return doc.strip().splitlines()[0][:100] if doc and doc.strip() else None
+
+
+def _short(node: ast.AST, limit: int = 80) -> str:
+    text = ast.unparse(node)
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+
+def _lines(node: ast.AST) -> int:
+    return (getattr(node, "end_lineno", node.lineno) or node.lineno) - node.lineno + 1
+
+
+def _function_outline(node, indent: str) -> List[str]:
+    prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+    returns = f" -> {_short(node.returns, 40)}" if node.returns else ""
+    lines = [f"{indent}@{_short(decorator)}" for decorator in node.decorator_list]
+    summary = f"{indent}{prefix} {node.name}({_short(node.args, 120)}){returns}  # {_lines(node)} lines, complexity {cyclomatic_complexity(node)}"
+    doc = _first_doc_line(node)
+    lines.append(summary + (f' "{doc}"' if doc else ""))
+    return lines
+
+
+def _class_outline(node: ast.ClassDef, indent: str = "") -> List[str]:
+    bases = ", ".join(_short(base, 40) for base in node.bases)
+    lines = [f"{indent}@{_short(decorator)}" for decorator in node.decorator_list]
+    doc = _first_doc_line(node)
+    lines.append(f"{indent}class {node.name}({bases})  # {_lines(node)} lines" + (f' "{doc}"' if doc else ""))
+
+    # Class-level attributes: ORM columns, pydantic fields, __tablename__
+    fields, members = [], []
+    for child in node.body:
+        if isinstance(child, ast.AnnAssign) and isinstance(child.target, ast.Name):
+            fields.append(f"{child.target.id}: {_short(child.annotation, 30)}")
+        elif isinstance(child, ast.Assign):
+            fields.extend(
+                f"{target.id} = {_short(child.value, 50)}"
+                for target in child.targets if isinstance(target, ast.Name)
+            )
+        elif isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            members.extend(_function_outline(child, indent + "    "))
+        elif isinstance(child, ast.ClassDef):
+            members.extend(_class_outline(child, indent + "    "))
+
+    if fields:
+        lines.append(f"{indent}    fields: {'; '.join(fields)}")
+    return lines + members
+
+
+def outline_module(source: str) -> str:
+    """Outline of one Python file; files that do not parse are summarised by size only"""
+    try:
+        tree = parse_source(source)
+    except (SyntaxError, ValueError) as e:
+        return f"(does not parse: {e.__class__.__name__} at line {getattr(e, 'lineno', '?')})"
+
+    lines = []
+    doc = _first_doc_line(tree)
+    if doc:
+        lines.append(f'"{doc}"')
+
+    imports = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            imports.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            module = "." * node.level + (node.module or "")
+            imports.append(f"{module}: {', '.join(alias.name for alias in node.names)}")
+    if imports:
+        lines.append(f"imports: {' | '.join(imports)}")
+
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef):
+            lines.extend(_class_outline(node))
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            lines.extend(_function_outline(node, ""))
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)) and isinstance(node.value, ast.Call):
+            # Module-level wiring such as app = FastAPI(...) or engine = create_engine(...)
+            lines.append(_short(node, 100))
+    return "\n".join(lines)
+
+
+def hotspot_score(source: str) -> int:
+    """How much a file deserves full review: complex functions and risky calls"""
+    try:
+        tree = parse_source(source)
+    except (SyntaxError, ValueError):
+        return 0
+
+    score = 0
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            # Only complexity above a simple CRUD handler counts
+            score += max(0, cyclomatic_complexity(node) - 3)
+        elif isinstance(node, ast.Call):
+            func = node.func
+            name = func.attr if isinstance(func, ast.Attribute) else getattr(func, "id", "")
+            if name in RISKY_CALLS or any(kw.arg == "shell" for kw in node.keywords):
+                score += 5
+    return score
+
+
+def build_outline(files: Dict[str, str], hotspot_tokens: int, max_hotspots: int) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """Return (outline section per file, full source of the hotspot files)"""
+    scores = {name: hotspot_score(code) for name, code in files.items() if name.endswith(".py")}
+    hotspots, used = {}, 0
+    for name in sorted(scores, key=scores.get, reverse=True):
+        if len(hotspots) >= max_hotspots or scores[name] <= 0:
+            break
+        cost = estimate_tokens(files[name])
+        if used + cost <= hotspot_tokens:
+            hotspots[name] = files[name]
+            used += cost
+
+    sections = {}
+    for name, code in sorted(files.items()):
+        header = f"## {name} ({len(code.splitlines())} lines)"
+        if name in hotspots:
+            sections[name] = f"{header} -- hotspot, full source below"
+        elif name.endswith(".py"):
+            sections[name] = f"{header}\n{outline_module(code)}"
+        elif len(code) <= SMALL_FILE_CHARS or PurePath(name).name == "requirements.txt":
+            sections[name] = f"{header}\n{code.strip()}"
+        else:
+            head = "\n".join(code.strip().splitlines()[:10])
+            sections[name] = f"{header} (first 10 lines)\n{head}"
+    return sections, hotspots
+
+
+def chunk_outline(
+    sections: Dict[str, str],
+    hotspots: Dict[str, str],
+    max_tokens: int
+) -> List[Tuple[str, Dict[str, str]]]:
+    """Split the outline into (outline text, hotspot sources) chunks of at most max_tokens.
+
+    Files keep their sorted order so related modules tend to share a chunk;
+    a single file larger than max_tokens gets a chunk of its own. There is
+    always at least one chunk, even for an empty project.
+    """
+    chunks: List[Tuple[List[str], Dict[str, str]]] = []
+    used = max_tokens
+    for name, section in sections.items():
+        cost = estimate_tokens(section) + (estimate_tokens(hotspots[name]) if name in hotspots else 0)
+        if used + cost > max_tokens:
+            chunks.append(([], {}))
+            used = 0
+        chunks[-1][0].append(section)
+        if name in hotspots:
+            chunks[-1][1][name] = hotspots[name]
+        used += cost
+    return [("\n\n".join(outline), sources) for outline, sources in chunks] or [("", {})]
@@ -0,0 +1,129 @@
+"""Pick the project files relevant to an enhancement request.
+
+Files are ranked with BM25 over their contents, their path and the symbol
+names ``ast`` finds in them (classes, functions, route paths, imports),
+with symbols weighted up so "add search to products" finds the file that
+defines ``Product`` rather than every file that mentions it. The best
+matches are then packed greedily into a token budget.
+"""
+import ast
+import math
+import re
+from collections import Counter
+from pathlib import PurePath
+from typing import Dict, Iterable, List, Tuple
+
+from code_outline import parse_source
+from rate_limit import estimate_tokens
+
+_WORD = re.compile(r"[A-Za-z][A-Za-z0-9]*")
+_CAMEL = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z0-9]+|[A-Z]+")
+
+# Entry points included when nothing in the request matches the project
+FALLBACK_FILES = ("main.py", "app.py", "models.py")
+
+# Files scoring below this share of the best match are treated as unrelated
+RELEVANCE_CUTOFF = 0.2
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased words, with snake_case and CamelCase identifiers also split into parts"""
+    terms = []
+    for word in _WORD.findall(text):
+        lower = word.lower()
+        terms.append(lower)
+        parts = [part.lower() for piece in word.split("_") for part in _CAMEL.findall(piece)]
+        if len(parts) > 1:
+            terms.extend(parts)
+    # Crude plural folding so "products" matches "Product"
+    return [term[:-1] if len(term) > 3 and term.endswith("s") and not term.endswith("ss") else term for term in terms]
+
+
+def extract_symbols(source: str) -> List[str]:
+    """Class/function names, decorator arguments (route paths) and imported names"""
+    try:
+        tree = parse_source(source)
+    except (SyntaxError, ValueError):
+        return []
+
+    symbols = []
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+            symbols.append(node.name)
+            for decorator in node.decorator_list:
+                if isinstance(decorator, ast.Call):
+                    symbols.extend(
+                        arg.value for arg in decorator.args
+                        if isinstance(arg, ast.Constant) and isinstance(arg.value, str)
+                    )
+        elif isinstance(node, ast.Import):
+            symbols.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            symbols.extend(alias.name for alias in node.names)
+            if node.module:
+                symbols.append(node.module)
+    return symbols
+
+
+class BM25Index:
+    """Okapi BM25 over a dict of file name -> content"""
+
+    def __init__(self, documents: Dict[str, str], k1: float = 1.5, b: float = 0.75, symbol_weight: int = 3):
+        self.k1 = k1
+        self.b = b
+        self.term_counts: Dict[str, Counter] = {}
+        self.lengths: Dict[str, int] = {}
+
+        for name, content in documents.items():
+            terms = tokenize(content) + tokenize(name) * symbol_weight
+            if name.endswith(".py"):
+                terms += tokenize(" ".join(extract_symbols(content))) * symbol_weight
+            self.term_counts[name] = Counter(terms)
+            self.lengths[name] = len(terms)
+
+        self.average_length = sum(self.lengths.values()) / len(self.lengths) if self.lengths else 0.0
+        document_frequency = Counter(term for counts in self.term_counts.values() for term in counts)
+        total = len(self.term_counts)
+        self.idf = {
+            term: math.log(1 + (total - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in document_frequency.items()
+        }
+
+    def rank(self, query: str) -> List[Tuple[str, float]]:
+        """Documents with a positive score, best first"""
+        query_terms = set(tokenize(query)) & set(self.idf)
+        scores = []
+        for name, counts in self.term_counts.items():
+            norm = self.k1 * (1 - self.b + self.b * self.lengths[name] / (self.average_length or 1))
+            score = sum(
+                self.idf[term] * counts[term] * (self.k1 + 1) / (counts[term] + norm)
+                for term in query_terms if term in counts
+            )
+            if score > 0:
+                scores.append((name, score))
+        return sorted(scores, key=lambda item: item[1], reverse=True)
+
+
+def pack(files: Dict[str, str], ranked: Iterable[str], max_tokens: int) -> Dict[str, str]:
+    """Take files in ranked order while they fit in max_tokens (smaller ones may fill gaps)"""
+    selected, used = {}, 0
+    for name in ranked:
+        cost = estimate_tokens(files[name])
+        if used + cost <= max_tokens:
+            selected[name] = files[name]
+            used += cost
+    return selected
+
+
+def select_context(files: Dict[str, str], query: str, max_tokens: int) -> Tuple[Dict[str, str], List[str]]:
+    """Return (files to show the model, names of the files left out)"""
+    if sum(estimate_tokens(content) for content in files.values()) <= max_tokens:
+        return dict(files), []
+
+    scores = BM25Index(files).rank(query)
+    ranked = [name for name, score in scores if score >= scores[0][1] * RELEVANCE_CUTOFF] if scores else []
+    if not ranked:
+        ranked = [name for name in files if PurePath(name).name in FALLBACK_FILES]
+
+    selected = pack(files, ranked, max_tokens)
+    return selected, sorted(name for name in files if name not in selected)
@@ -0,0 +1,90 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+# A task receives the generated code of the files it depends on
+TaskRunner = Callable[[Dict[str, str]], Awaitable[str]]
+
+# Progress callback: listener(event, task_name, data)
+PipelineListener = Callable[[str, str, Any], None]
+
+
+@dataclass
+class GenerationTask:
+    """One generated file and the files whose code it needs as context"""
+    name: str
+    run: TaskRunner
+    depends_on: Tuple[str, ...] = field(default_factory=tuple)
+
+
+class GenerationPipeline:
+    """Run generation tasks as a DAG.
+
+    Independent tasks run concurrently (bounded by ``max_concurrency``) and a
+    task starts as soon as all of its dependencies have produced their code.
+    An optional ``listener`` is told when each task starts ("file_started")
+    and finishes ("file_completed", with the generated code).
+    """
+
+    def __init__(
+        self,
+        tasks: List[GenerationTask],
+        max_concurrency: int = 6,
+        listener: Optional[PipelineListener] = None
+    ):
+        self.tasks = {task.name: task for task in tasks}
+        self.max_concurrency = max_concurrency
+        self.listener = listener
+        self.order = self._topological_order()
+
+    def _topological_order(self) -> List[str]:
+        """Validate dependencies and return a dependency-first ordering"""
+        for task in self.tasks.values():
+            missing = [dep for dep in task.depends_on if dep not in self.tasks]
+            if missing:
+                raise ValueError(f"Task {task.name} depends on unknown task(s): {', '.join(missing)}")
+
+        order = []
+        state = {}  # name -> "visiting" | "done"
+
+        def visit(name: str, path: List[str]):
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"Dependency cycle: {' -> '.join(path + [name])}")
+            state[name] = "visiting"
+            for dep in self.tasks[name].depends_on:
+                visit(dep, path + [name])
+            state[name] = "done"
+            order.append(name)
+
+        for name in self.tasks:
+            visit(name, [])
+        return order
+
+    async def run(self) -> Dict[str, str]:
+        """Execute every task and return {name: generated code}"""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        futures: Dict[str, asyncio.Future] = {}
+
+        async def execute(task: GenerationTask) -> str:
+            upstream = {dep: await futures[dep] for dep in task.depends_on}
+            async with semaphore:
+                if self.listener:
+                    self.listener("file_started", task.name, None)
+                code = await task.run(upstream)
+            if self.listener:
+                self.listener("file_completed", task.name, code)
+            return code
+
+        for name in self.order:
+            futures[name] = asyncio.ensure_future(execute(self.tasks[name]))
+
+        try:
+            results = await asyncio.gather(*futures.values())
+        except BaseException:
+            for future in futures.values():
+                future.cancel()
+            raise
+
+        return dict(zip(futures.keys(), results))
@@ -0,0 +1,203 @@
+import asyncio
+import contextvars
+import math
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from metrics import BACKGROUND_TASK_SECONDS
+from tracing import current_span, span
+
+JobFactory = Callable[[], Awaitable[Any]]
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+FINISHED_STATUSES = (JobStatus.SUCCEEDED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+
+class JobQueueFull(Exception):
+    """Raised when a job is submitted while the queue is at capacity"""
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    factory: JobFactory = field(repr=False)
+    status: JobStatus = JobStatus.QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Any = None
+    error: Optional[str] = None
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+    cancel_requested: bool = field(default=False, repr=False)
+    submitted_trace_id: Optional[str] = field(default=None, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Public status view (without the result payload)"""
+
+        def iso(timestamp: Optional[float]) -> Optional[str]:
+            return datetime.fromtimestamp(timestamp).isoformat() if timestamp else None
+
+        duration = None
+        if self.started_at:
+            duration = (self.finished_at or time.time()) - self.started_at
+
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status.value,
+            "created_at": iso(self.created_at),
+            "started_at": iso(self.started_at),
+            "finished_at": iso(self.finished_at),
+            "duration_seconds": duration,
+            "error": self.error,
+        }
+
+
+class JobManager:
+    """Bounded worker pool for long-running generation/enhancement jobs.
+
+    Submitted jobs wait in a bounded FIFO queue and ``workers`` of them run at
+    a time. Finished jobs are kept for ``retention_seconds`` so clients can
+    fetch their results.
+    """
+
+    def __init__(self, workers: int = None, max_queue: int = None, retention_seconds: float = None):
+        self.workers = workers or int(os.getenv("JOB_WORKERS", "2"))
+        self.max_queue = max_queue or int(os.getenv("JOB_QUEUE_SIZE", "20"))
+        self.retention_seconds = retention_seconds or float(os.getenv("JOB_RETENTION_SECONDS", "3600"))
+        self.jobs: Dict[str, Job] = {}
+        self.avg_duration = float(os.getenv("JOB_INITIAL_DURATION_SECONDS", "60"))
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_tasks: List[asyncio.Task] = []
+
+    def _ensure_workers(self):
+        # Started lazily so the queue and workers belong to the running loop
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+        if not self._worker_tasks:
+            # Workers outlive the request that starts them; don't inherit its context (trace)
+            self._worker_tasks = [
+                contextvars.Context().run(asyncio.ensure_future, self._worker()) for _ in range(self.workers)
+            ]
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    @property
+    def running(self) -> int:
+        return sum(1 for job in self.jobs.values() if job.status == JobStatus.RUNNING)
+
+    def estimate_wait(self) -> int:
+        """Seconds until a newly submitted job would likely start"""
+        ahead = self.queue_depth + 1
+        return max(1, math.ceil(ahead / self.workers * self.avg_duration))
+
+    def submit(self, kind: str, factory: JobFactory) -> Job:
+        """Queue a job; raises JobQueueFull when the queue is at capacity"""
+        self._ensure_workers()
+        self._prune()
+
+        # Jobs get their own trace; keep a link back to the submitting request
+        submitter = current_span()
+        job = Job(
+            id=uuid.uuid4().hex,
+            kind=kind,
+            factory=factory,
+            submitted_trace_id=submitter.trace_id if submitter else None
+        )
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise JobQueueFull(f"Job queue is full ({self.max_queue} waiting)")
+
+        self.jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancel a queued or running job; finished jobs are left untouched"""
+        job = self.jobs.get(job_id)
+        if job is None or job.finished:
+            return job
+
+        if job.status == JobStatus.QUEUED:
+            # The worker skips cancelled jobs when it dequeues them
+            job.status = JobStatus.CANCELLED
+            job.finished_at = time.time()
+        elif job.task is not None:
+            job.cancel_requested = True
+            job.task.cancel()
+        return job
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                if job.status == JobStatus.CANCELLED:
+                    continue
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job):
+        job.status = JobStatus.RUNNING
+        job.started_at = time.time()
+        with span(f"job:{job.kind}", job_id=job.id, submitted_trace_id=job.submitted_trace_id) as current:
+            job.task = asyncio.ensure_future(job.factory())
+            try:
+                job.result = await job.task
+                job.status = JobStatus.SUCCEEDED
+            except asyncio.CancelledError:
+                job.status = JobStatus.CANCELLED
+                if not job.cancel_requested:
+                    # The worker itself is being cancelled (shutdown)
+                    raise
+            except Exception as e:
+                job.status = JobStatus.FAILED
+                job.error = getattr(e, "detail", None) or str(e)
+            finally:
+                job.finished_at = time.time()
+                job.task = None
+                current.set(status=job.status.value)
+                self.avg_duration = 0.8 * self.avg_duration + 0.2 * (job.finished_at - job.started_at)
+                BACKGROUND_TASK_SECONDS.labels(f"job:{job.kind}", job.status.value).observe(
+                    job.finished_at - job.started_at
+                )
+
+    def _prune(self):
+        """Forget finished jobs older than the retention window"""
+        cutoff = time.time() - self.retention_seconds
+        expired = [
+            job_id for job_id, job in self.jobs.items()
+            if job.finished and job.finished_at and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self.jobs[job_id]
+
+    async def shutdown(self):
+        """Cancel workers and any running jobs"""
+        for worker in self._worker_tasks:
+            worker.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
@@ -0,0 +1,243 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent / ".llm_cache"
+
+
+@dataclass
+class CacheEntry:
+    text: str
+    created: float
+    latency: float  # seconds the original LLM call took
+
+    @property
+    def size(self) -> int:
+        return len(self.text.encode("utf-8"))
+
+
+class LLMCache:
+    """Two-tier (memory LRU + compressed files on disk) cache for LLM responses.
+
+    Entries are content-addressed by a hash of model name, generation config
+    and prompt text. Both tiers honour the same TTL; the disk tier is bounded
+    by total bytes and evicts least recently used files first.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[Path] = None,
+        ttl_seconds: float = None,
+        memory_max_entries: int = None,
+        memory_max_bytes: int = None,
+        disk_max_bytes: int = None,
+        enabled: bool = None,
+    ):
+        self.directory = Path(directory or os.getenv("LLM_CACHE_DIR", DEFAULT_CACHE_DIR))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+        self.memory_max_entries = memory_max_entries or int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "256"))
+        self.memory_max_bytes = memory_max_bytes or int(os.getenv("LLM_CACHE_MEMORY_MB", "32")) * 1024 * 1024
+        self.disk_max_bytes = disk_max_bytes or int(os.getenv("LLM_CACHE_DISK_MB", "256")) * 1024 * 1024
+        self.enabled = enabled if enabled is not None else os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes = 0
+        self._counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "writes": 0,
+            "expired": 0,
+            "memory_evictions": 0,
+            "disk_evictions": 0,
+            "saved_seconds": 0.0,
+        }
+
+        if self.enabled:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._disk_bytes = sum(path.stat().st_size for path in self.directory.glob("*/*.z"))
+
+    @staticmethod
+    def make_key(model_name: str, generation_config: Any, prompt: str) -> str:
+        """Content address for a request"""
+        payload = json.dumps([model_name, generation_config, prompt], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.z"
+
+    def _expired(self, entry: CacheEntry) -> bool:
+        return self.ttl_seconds > 0 and time.time() - entry.created > self.ttl_seconds
+
+    def get_memory(self, key: str) -> Optional[str]:
+        """Memory-tier lookup; cheap enough to call on the event loop"""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            if self._expired(entry):
+                self._memory_bytes -= entry.size
+                del self._memory[key]
+                self._counters["expired"] += 1
+                return None
+            self._memory.move_to_end(key)
+            self._counters["memory_hits"] += 1
+            self._counters["saved_seconds"] += entry.latency
+            return entry.text
+
+    def get(self, key: str) -> Optional[str]:
+        """Memory then disk lookup; disk reads block, so run this in a thread"""
+        if not self.enabled:
+            return None
+
+        text = self.get_memory(key)
+        if text is not None:
+            return text
+
+        path = self._path(key)
+        try:
+            raw = json.loads(zlib.decompress(path.read_bytes()))
+            entry = CacheEntry(raw["text"], raw["created"], raw["latency"])
+        except FileNotFoundError:
+            entry = None
+        except (OSError, ValueError, KeyError, zlib.error) as e:
+            print(f"Error reading cache entry {path.name}: {e}")
+            self._remove_file(path)
+            entry = None
+
+        if entry is not None and self._expired(entry):
+            self._remove_file(path)
+            with self._lock:
+                self._counters["expired"] += 1
+            entry = None
+
+        if entry is None:
+            with self._lock:
+                self._counters["misses"] += 1
+            return None
+
+        # Touch so disk eviction is least-recently-used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        with self._lock:
+            self._counters["disk_hits"] += 1
+            self._counters["saved_seconds"] += entry.latency
+        self._remember(key, entry)
+        return entry.text
+
+    def put(self, key: str, text: str, latency: float = 0.0):
+        """Store a response in both tiers; disk writes block, so run this in a thread"""
+        if not self.enabled:
+            return
+
+        entry = CacheEntry(text, time.time(), latency)
+        self._remember(key, entry)
+
+        data = zlib.compress(json.dumps({
+            "text": entry.text,
+            "created": entry.created,
+            "latency": entry.latency,
+        }).encode("utf-8"))
+
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            previous = path.stat().st_size if path.exists() else 0
+            tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Error writing cache entry {path.name}: {e}")
+            return
+
+        with self._lock:
+            self._disk_bytes += len(data) - previous
+            self._counters["writes"] += 1
+            over_budget = self._disk_bytes > self.disk_max_bytes
+
+        if over_budget:
+            self._evict_disk()
+
+    def _remember(self, key: str, entry: CacheEntry):
+        """Insert into the memory LRU, evicting until both bounds hold"""
+        if entry.size > self.memory_max_bytes:
+            return
+
+        with self._lock:
+            previous = self._memory.pop(key, None)
+            if previous is not None:
+                self._memory_bytes -= previous.size
+            self._memory[key] = entry
+            self._memory_bytes += entry.size
+
+            while self._memory and (
+                len(self._memory) > self.memory_max_entries or self._memory_bytes > self.memory_max_bytes
+            ):
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= evicted.size
+                self._counters["memory_evictions"] += 1
+
+    def _evict_disk(self):
+        """Drop least recently used files until the disk tier is back under 90% of budget"""
+        files = []
+        for path in self.directory.glob("*/*.z"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        files.sort()
+
+        total = sum(size for _, size, _ in files)
+        target = self.disk_max_bytes * 0.9
+        evicted = 0
+        for _, size, path in files:
+            if total <= target:
+                break
+            if self._remove_file(path, count=False):
+                total -= size
+                evicted += 1
+
+        with self._lock:
+            self._disk_bytes = total
+            self._counters["disk_evictions"] += evicted
+
+    def _remove_file(self, path: Path, count: bool = True) -> bool:
+        try:
+            size = path.stat().st_size
+            path.unlink()
+        except OSError:
+            return False
+        if count:
+            with self._lock:
+                self._disk_bytes -= size
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current tier sizes"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats.update({
+                "enabled": self.enabled,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_bytes": self._disk_bytes,
+            })
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
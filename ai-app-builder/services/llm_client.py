@@ -0,0 +1,362 @@
+import asyncio
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from llm_cache import LLMCache
+from llm_providers import LLMProvider
+from metrics import LLM_CALL_SECONDS, LLM_REQUESTS, LLM_TOKENS
+from rate_limit import RateLimiter, estimate_tokens
+from resilience import CircuitBreaker, CircuitOpenError, Hedger, LatencyTracker, RetryPolicy, is_retryable
+from token_budget import UsageLedger
+from tracing import current_span, span
+
+
+class LLMClient:
+    """Async wrapper around a blocking LLM provider (Gemini or a stand-in).
+
+    Provider calls are synchronous network calls, so every request is
+    pushed onto a bounded thread pool to keep the event loop free for other
+    endpoints while generations are in flight. Responses are served from
+    ``cache`` when an identical request was answered before, and identical
+    requests that arrive while one is in flight wait for that same call.
+    Calls that do reach Gemini first pass through the shared RPM/TPM limiter
+    and are retried with backoff (and optionally hedged) on transient errors.
+    A circuit breaker short-circuits calls while the provider is unhealthy.
+    Prompts over the per-request or per-project token budget are rejected
+    with TokenBudgetExceeded before anything is sent.
+    """
+
+    def __init__(
+        self,
+        provider: LLMProvider,
+        max_workers: int = None,
+        cache: Optional[LLMCache] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        usage: Optional[UsageLedger] = None
+    ):
+        self.provider = provider
+        self.model_name = provider.model_name
+        self.max_workers = max_workers or int(os.getenv("LLM_MAX_WORKERS", "8"))
+        self.cache = cache if cache is not None else LLMCache()
+        self.rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter()
+        self.expected_output_tokens = int(os.getenv("LLM_EXPECTED_OUTPUT_TOKENS", "2048"))
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.usage = usage if usage is not None else UsageLedger()
+        self.latency = LatencyTracker()
+        self.hedger = Hedger(self.latency)
+        self.breaker = CircuitBreaker()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._waiters: Dict[asyncio.Future, int] = {}
+        self.coalesced = 0
+        self.rejected_responses = 0
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="llm-worker"
+        )
+        # One per worker thread, held until the thread finishes (even for an
+        # abandoned attempt), so a call holding one starts running immediately
+        self._worker_slots = asyncio.Semaphore(self.max_workers)
+
+    async def generate(
+        self,
+        prompt: str,
+        on_chunk: Optional[Callable[[str], None]] = None,
+        label: str = "unlabeled",
+        validate: Optional[Callable[[str], bool]] = None,
+        **kwargs
+    ) -> str:
+        """Return the response text for prompt, from cache or off the event loop.
+
+        When ``on_chunk`` is given the response is streamed and each text chunk
+        is passed to it on the event loop as it arrives. Cached or coalesced
+        responses are delivered as a single chunk. ``label`` names the caller
+        (e.g. the generator method) in metrics. ``validate`` tells whether the
+        caller can use a response: ones it rejects are returned but never
+        cached, and cached ones it rejects are treated as misses.
+        """
+        with span("llm.generate", label=label, prompt_chars=len(prompt), streamed=on_chunk is not None) as current:
+            # Oversized prompts are refused even if a cached answer exists
+            self.usage.check_prompt(estimate_tokens(prompt))
+            key = self.cache.make_key(self.model_name, kwargs, prompt)
+
+            cached = self.cache.get_memory(key)
+            if cached is not None and (validate is None or validate(cached)):
+                LLM_REQUESTS.labels(label, "memory").inc()
+                self.usage.record_cached()
+                current.set(source="memory", response_chars=len(cached))
+                if on_chunk:
+                    on_chunk(cached)
+                return cached
+
+            # Single-flight: concurrent identical requests share one upstream call
+            inflight = self._inflight.get(key)
+            owner = inflight is None
+            if owner:
+                inflight = asyncio.ensure_future(self._fetch(key, prompt, kwargs, on_chunk, label, validate))
+                self._inflight[key] = inflight
+                inflight.add_done_callback(functools.partial(self._forget_inflight, key))
+            else:
+                self.coalesced += 1
+                LLM_REQUESTS.labels(label, "coalesced").inc()
+                self.usage.record_cached()
+                current.set(source="coalesced")
+
+            # Shield so one cancelled waiter does not cancel the call for the others,
+            # but cancel it once nobody is waiting any more (client gone, job cancelled)
+            self._waiters[inflight] = self._waiters.get(inflight, 0) + 1
+            try:
+                text = await asyncio.shield(inflight)
+            finally:
+                self._waiters[inflight] -= 1
+                if not self._waiters[inflight]:
+                    del self._waiters[inflight]
+                    if not inflight.done():
+                        # Forget it first so a caller arriving now starts a fresh call
+                        # instead of joining one that is being cancelled
+                        if self._inflight.get(key) is inflight:
+                            del self._inflight[key]
+                        inflight.cancel()
+            current.set(response_chars=len(text))
+            if on_chunk and not owner:
+                on_chunk(text)
+            return text
+
+    async def _fetch(
+        self,
+        key: str,
+        prompt: str,
+        kwargs: Dict[str, Any],
+        on_chunk: Optional[Callable[[str], None]] = None,
+        label: str = "unlabeled",
+        validate: Optional[Callable[[str], bool]] = None
+    ) -> str:
+        """Disk cache lookup, then the actual provider call"""
+        loop = asyncio.get_running_loop()
+
+        if self.cache.enabled:
+            cached = await loop.run_in_executor(None, self.cache.get, key)
+            if cached is not None and (validate is None or validate(cached)):
+                LLM_REQUESTS.labels(label, "disk").inc()
+                self.usage.record_cached()
+                current_span().set(source="disk")
+                if on_chunk:
+                    on_chunk(cached)
+                return cached
+
+        LLM_REQUESTS.labels(label, "provider").inc()
+        current_span().set(source="provider")
+        started = time.perf_counter()
+        if on_chunk is None:
+            # Retry transient failures; optionally hedge slow attempts
+            text = await self.retry_policy.run(
+                lambda: self.hedger.run(lambda: self._call_model(prompt, kwargs, label=label))
+            )
+        else:
+            # A streamed attempt can only be retried before any chunk reached the client
+            emitted = []
+
+            def forward(text: str):
+                emitted.append(len(text))
+                on_chunk(text)
+
+            text = await self.retry_policy.run(
+                lambda: self._call_model(prompt, kwargs, forward, label),
+                retry_if=lambda e: not emitted and is_retryable(e)
+            )
+
+        if self.cache.enabled:
+            if validate is not None and not validate(text):
+                # A malformed answer must not be replayed for the whole TTL
+                self.rejected_responses += 1
+                current_span().set(cached=False)
+            else:
+                latency = time.perf_counter() - started
+                await loop.run_in_executor(None, self.cache.put, key, text, latency)
+        return text
+
+    async def _call_model(
+        self,
+        prompt: str,
+        kwargs: Dict[str, Any],
+        on_chunk: Optional[Callable[[str], None]] = None,
+        label: str = "unlabeled"
+    ) -> str:
+        """One rate-limited, time-bounded attempt against the model"""
+        with span("llm.attempt", label=label, model=self.model_name) as current:
+            loop = asyncio.get_running_loop()
+
+            estimated_prompt_tokens = estimate_tokens(prompt)
+            self.usage.check_project(estimated_prompt_tokens)
+
+            # Fail fast (CircuitOpenError) while the provider is known to be unhealthy,
+            # before spending any rate-limit budget
+            probe = self.breaker.before_call()
+
+            # Queue here instead of tripping the provider quota
+            reserved = estimated_prompt_tokens + self.expected_output_tokens
+            queued = time.perf_counter()
+            try:
+                await self.rate_limiter.acquire(reserved)
+            except BaseException:
+                if probe:
+                    self.breaker.abandon()
+                raise
+            current.set(rate_limit_wait_ms=round((time.perf_counter() - queued) * 1000, 3))
+
+            # Wait for a free worker thread before the clock starts, so a saturated
+            # pool is neither provider latency nor an attempt timeout
+            queued = time.perf_counter()
+            try:
+                await self._worker_slots.acquire()
+            except BaseException:
+                self.rate_limiter.release(reserved)
+                if probe:
+                    self.breaker.abandon()
+                raise
+            current.set(worker_wait_ms=round((time.perf_counter() - queued) * 1000, 3))
+
+            try:
+                # The circuit may have opened while this call waited for quota or a worker
+                self.breaker.recheck(probe)
+            except CircuitOpenError:
+                self._worker_slots.release()
+                self.rate_limiter.release(reserved)
+                raise
+
+            # The attempt timeout starts here, when a worker is known to be free
+            started = time.perf_counter()
+            # Set when this attempt is abandoned, so its stream stops producing chunks
+            stop = threading.Event()
+            if on_chunk is None:
+                call = functools.partial(self.provider.generate, prompt, **kwargs)
+            else:
+                call = functools.partial(self._stream_blocking, loop, on_chunk, prompt, kwargs, stop)
+            work = self._executor.submit(self._timed, call)
+            work.add_done_callback(functools.partial(self._release_worker_slot, loop))
+
+            try:
+                # On timeout the worker thread is abandoned, not interrupted
+                result, latency = await asyncio.wait_for(
+                    asyncio.wrap_future(work),
+                    timeout=self.retry_policy.attempt_timeout
+                )
+            except asyncio.CancelledError:
+                stop.set()
+                if probe:
+                    self.breaker.abandon()
+                LLM_CALL_SECONDS.labels(label, self.model_name, "cancelled").observe(time.perf_counter() - started)
+                raise
+            except Exception as e:
+                stop.set()
+                # Only transient errors and timeouts say the provider is unhealthy;
+                # a rejected prompt or a cassette miss does not
+                if is_retryable(e):
+                    self.breaker.record_failure()
+                elif probe:
+                    self.breaker.abandon()
+                outcome = "timeout" if isinstance(e, asyncio.TimeoutError) else "error"
+                LLM_CALL_SECONDS.labels(label, self.model_name, outcome).observe(time.perf_counter() - started)
+                raise
+
+            # Measured on the worker thread: what the provider took, nothing else
+            self.breaker.record_success(latency)
+            LLM_CALL_SECONDS.labels(label, self.model_name, "ok").observe(latency)
+
+            if on_chunk is None:
+                self.latency.record(latency)
+                text, prompt_tokens, output_tokens = result.text, result.prompt_tokens, result.output_tokens
+            else:
+                text, prompt_tokens, output_tokens = result, None, None
+
+            # Providers that do not report usage are counted with the local estimate
+            prompt_tokens = prompt_tokens or estimated_prompt_tokens
+            output_tokens = output_tokens or estimate_tokens(text)
+            LLM_TOKENS.labels(label, self.model_name, "prompt").inc(prompt_tokens)
+            LLM_TOKENS.labels(label, self.model_name, "output").inc(output_tokens)
+            self.usage.record(prompt_tokens, output_tokens)
+            # Give back (or take) the difference from what the limiter reserved
+            self.rate_limiter.adjust(
+                prompt_tokens + output_tokens - estimated_prompt_tokens - self.expected_output_tokens
+            )
+            current.set(prompt_tokens=prompt_tokens, output_tokens=output_tokens, response_chars=len(text))
+            return text
+
+    def _stream_blocking(
+        self,
+        loop,
+        on_chunk: Callable[[str], None],
+        prompt: str,
+        kwargs: Dict[str, Any],
+        stop: threading.Event
+    ) -> str:
+        """Consume a streamed response on a worker thread, forwarding chunks to the loop.
+
+        Once ``stop`` is set (attempt timed out or cancelled) the stream is
+        closed and chunks still queued for the loop are dropped.
+        """
+        parts = []
+        stream = self.provider.stream(prompt, **kwargs)
+        try:
+            for text in stream:
+                if stop.is_set():
+                    break
+                parts.append(text)
+                loop.call_soon_threadsafe(self._forward_chunk, stop, on_chunk, text)
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+        return "".join(parts)
+
+    @staticmethod
+    def _forward_chunk(stop: threading.Event, on_chunk: Callable[[str], None], text: str):
+        if not stop.is_set():
+            on_chunk(text)
+
+    @staticmethod
+    def _timed(call: Callable[[], Any]) -> Tuple[Any, float]:
+        """Run call on the worker thread, returning (result, seconds it took)"""
+        started = time.perf_counter()
+        return call(), time.perf_counter() - started
+
+    def _release_worker_slot(self, loop: asyncio.AbstractEventLoop, work):
+        """Free the worker slot once the thread is done (called on the worker thread)"""
+        try:
+            loop.call_soon_threadsafe(self._worker_slots.release)
+        except RuntimeError:
+            # Loop already closed; nobody is waiting for the slot
+            pass
+
+    def _forget_inflight(self, key: str, future: asyncio.Future):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        # Mark the exception as retrieved in case every waiter was cancelled
+        if not future.cancelled():
+            future.exception()
+
+    def resilience_stats(self) -> Dict[str, Any]:
+        p95 = self.latency.percentile(0.95)
+        return {
+            "retries": self.retry_policy.retries,
+            "hedged": self.hedger.hedged,
+            "hedge_wins": self.hedger.hedge_wins,
+            "hedging_enabled": self.hedger.enabled,
+            "latency_p95_seconds": round(p95, 3) if p95 is not None else None,
+            "circuit": self.breaker.stats(),
+        }
+
+    def cache_stats(self) -> Dict[str, Any]:
+        stats = self.cache.stats()
+        stats["coalesced"] = self.coalesced
+        stats["rejected_responses"] = self.rejected_responses
+        stats["inflight"] = len(self._inflight)
+        return stats
+
+    def shutdown(self):
+        """Release worker threads"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
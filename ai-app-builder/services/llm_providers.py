@@ -0,0 +1,382 @@
+import gzip
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Optional
+
+from google.api_core import exceptions as google_exceptions
+
+from fallback_templates import FALLBACK_TEMPLATES
+
+
+@dataclass
+class LLMResponse:
+    text: str
+    prompt_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+
+
+class LLMProvider(ABC):
+    """Blocking text-generation backend; LLMClient runs it on worker threads"""
+
+    name = "base"
+    model_name = ""
+
+    @abstractmethod
+    def generate(self, prompt: str, **kwargs) -> LLMResponse:
+        """Return the complete response for prompt"""
+
+    @abstractmethod
+    def stream(self, prompt: str, **kwargs) -> Iterator[str]:
+        """Yield response text chunks as they are produced"""
+
+
+class GeminiProvider(LLMProvider):
+    """Google Gemini via google-generativeai"""
+
+    name = "gemini"
+
+    def __init__(self, api_key: str = None, model_name: str = None):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key or os.getenv("GEMINI_API_KEY"))
+        self.model_name = model_name or os.getenv("GEMINI_MODEL", "gemini-1.5-pro")
+        self.model = genai.GenerativeModel(self.model_name)
+
+    def generate(self, prompt: str, **kwargs) -> LLMResponse:
+        response = self.model.generate_content(prompt, **kwargs)
+        # usage_metadata is missing on older google-generativeai releases
+        usage = getattr(response, "usage_metadata", None)
+        return LLMResponse(
+            response.text,
+            prompt_tokens=getattr(usage, "prompt_token_count", None) or None,
+            output_tokens=getattr(usage, "candidates_token_count", None) or None
+        )
+
+    def stream(self, prompt: str, **kwargs) -> Iterator[str]:
+        for chunk in self.model.generate_content(prompt, stream=True, **kwargs):
+            if chunk.text:
+                yield chunk.text
+
+
+class FakeProvider(LLMProvider):
+    """Deterministic offline stand-in for benchmarks and load tests.
+
+    Recognises the prompts used by AppBuilderService/EnhancementService and
+    answers with realistic-size JSON or fenced code (generated from the
+    fallback templates). Latency is a lognormal time-to-first-token plus a
+    fixed output rate; a configurable share of calls raise the same
+    google.api_core errors Gemini does.
+    """
+
+    name = "fake"
+
+    ERROR_TYPES = {
+        "ServiceUnavailable": google_exceptions.ServiceUnavailable,
+        "ResourceExhausted": google_exceptions.ResourceExhausted,
+        "InternalServerError": google_exceptions.InternalServerError,
+        "DeadlineExceeded": google_exceptions.DeadlineExceeded,
+    }
+
+    KNOWN_ENTITIES = [
+        "users", "products", "orders", "categories", "customers", "posts", "comments",
+        "articles", "tags", "items", "invoices", "payments", "suppliers", "inventory",
+        "reviews", "carts", "tasks", "projects", "events", "tickets",
+    ]
+
+    def __init__(
+        self,
+        latency_ms: float = None,
+        latency_sigma: float = None,
+        tokens_per_second: float = None,
+        error_rate: float = None,
+        error_types: List[str] = None,
+        seed: int = None,
+    ):
+        self.model_name = f"fake-{os.getenv('GEMINI_MODEL', 'gemini-1.5-pro')}"
+        self.latency_ms = latency_ms if latency_ms is not None else float(os.getenv("FAKE_LLM_LATENCY_MS", "800"))
+        self.latency_sigma = latency_sigma if latency_sigma is not None else float(os.getenv("FAKE_LLM_LATENCY_SIGMA", "0.3"))
+        self.tokens_per_second = tokens_per_second or float(os.getenv("FAKE_LLM_TOKENS_PER_SECOND", "250"))
+        self.error_rate = error_rate if error_rate is not None else float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))
+        self.error_types = error_types or os.getenv(
+            "FAKE_LLM_ERROR_TYPES", "ServiceUnavailable,ResourceExhausted"
+        ).split(",")
+        self._random = random.Random(seed if seed is not None else int(os.getenv("FAKE_LLM_SEED", "42")))
+        self._lock = threading.Lock()
+
+    def _first_token_delay(self) -> float:
+        with self._lock:
+            factor = self._random.lognormvariate(0, self.latency_sigma) if self.latency_sigma else 1.0
+            fail = self._random.random() < self.error_rate
+            error_name = self._random.choice(self.error_types).strip()
+        if fail:
+            time.sleep(self.latency_ms / 1000 * factor / 2)
+            raise self.ERROR_TYPES.get(error_name, google_exceptions.ServiceUnavailable)(f"fake {error_name}")
+        return self.latency_ms / 1000 * factor
+
+    def generate(self, prompt: str, **kwargs) -> LLMResponse:
+        delay = self._first_token_delay()
+        text = self.respond(prompt)
+        output_tokens = max(1, len(text) // 4)
+        time.sleep(delay + output_tokens / self.tokens_per_second)
+        return LLMResponse(text, prompt_tokens=max(1, len(prompt) // 4), output_tokens=output_tokens)
+
+    def stream(self, prompt: str, **kwargs) -> Iterator[str]:
+        time.sleep(self._first_token_delay())
+        text = self.respond(prompt)
+        chunk_size = 400  # ~100 tokens per chunk
+        for start in range(0, len(text), chunk_size):
+            chunk = text[start:start + chunk_size]
+            time.sleep(len(chunk) / 4 / self.tokens_per_second)
+            yield chunk
+
+    def respond(self, prompt: str) -> str:
+        """Canned response for the prompt families the services send"""
+        if "Permintaan User" in prompt:
+            return json.dumps(self._project_analysis(prompt), indent=2)
+        if '"current_structure"' in prompt:
+            return json.dumps(self._code_analysis(prompt), indent=2)
+        if '"modifications"' in prompt:
+            return json.dumps(self._enhancement(prompt), indent=2)
+
+        # Code prompts are told apart by their first line; later lines may embed other files
+        head = prompt.strip().splitlines()[0] if prompt.strip() else ""
+        analysis = self._analysis_from_generation_prompt(prompt)
+        if "README.md" in head:
+            return FALLBACK_TEMPLATES["README.md"](analysis, "project")
+        for marker, file_name in (
+            ("main.py", "main.py"),
+            ("SQLAlchemy models", "models.py"),
+            ("konfigurasi database", "database.py"),
+            ("Pydantic schemas", "schemas.py"),
+            ("operasi CRUD", "crud.py"),
+        ):
+            if marker in head:
+                return f"```python\n{FALLBACK_TEMPLATES[file_name](analysis, 'project')}```"
+        return "OK"
+
+    def _project_analysis(self, prompt: str) -> dict:
+        lowered = prompt.split("Harap kembalikan")[0].lower()
+        database = "sqlite"
+        for keyword, name in (("postgres", "postgresql"), ("mysql", "mysql"), ("mongo", "mongodb")):
+            if keyword in lowered:
+                database = name
+        features = ["crud", "api"]
+        auth_type = "none"
+        if "jwt" in lowered or "auth" in lowered:
+            features.append("authentication")
+            auth_type = "jwt"
+        external = [service for service in ("redis", "elasticsearch", "s3") if service in lowered]
+        if "redis" in external:
+            features.append("cache")
+        endpoints = [entity for entity in self.KNOWN_ENTITIES if entity in lowered] or ["items"]
+        return {
+            "framework": "fastapi",
+            "database": database,
+            "features": features,
+            "endpoints": endpoints,
+            "auth_type": auth_type,
+            "external_services": external,
+        }
+
+    def _analysis_from_generation_prompt(self, prompt: str) -> SimpleNamespace:
+        match = re.search(r"[Ee]ndpoints(?: yang dibutuhkan| berikut)?: ([^\n]+)", prompt)
+        endpoints = [part.strip() for part in match.group(1).split(",") if part.strip()] if match else ["items"]
+        database = "sqlite"
+        for name in ("postgresql", "mysql", "mongodb"):
+            if name in prompt:
+                database = name
+        return SimpleNamespace(database=database, endpoints=endpoints)
+
+    def _code_analysis(self, prompt: str) -> dict:
+        files = re.findall(r'"([\w./-]+\.py)":', prompt)
+        return {
+            "current_structure": {
+                "files_count": len(set(files)),
+                "main_components": sorted(set(files))[:8] or ["main.py"],
+                "architecture_pattern": "Layered FastAPI (routers, crud, models)",
+                "database_used": "SQLAlchemy",
+            },
+            "identified_issues": [
+                "No input validation on several endpoints",
+                "Database sessions are not closed on error paths",
+                "Missing pagination limits on list endpoints",
+                "Secrets are read from code defaults instead of the environment",
+            ],
+            "improvement_suggestions": [
+                "Add Pydantic validators for request payloads",
+                "Use dependency-injected sessions with try/finally cleanup",
+                "Cap list endpoint page sizes",
+                "Add structured logging and request IDs",
+            ],
+            "complexity_score": 5,
+        }
+
+    def _enhancement(self, prompt: str) -> dict:
+        helpers = "\n\n".join(
+            f'''def validate_{name}(payload: dict) -> dict:
+    """Validate and normalise a {name} payload"""
+    cleaned = {{key: value.strip() if isinstance(value, str) else value for key, value in payload.items()}}
+    if not cleaned.get("name"):
+        raise ValueError("{name}.name is required")
+    return cleaned
+'''
+            for name in ("user", "product", "order", "item", "category", "payment", "review", "comment")
+        )
+        return {
+            "modifications": {},
+            "new_files": {"validators.py": f"from typing import Any, Dict\n\n\n{helpers}"},
+            "changes_summary": "Added payload validators for the main entities.",
+        }
+
+
+class CassetteMiss(LookupError):
+    """Replay found no recording for a request"""
+
+
+class CassetteProvider(LLMProvider):
+    """Record real provider traffic to a gzip JSONL cassette and replay it.
+
+    Modes:
+      - ``record``: forward to ``inner`` and append every exchange.
+      - ``replay``: answer only from the cassette, reproducing the recorded
+        latency (scaled by ``speed``; 0 disables sleeping). Misses raise
+        CassetteMiss.
+      - ``auto``: replay when recorded, otherwise record.
+
+    Requests are matched on a hash of prompt and call options, so prompts
+    must be reproducible (e.g. pass a fixed ``project_name``). Repeated
+    identical requests replay their recordings in order, cycling.
+    """
+
+    name = "cassette"
+
+    def __init__(self, path: Path, mode: str = "replay", inner: Optional[LLMProvider] = None, speed: float = 1.0):
+        if mode not in ("record", "replay", "auto"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        if mode != "replay" and inner is None:
+            raise ValueError(f"Cassette mode {mode} needs an inner provider to record from")
+
+        self.path = Path(path)
+        self.mode = mode
+        self.inner = inner
+        self.speed = speed
+        self.model_name = inner.model_name if inner else f"cassette-{self.path.stem}"
+        self.recordings: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._cursor: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+        if self.path.exists():
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.recordings[entry["key"]].append(entry)
+
+    @staticmethod
+    def request_key(prompt: str, kwargs: Dict[str, Any]) -> str:
+        payload = json.dumps([prompt, kwargs], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entries = self.recordings.get(key)
+            if not entries:
+                return None
+            index = self._cursor[key] % len(entries)
+            self._cursor[key] += 1
+            return entries[index]
+
+    def _append(self, entry: Dict[str, Any]):
+        with self._lock:
+            self.recordings[entry["key"]].append(entry)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # Each append is its own gzip member; gzip.open reads them back as one stream
+            with gzip.open(self.path, "at", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+
+    def _sleep(self, seconds: float):
+        if self.speed > 0 and seconds > 0:
+            time.sleep(seconds * self.speed)
+
+    def generate(self, prompt: str, **kwargs) -> LLMResponse:
+        key = self.request_key(prompt, kwargs)
+        entry = self._lookup(key) if self.mode != "record" else None
+
+        if entry is not None:
+            self._sleep(entry["latency"])
+            return LLMResponse(entry["text"], entry.get("prompt_tokens"), entry.get("output_tokens"))
+        if self.mode == "replay":
+            raise CassetteMiss(f"No recording for request {key[:12]} in {self.path}")
+
+        started = time.perf_counter()
+        response = self.inner.generate(prompt, **kwargs)
+        latency = time.perf_counter() - started
+        self._append({
+            "key": key,
+            "kind": "generate",
+            "text": response.text,
+            "latency": latency,
+            "chunks": [[latency, response.text]],
+            "prompt_tokens": response.prompt_tokens,
+            "output_tokens": response.output_tokens,
+            "recorded_at": time.time(),
+        })
+        return response
+
+    def stream(self, prompt: str, **kwargs) -> Iterator[str]:
+        key = self.request_key(prompt, kwargs)
+        entry = self._lookup(key) if self.mode != "record" else None
+
+        if entry is not None:
+            # Replay each chunk at its recorded offset from the request start
+            elapsed = 0.0
+            for offset, text in entry["chunks"]:
+                self._sleep(offset - elapsed)
+                elapsed = offset
+                yield text
+            return
+        if self.mode == "replay":
+            raise CassetteMiss(f"No recording for request {key[:12]} in {self.path}")
+
+        started = time.perf_counter()
+        chunks = []
+        for text in self.inner.stream(prompt, **kwargs):
+            chunks.append([time.perf_counter() - started, text])
+            yield text
+        self._append({
+            "key": key,
+            "kind": "stream",
+            "text": "".join(text for _, text in chunks),
+            "latency": time.perf_counter() - started,
+            "chunks": chunks,
+            "recorded_at": time.time(),
+        })
+
+
+def create_provider(name: str = None) -> LLMProvider:
+    """Build the provider selected by LLM_PROVIDER (gemini | fake | cassette)"""
+    name = (name or os.getenv("LLM_PROVIDER", "gemini")).lower()
+    if name == "gemini":
+        return GeminiProvider()
+    if name == "fake":
+        return FakeProvider()
+    if name == "cassette":
+        mode = os.getenv("LLM_CASSETTE_MODE", "replay")
+        inner = create_provider(os.getenv("LLM_CASSETTE_INNER", "gemini")) if mode != "replay" else None
+        return CassetteProvider(
+            path=Path(os.getenv("LLM_CASSETTE_PATH", Path(__file__).resolve().parent / "cassettes" / "default.jsonl.gz")),
+            mode=mode,
+            inner=inner,
+            speed=float(os.getenv("LLM_CASSETTE_SPEED", "1.0"))
+        )
+    raise ValueError(f"Unknown LLM_PROVIDER: {name}")
@@ -1,16 +1,38 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
-from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
-import google.generativeai as genai
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, field_validator
+from typing import List, Dict, Any, Optional, Tuple, Callable, Set
 import os
 import platform
 import json
 import asyncio
 from pathlib import Path
 import subprocess
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import ast
 import re
+import time
+import uuid
+
+from admission import AdmissionController, Overloaded
+from code_outline import build_outline, chunk_outline
+from context_selection import select_context
+from fallback_templates import FALLBACK_TEMPLATES, entity_names
+from generation_pipeline import GenerationPipeline, GenerationTask, PipelineListener
+from jobs import Job, JobManager, JobQueueFull, JobStatus
+from llm_client import LLMClient
+from llm_providers import create_provider
+from metrics import BACKGROUND_TASK_SECONDS, HTTP_REQUEST_SECONDS, stage
+import metrics
+from project_snapshot import ProjectSnapshot, SnapshotCache
+from rate_limit import estimate_tokens
+from resilience import CircuitOpenError, is_retryable
+from static_analyzer import analyze_project, prompt_facts
+from token_budget import TokenBudgetExceeded, usage_scope
+from tracing import span
 
 # Load environment variables
 from dotenv import load_dotenv
@@ -18,22 +40,30 @@ load_dotenv()
 
 app = FastAPI(title="AI App Builder Service with Gemini", version="1.0.0")
 
-# Configure Gemini
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-model = genai.GenerativeModel(os.getenv("GEMINI_MODEL", "gemini-1.5-pro"))
-
-class AppRequest(BaseModel):
-    prompt: str
-    project_name: Optional[str] = None
-    output_dir: Optional[str] = "./generated_apps"
+# LLM backend: Gemini by default, LLM_PROVIDER=fake for offline runs
+llm_client = LLMClient(create_provider())
 
 class ProjectAnalysis(BaseModel):
     framework: Optional[str] = None
     database: Optional[str] = None
-    features: Optional[List[str]] = None
-    endpoints: Optional[List[str]] = None
+    features: List[str] = []
+    endpoints: List[str] = []
     auth_type: Optional[str] = None
-    external_services: Optional[List[str]] = None
+    external_services: List[str] = []
+    
+    @field_validator("features", "endpoints", "external_services", mode="before")
+    @classmethod
+    def missing_list_as_empty(cls, value):
+        """Client payloads and LLM answers may send null; generators join these lists"""
+        return [] if value is None else value
+
+class AppRequest(BaseModel):
+    prompt: Optional[str] = None
+    project_name: Optional[str] = None
+    output_dir: Optional[str] = "./generated_apps"
+    # Reuse an earlier /analyze result instead of analyzing the prompt again
+    analysis_id: Optional[str] = None
+    analysis: Optional[ProjectAnalysis] = None
 
 class EnhancementRequest(BaseModel):
     project_path: str
@@ -46,13 +76,76 @@ class CodeAnalysis(BaseModel):
     improvement_suggestions: List[str]
     complexity_score: int
 
+def loads_json_response(response_text: str) -> Any:
+    """Parse a JSON answer from the LLM, tolerating a surrounding ```json fence"""
+    text = response_text.strip()
+    if text.startswith("```json"):
+        text = text[7:-3]
+    elif text.startswith("```"):
+        text = text[3:-3]
+    return json.loads(text)
+
+def json_validator(model: Optional[type] = None) -> Callable[[str], bool]:
+    """LLM cache validator: the response is a JSON object (that fits ``model``, if given)"""
+    def validate(response_text: str) -> bool:
+        try:
+            result = loads_json_response(response_text)
+            if model is not None:
+                model(**result)
+            return isinstance(result, dict)
+        except Exception:
+            return False
+    return validate
+
+class AnalysisStore:
+    """Keeps /analyze results server-side so /generate can skip re-analysis"""
+    
+    def __init__(self, ttl_seconds: float = None, max_entries: int = 1000):
+        self.ttl_seconds = ttl_seconds or float(os.getenv("ANALYSIS_TTL_SECONDS", "3600"))
+        self.max_entries = max_entries
+        self._entries: Dict[str, Tuple[float, ProjectAnalysis]] = {}
+    
+    def save(self, analysis: ProjectAnalysis) -> str:
+        """Store an analysis and return its ID"""
+        self._prune()
+        analysis_id = uuid.uuid4().hex
+        self._entries[analysis_id] = (time.monotonic() + self.ttl_seconds, analysis)
+        return analysis_id
+    
+    def get(self, analysis_id: str) -> Optional[ProjectAnalysis]:
+        """Return the stored analysis, or None if unknown or expired"""
+        entry = self._entries.get(analysis_id)
+        if entry is None:
+            return None
+        
+        expires_at, analysis = entry
+        if expires_at < time.monotonic():
+            del self._entries[analysis_id]
+            return None
+        return analysis
+    
+    def _prune(self):
+        """Drop expired entries, then the oldest ones if still over capacity"""
+        now = time.monotonic()
+        for analysis_id in [key for key, (expires_at, _) in self._entries.items() if expires_at < now]:
+            del self._entries[analysis_id]
+        
+        while len(self._entries) >= self.max_entries:
+            del self._entries[next(iter(self._entries))]
+
 class AppBuilderService:
     def __init__(self):
         self.output_base = Path("./generated_apps")
         self.output_base.mkdir(exist_ok=True)
+        self.generation_concurrency = int(os.getenv("GENERATION_CONCURRENCY", "6"))
         
-    async def analyze_prompt(self, prompt: str) -> ProjectAnalysis:
-        """Analyze user prompt using Gemini AI"""
+    async def analyze_prompt(self, prompt: str, degraded: Optional[Set[str]] = None) -> ProjectAnalysis:
+        """Analyze user prompt using Gemini AI
+        
+        Raises 503 while the LLM is unavailable: there is no template that
+        matches an arbitrary prompt. An unusable answer falls back to a generic
+        analysis and adds "analysis" to ``degraded``.
+        """
         
         analysis_prompt = f"""
         Analisis permintaan pengembangan berikut dan ekstrak informasi terstruktur:
@@ -74,22 +167,31 @@ class AppBuilderService:
         """
         
         try:
-            response = model.generate_content(analysis_prompt)
-            
-            # Clean response text
-            response_text = response.text.strip()
-            
-            # Remove markdown code blocks if present
-            if response_text.startswith("```json"):
-                response_text = response_text[7:-3]
-            elif response_text.startswith("```"):
-                response_text = response_text[3:-3]
-            
-            result = json.loads(response_text)
-            return ProjectAnalysis(**result)
+            with stage("analyze_prompt"), span("analyze_prompt", prompt_chars=len(analysis_prompt)) as current:
+                response_text = await llm_client.generate(
+                    analysis_prompt,
+                    label="analyze_prompt",
+                    validate=json_validator(ProjectAnalysis)
+                )
+                current.set(response_chars=len(response_text))
+                
+                with span("parse_json"):
+                    result = loads_json_response(response_text)
+                    return ProjectAnalysis(**result)
             
+        except TokenBudgetExceeded:
+            raise
         except Exception as e:
+            if isinstance(e, CircuitOpenError) or is_retryable(e):
+                print(f"⚠️  LLM unavailable, cannot analyze prompt: {type(e).__name__}")
+                raise HTTPException(
+                    status_code=503,
+                    detail=f"LLM unavailable, prompt could not be analyzed: {type(e).__name__}",
+                    headers={"Retry-After": str(llm_client.breaker.retry_after())}
+                )
             print(f"Error analyzing prompt: {e}")
+            if degraded is not None:
+                degraded.add("analysis")
             # Fallback analysis
             return ProjectAnalysis(
                 framework="fastapi",
@@ -100,52 +202,159 @@ class AppBuilderService:
                 external_services=[]
             )
     
-    async def generate_project_structure(self, analysis: ProjectAnalysis, project_name: str) -> Dict[str, str]:
+    async def generate_project_structure(
+        self,
+        analysis: ProjectAnalysis,
+        project_name: str,
+        listener: Optional[PipelineListener] = None,
+        degraded: Optional[Set[str]] = None
+    ) -> Dict[str, str]:
         """Generate complete project structure and code"""
         
-        if analysis.framework == "fastapi":
-            return await self.generate_fastapi_project(analysis, project_name)
-        elif analysis.framework == "flask":
-            return await self.generate_flask_project(analysis, project_name)
-        else:
-            raise HTTPException(status_code=400, detail=f"Framework {analysis.framework} belum didukung")
+        with stage("generate_project"), span("generate_project", project_name=project_name, framework=analysis.framework):
+            if analysis.framework == "fastapi":
+                return await self.generate_fastapi_project(analysis, project_name, listener, degraded)
+            elif analysis.framework == "flask":
+                return await self.generate_flask_project(analysis, project_name)
+            else:
+                raise HTTPException(status_code=400, detail=f"Framework {analysis.framework} belum didukung")
     
-    async def generate_fastapi_project(self, analysis: ProjectAnalysis, project_name: str) -> Dict[str, str]:
-        """Generate FastAPI project structure"""
-        
-        files = {}
-        
-        # Generate main application
-        files["main.py"] = await self.generate_fastapi_main(analysis, project_name)
-        
-        # Generate models
-        files["models.py"] = await self.generate_models(analysis)
+    def _build_fastapi_tasks(
+        self,
+        analysis: ProjectAnalysis,
+        project_name: str,
+        listener: Optional[PipelineListener] = None,
+        degraded: Optional[Set[str]] = None
+    ) -> List[GenerationTask]:
+        """Declare the LLM-generated files and the upstream code each one needs"""
+        
+        # file name -> (dependencies, generator(context, on_chunk))
+        # database, models and schemas share naming conventions instead of waiting on each other,
+        # so the critical path is three LLM calls deep: models/schemas -> crud -> main
+        generators = {
+            "database.py": ((), lambda ctx, on_chunk: self.generate_database_config(analysis, on_chunk=on_chunk)),
+            "models.py": ((), lambda ctx, on_chunk: self.generate_models(analysis, ctx, on_chunk=on_chunk)),
+            "schemas.py": ((), lambda ctx, on_chunk: self.generate_schemas(analysis, ctx, on_chunk=on_chunk)),
+            "crud.py": (("models.py", "schemas.py"), lambda ctx, on_chunk: self.generate_crud(analysis, ctx, on_chunk=on_chunk)),
+            "main.py": (
+                ("database.py", "schemas.py", "crud.py"),
+                lambda ctx, on_chunk: self.generate_fastapi_main(analysis, project_name, ctx, on_chunk=on_chunk)
+            ),
+            "README.md": ((), lambda ctx, on_chunk: self.generate_readme(analysis, project_name, on_chunk=on_chunk)),
+        }
         
-        # Generate database configuration
-        files["database.py"] = await self.generate_database_config(analysis)
+        def make_task(file_name: str, depends_on: Tuple[str, ...], generate) -> GenerationTask:
+            on_chunk = None
+            if listener is not None:
+                # Forward streamed text to the listener as "file_chunk" events
+                on_chunk = lambda text: listener("file_chunk", file_name, text)
+            
+            async def run(context: Dict[str, str]) -> str:
+                with span("generate_file", file=file_name, context_files=sorted(context)) as current:
+                    try:
+                        with stage(f"generate_file:{file_name}"):
+                            code = await generate(context, on_chunk)
+                    except Exception as e:
+                        # Provider down or circuit open: fall back to a deterministic template
+                        if not (isinstance(e, CircuitOpenError) or is_retryable(e)):
+                            raise
+                        print(f"⚠️  Using fallback template for {file_name}: {type(e).__name__}")
+                        if degraded is not None:
+                            degraded.add(file_name)
+                        if listener is not None:
+                            listener("file_degraded", file_name, str(e))
+                        current.set(degraded=True, reason=type(e).__name__)
+                        code = FALLBACK_TEMPLATES[file_name](analysis, project_name)
+                    
+                    current.set(response_chars=len(code))
+                    return code
+            
+            return GenerationTask(file_name, run, depends_on)
         
-        # Generate schemas
-        files["schemas.py"] = await self.generate_schemas(analysis)
+        return [make_task(name, deps, generate) for name, (deps, generate) in generators.items()]
+    
+    async def generate_fastapi_project(
+        self,
+        analysis: ProjectAnalysis,
+        project_name: str,
+        listener: Optional[PipelineListener] = None,
+        degraded: Optional[Set[str]] = None
+    ) -> Dict[str, str]:
+        """Generate FastAPI project structure
+        
+        Files that fell back to templates are added to ``degraded``.
+        """
         
-        # Generate CRUD operations
-        files["crud.py"] = await self.generate_crud(analysis)
+        files = {}
         
-        # Generate requirements
+        # Deterministic files first (microseconds): if one of them fails, no LLM call is left running
         files["requirements.txt"] = self.generate_requirements(analysis)
-        
-        # Generate Docker files
         files["Dockerfile"] = self.generate_dockerfile(analysis)
         files["docker-compose.yml"] = self.generate_docker_compose(analysis, project_name)
-        
-        # Generate environment file
         files[".env.example"] = self.generate_env_template(analysis)
         
-        # Generate README
-        files["README.md"] = await self.generate_readme(analysis, project_name)
+        if listener:
+            for file_name, content in files.items():
+                listener("file_completed", file_name, content)
         
+        # Dependent files get upstream code as context; independent ones run in parallel
+        pipeline = GenerationPipeline(
+            self._build_fastapi_tasks(analysis, project_name, listener, degraded),
+            max_concurrency=self.generation_concurrency,
+            listener=listener
+        )
+        files.update(await pipeline.run())
         return files
     
-    async def generate_fastapi_main(self, analysis: ProjectAnalysis, project_name: str) -> str:
+    def _strip_code_fences(self, response_text: str) -> str:
+        """Remove a surrounding ```python / ``` fence from a code response"""
+        with span("strip_fences", response_chars=len(response_text)) as current:
+            code = response_text.strip()
+            if code.startswith("```python"):
+                code = code[9:-3]
+            elif code.startswith("```"):
+                code = code[3:-3]
+            
+            current.set(code_chars=len(code))
+            return code
+    
+    def _naming_conventions(self, analysis: ProjectAnalysis) -> str:
+        """Names shared by files generated in parallel, so they agree without seeing each other"""
+        entities = entity_names(analysis.endpoints)
+        models = ", ".join(f'{class_name} (tabel "{table}")' for class_name, table, _ in entities)
+        schemas = ", ".join(
+            f"{class_name}Base, {class_name}Create, {class_name}Update, {class_name}Response"
+            for class_name, _, _ in entities
+        )
+        return f"""
+        Konvensi nama untuk semua file project (ikuti persis):
+        - database.py mendefinisikan engine, SessionLocal, Base dan get_db()
+        - models.py memakai `from database import Base` dengan class: {models};
+          setiap model punya id (primary key), created_at dan updated_at
+        - schemas.py (Pydantic v2) berisi: {schemas};
+          field schema sama dengan kolom model, Response memakai model_config = ConfigDict(from_attributes=True)
+        """
+    
+    def _format_context(self, context: Optional[Dict[str, str]]) -> str:
+        """Render upstream generated files for inclusion in a prompt"""
+        if not context:
+            return ""
+        
+        sections = "\n\n".join(f"# --- {name} ---\n{code}" for name, code in context.items())
+        return f"""
+        Kode berikut sudah dibuat untuk project ini. Gunakan nama class, field,
+        fungsi, dan import yang sama persis agar semua file konsisten:
+        
+{sections}
+        """
+    
+    async def generate_fastapi_main(
+        self,
+        analysis: ProjectAnalysis,
+        project_name: str,
+        context: Optional[Dict[str, str]] = None,
+        on_chunk: Optional[Callable[[str], None]] = None
+    ) -> str:
         """Generate main FastAPI application file using Gemini"""
         
         prompt = f"""
@@ -167,23 +376,21 @@ class AppBuilderService:
         - Authentication middleware jika diperlukan
         - Startup dan shutdown events yang tepat
         - Documentation yang baik
-        
+        {self._format_context(context)}
         Kembalikan hanya kode Python, tanpa penjelasan.
         Pastikan kode dapat langsung dijalankan.
         """
         
-        response = model.generate_content(prompt)
-        
-        # Clean code blocks
-        code = response.text.strip()
-        if code.startswith("```python"):
-            code = code[9:-3]
-        elif code.startswith("```"):
-            code = code[3:-3]
+        response_text = await llm_client.generate(prompt, on_chunk=on_chunk, label="generate_fastapi_main")
         
-        return code
+        return self._strip_code_fences(response_text)
     
-    async def generate_models(self, analysis: ProjectAnalysis) -> str:
+    async def generate_models(
+        self,
+        analysis: ProjectAnalysis,
+        context: Optional[Dict[str, str]] = None,
+        on_chunk: Optional[Callable[[str], None]] = None
+    ) -> str:
         """Generate SQLAlchemy models using Gemini"""
         
         prompt = f"""
@@ -197,20 +404,19 @@ class AppBuilderService:
         - Field types yang tepat
         - Created/updated timestamps
         - Primary keys dan foreign keys
-        
+        {self._naming_conventions(analysis)}
+        {self._format_context(context)}
         Kembalikan hanya kode Python.
         """
         
-        response = model.generate_content(prompt)
-        code = response.text.strip()
-        if code.startswith("```python"):
-            code = code[9:-3]
-        elif code.startswith("```"):
-            code = code[3:-3]
-        
-        return code
+        response_text = await llm_client.generate(prompt, on_chunk=on_chunk, label="generate_models")
+        return self._strip_code_fences(response_text)
     
-    async def generate_database_config(self, analysis: ProjectAnalysis) -> str:
+    async def generate_database_config(
+        self,
+        analysis: ProjectAnalysis,
+        on_chunk: Optional[Callable[[str], None]] = None
+    ) -> str:
         """Generate database configuration"""
         
         prompt = f"""
@@ -222,20 +428,19 @@ class AppBuilderService:
         - Engine configuration
         - Base class untuk models
         - Connection pooling yang optimal
-        
+        {self._naming_conventions(analysis)}
         Kembalikan hanya kode Python.
         """
         
-        response = model.generate_content(prompt)
-        code = response.text.strip()
-        if code.startswith("```python"):
-            code = code[9:-3]
-        elif code.startswith("```"):
-            code = code[3:-3]
-        
-        return code
+        response_text = await llm_client.generate(prompt, on_chunk=on_chunk, label="generate_database_config")
+        return self._strip_code_fences(response_text)
     
-    async def generate_schemas(self, analysis: ProjectAnalysis) -> str:
+    async def generate_schemas(
+        self,
+        analysis: ProjectAnalysis,
+        context: Optional[Dict[str, str]] = None,
+        on_chunk: Optional[Callable[[str], None]] = None
+    ) -> str:
         """Generate Pydantic schemas"""
         
         prompt = f"""
@@ -247,20 +452,20 @@ class AppBuilderService:
         - Update schemas
         - Response schemas
         - Validation yang tepat
-        
+        {self._naming_conventions(analysis)}
+        {self._format_context(context)}
         Kembalikan hanya kode Python.
         """
         
-        response = model.generate_content(prompt)
-        code = response.text.strip()
-        if code.startswith("```python"):
-            code = code[9:-3]
-        elif code.startswith("```"):
-            code = code[3:-3]
-        
-        return code
+        response_text = await llm_client.generate(prompt, on_chunk=on_chunk, label="generate_schemas")
+        return self._strip_code_fences(response_text)
     
-    async def generate_crud(self, analysis: ProjectAnalysis) -> str:
+    async def generate_crud(
+        self,
+        analysis: ProjectAnalysis,
+        context: Optional[Dict[str, str]] = None,
+        on_chunk: Optional[Callable[[str], None]] = None
+    ) -> str:
         """Generate CRUD operations"""
         
         prompt = f"""
@@ -272,20 +477,19 @@ class AppBuilderService:
         - Query optimizations
         - Error handling
         - Pagination untuk list operations
-        
+        {self._format_context(context)}
         Kembalikan hanya kode Python.
         """
         
-        response = model.generate_content(prompt)
-        code = response.text.strip()
-        if code.startswith("```python"):
-            code = code[9:-3]
-        elif code.startswith("```"):
-            code = code[3:-3]
-        
-        return code
+        response_text = await llm_client.generate(prompt, on_chunk=on_chunk, label="generate_crud")
+        return self._strip_code_fences(response_text)
     
-    async def generate_readme(self, analysis: ProjectAnalysis, project_name: str) -> str:
+    async def generate_readme(
+        self,
+        analysis: ProjectAnalysis,
+        project_name: str,
+        on_chunk: Optional[Callable[[str], None]] = None
+    ) -> str:
         """Generate README.md"""
         
         prompt = f"""
@@ -304,8 +508,8 @@ class AppBuilderService:
         Format dalam Markdown.
         """
         
-        response = model.generate_content(prompt)
-        return response.text.strip()
+        response_text = await llm_client.generate(prompt, on_chunk=on_chunk, label="generate_readme")
+        return response_text.strip()
     
     def generate_requirements(self, analysis: ProjectAnalysis) -> str:
         """Generate requirements.txt based on analysis"""
@@ -416,22 +620,143 @@ services:
 
 class EnhancementService:
     def __init__(self):
-        self.model = model  # Use the same Gemini model
+        self.llm = llm_client  # Share the same non-blocking Gemini client
+        # Token budget for the project files shown in an enhancement prompt
+        self.context_tokens = int(os.getenv("ENHANCEMENT_CONTEXT_TOKENS", "12000"))
+        # Analysis prompts get an outline of every file and full source of a few hotspots
+        self.hotspot_files = int(os.getenv("ANALYSIS_HOTSPOT_FILES", "3"))
+        self.hotspot_tokens = int(os.getenv("ANALYSIS_HOTSPOT_TOKENS", "6000"))
+        # Bigger projects are analyzed in parallel chunks of this many tokens and merged
+        self.chunk_tokens = int(os.getenv("ANALYSIS_CHUNK_TOKENS", "24000"))
+        self.chunk_concurrency = int(os.getenv("ANALYSIS_CHUNK_CONCURRENCY", "4"))
+        self.snapshots = SnapshotCache()
+        # File reads, ast parsing and context scoring grow with the project; they run
+        # here so a large project does not stall the event loop for every other request
+        self._executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv("PROJECT_ANALYSIS_CONCURRENCY", "2")),
+            thread_name_prefix="project-analysis"
+        )
+    
+    async def _offload(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run blocking project work on the analysis pool, keeping the usage/trace context"""
+        loop = asyncio.get_running_loop()
+        call = functools.partial(fn, *args)
+        return await loop.run_in_executor(self._executor, contextvars.copy_context().run, call)
+    
+    def _outline_chunks(self, project_files: Dict[str, str]) -> Tuple[Dict[str, str], Dict[str, str], List[Tuple[str, Dict[str, str]]]]:
+        """(outline sections, hotspot sources, prompt-sized chunks) for a project"""
+        sections, hotspots = build_outline(project_files, self.hotspot_tokens, self.hotspot_files)
+        return sections, hotspots, chunk_outline(sections, hotspots, self.chunk_tokens)
     
-    async def analyze_existing_code(self, project_path: str) -> CodeAnalysis:
-        """Analyze existing codebase for improvement opportunities"""
+    async def analyze_existing_code(
+        self,
+        project_path: str,
+        snapshot: Optional[ProjectSnapshot] = None,
+        report: Optional[Dict[str, Any]] = None
+    ) -> CodeAnalysis:
+        """Analyze existing codebase for improvement opportunities
+        
+        ``report`` receives how the analysis was produced: "source" is "llm"
+        (every chunk analyzed), "partial" (some chunks failed) or "static"
+        (every chunk failed; ast-only fallback), plus "chunks" and "failed_chunks".
+        """
         
-        project_files = self._read_project_files(project_path)
+        project_files = (await self.snapshot(project_path, snapshot)).files
         
-        analysis_prompt = f"""
-        Analisis kode Python berikut untuk improvement:
+        # Deterministic facts go into the prompt and stand in if the model fails
+        with stage("static_analysis"), span("static_analysis"):
+            static = await self._offload(analyze_project, project_files)
+            facts = prompt_facts(static)
+        
+        with stage("outline_project"), span("outline_project") as current:
+            sections, hotspots, chunks = await self._offload(self._outline_chunks, project_files)
+            current.set(
+                outline_chars=sum(len(section) for section in sections.values()),
+                hotspots=sorted(hotspots),
+                chunks=len(chunks)
+            )
+        
+        if len(chunks) == 1:
+            outline, chunk_hotspots = chunks[0]
+            analysis = await self._analyze_chunk(self._analysis_prompt(outline, chunk_hotspots, facts))
+            failed = int(analysis is None)
+        else:
+            # Map: analyze chunks concurrently; reduce: merge into one analysis
+            slots = asyncio.Semaphore(self.chunk_concurrency)
+            
+            async def analyze_part(index: int, outline: str, chunk_hotspots: Dict[str, str]) -> Optional[CodeAnalysis]:
+                async with slots:
+                    prompt = self._analysis_prompt(outline, chunk_hotspots, facts, (index + 1, len(chunks)))
+                    return await self._analyze_chunk(prompt, part=index + 1)
+            
+            with stage("analyze_chunks"), span("analyze_chunks", chunks=len(chunks)) as current:
+                parts = await asyncio.gather(*(
+                    analyze_part(index, outline, chunk_hotspots)
+                    for index, (outline, chunk_hotspots) in enumerate(chunks)
+                ))
+                weights = [
+                    estimate_tokens(outline) + sum(estimate_tokens(code) for code in chunk_hotspots.values())
+                    for outline, chunk_hotspots in chunks
+                ]
+                analysis = self._merge_analyses(
+                    [(part, weight) for part, weight in zip(parts, weights) if part is not None],
+                    len(project_files)
+                )
+                failed = sum(part is None for part in parts)
+                current.set(failed=failed)
+        
+        if report is not None:
+            report.update({
+                "source": "static" if analysis is None else ("partial" if failed else "llm"),
+                "chunks": len(chunks),
+                "failed_chunks": failed
+            })
+        
+        if analysis is not None:
+            return analysis
+        
+        return CodeAnalysis(**static)
+    
+    async def analyze_static(self, project_path: str, snapshot: Optional[ProjectSnapshot] = None) -> CodeAnalysis:
+        """Analysis from ast alone (no LLM call); backs /analyze-existing?mode=fast"""
+        
+        project_files = (await self.snapshot(project_path, snapshot)).files
+        
+        with stage("static_analysis"), span("static_analysis"):
+            return CodeAnalysis(**await self._offload(analyze_project, project_files))
+    
+    def _analysis_prompt(
+        self,
+        outline: str,
+        hotspots: Dict[str, str],
+        facts: Dict[str, Any],
+        part: Optional[Tuple[int, int]] = None
+    ) -> str:
+        scope = (
+            f"Ini bagian {part[0]} dari {part[1]} project yang sama; analisis hanya file di bagian ini."
+            if part else ""
+        )
+        return f"""
+        Analisis kode Python berikut untuk improvement. {scope}
+        
+        Outline semua file (dibuat dari ast: import, class dan field, signature fungsi,
+        decorator/route, baris pertama docstring, jumlah baris dan complexity):
+        
+{outline}
+        
+        Kode lengkap file hotspot (fungsi paling kompleks atau pemanggilan berisiko):
         
-        {json.dumps(project_files, indent=2)}
+        {json.dumps(hotspots, indent=2)}
+        
+        Fakta dari analisis statis (sudah pasti benar; gunakan untuk current_structure,
+        issue statis boleh diperjelas tapi jangan diulang apa adanya):
+        
+        {json.dumps(facts, indent=2)}
         
         Berikan analisis dalam format JSON:
         {{
             "current_structure": {{
-                "files_count": {len(project_files)},
+                "files_count": {facts["files_count"]},
                 "main_components": ["list komponen utama"],
                 "architecture_pattern": "string",
                 "database_used": "string"
@@ -450,36 +775,104 @@ class EnhancementService:
         
         Hanya kembalikan JSON, tanpa penjelasan.
         """
-        
+    
+    async def _analyze_chunk(self, analysis_prompt: str, part: Optional[int] = None) -> Optional[CodeAnalysis]:
+        """One analysis call; None if the model fails or returns unusable JSON"""
         try:
-            response = self.model.generate_content(analysis_prompt)
-            result = self._clean_json_response(response.text)
-            return CodeAnalysis(**result)
+            with stage("analyze_existing_code"), span("analyze_existing_code", prompt_chars=len(analysis_prompt), part=part) as current:
+                response_text = await self.llm.generate(
+                    analysis_prompt,
+                    label="analyze_existing_code" if part is None else "analyze_existing_code_chunk",
+                    validate=json_validator(CodeAnalysis)
+                )
+                current.set(response_chars=len(response_text))
+                result = self._clean_json_response(response_text)
+                return CodeAnalysis(**result)
+        except TokenBudgetExceeded:
+            raise
         except Exception as e:
-            # Fallback analysis
-            return CodeAnalysis(
-                current_structure={
-                    "files_count": len(project_files),
-                    "main_components": ["main.py", "models.py"],
-                    "architecture_pattern": "FastAPI MVC",
-                    "database_used": "SQLite"
-                },
-                identified_issues=["No specific issues found"],
-                improvement_suggestions=["Add error handling", "Add logging"],
-                complexity_score=5
-            )
+            print(f"⚠️ Analysis{f' of part {part}' if part else ''} failed: {e}")
+            return None
     
-    async def generate_enhancement(self, project_path: str, enhancement_request: str, analysis: CodeAnalysis) -> Dict[str, Any]:
+    @staticmethod
+    def _merge_analyses(parts: List[Tuple[CodeAnalysis, int]], files_count: int) -> Optional[CodeAnalysis]:
+        """Reduce per-chunk analyses (with their token sizes) into one project analysis"""
+        if not parts:
+            return None
+        
+        def unique(items: List[Any]) -> List[Any]:
+            seen, merged = set(), []
+            for item in items:
+                key = str(item).strip().lower()
+                if key and key not in seen:
+                    seen.add(key)
+                    merged.append(item)
+            return merged
+        
+        def most_common(key: str) -> Any:
+            values = [
+                part.current_structure.get(key) for part, _ in parts
+                if part.current_structure.get(key) not in (None, "", "string")
+            ]
+            return max(values, key=values.count) if values else "unknown"
+        
+        # Complexity weighted by how much of the project each chunk covers
+        total_weight = sum(weight for _, weight in parts) or 1
+        complexity = round(sum(part.complexity_score * weight for part, weight in parts) / total_weight)
+        
+        return CodeAnalysis(
+            current_structure={
+                "files_count": files_count,
+                "main_components": unique([
+                    component for part, _ in parts
+                    for component in part.current_structure.get("main_components") or []
+                ]),
+                "architecture_pattern": most_common("architecture_pattern"),
+                "database_used": most_common("database_used"),
+                "analyzed_chunks": len(parts)
+            },
+            identified_issues=unique([issue for part, _ in parts for issue in part.identified_issues]),
+            improvement_suggestions=unique([
+                suggestion for part, _ in parts for suggestion in part.improvement_suggestions
+            ]),
+            complexity_score=max(1, min(10, complexity))
+        )
+    
+    async def generate_enhancement(
+        self,
+        project_path: str,
+        enhancement_request: str,
+        analysis: CodeAnalysis,
+        snapshot: Optional[ProjectSnapshot] = None
+    ) -> Dict[str, Any]:
         """Generate code enhancements based on request and analysis"""
         
-        existing_files = self._read_project_files(project_path)
+        existing_files = (await self.snapshot(project_path, snapshot)).files
+        
+        # Only the files relevant to the request go into the prompt
+        with stage("select_context"), span("select_context") as current:
+            relevant_files, omitted_files = await self._offload(
+                select_context, existing_files, enhancement_request, self.context_tokens
+            )
+            current.set(
+                selected=len(relevant_files),
+                omitted=len(omitted_files),
+                chars=sum(len(code) for code in relevant_files.values())
+            )
+        
+        omitted_note = ""
+        if omitted_files:
+            omitted_note = f"""
+        File lain di project (tidak ditampilkan, tetap ada dan tidak perlu ditulis ulang):
+        {json.dumps(omitted_files)}
+        """
         
         enhancement_prompt = f"""
         Berdasarkan request: "{enhancement_request}"
         
         Dan file yang ada:
-        {json.dumps(existing_files, indent=2)}
-        
+        {json.dumps(relevant_files, indent=2)}
+        {omitted_note}
         Generate code improvements. Format response JSON:
         {{
             "modifications": {{
@@ -496,41 +889,42 @@ class EnhancementService:
         """
         
         try:
-            response = self.model.generate_content(enhancement_prompt)
-            result = self._clean_json_response(response.text)
+            with stage("generate_enhancement"), span("generate_enhancement", prompt_chars=len(enhancement_prompt)) as current:
+                response_text = await self.llm.generate(
+                    enhancement_prompt,
+                    label="generate_enhancement",
+                    validate=json_validator()
+                )
+                current.set(response_chars=len(response_text))
+                result = self._clean_json_response(response_text)
             
             # Apply modifications
-            await self._apply_enhancements(project_path, result)
+            with stage("apply_enhancements"), span(
+                "apply_enhancements",
+                modified=len(result.get("modifications") or {}),
+                created=len(result.get("new_files") or {})
+            ):
+                await self._apply_enhancements(project_path, result)
             return result
+        except TokenBudgetExceeded:
+            raise
         except Exception as e:
             return {"error": str(e), "changes_summary": "Failed to generate enhancements"}
     
-    def _read_project_files(self, project_path: str) -> Dict[str, str]:
-        """Read all Python files in project"""
-        files = {}
-        project_dir = Path(project_path)
-        
-        if not project_dir.exists():
-            return files
-        
-        for file_path in project_dir.rglob("*.py"):
-            if "venv" not in str(file_path) and "__pycache__" not in str(file_path):
-                try:
-                    relative_path = file_path.relative_to(project_dir)
-                    files[str(relative_path)] = file_path.read_text(encoding='utf-8')
-                except Exception as e:
-                    print(f"Error reading {file_path}: {e}")
-        
-        # Also read other important files
-        for ext in ["*.txt", "*.md", "*.yml", "*.yaml", "Dockerfile"]:
-            for file_path in project_dir.glob(ext):
-                try:
-                    relative_path = file_path.relative_to(project_dir)
-                    files[str(relative_path)] = file_path.read_text(encoding='utf-8')
-                except Exception as e:
-                    print(f"Error reading {file_path}: {e}")
-        
-        return files
+    async def snapshot(self, project_path: str, snapshot: Optional[ProjectSnapshot] = None) -> ProjectSnapshot:
+        """Current project files, re-reading only the ones that changed; pass a snapshot to reuse it"""
+        if snapshot is not None:
+            return snapshot
+        
+        with stage("read_project_files"), span("read_project_files") as current:
+            snapshot = await self._offload(self.snapshots.snapshot, project_path)
+            current.set(
+                files=len(snapshot.files),
+                read=snapshot.files_read,
+                reused=snapshot.files_reused,
+                content_hash=snapshot.content_hash
+            )
+            return snapshot
     
     async def _apply_enhancements(self, project_path: str, enhancements: Dict[str, Any]):
         """Apply code enhancements to project"""
@@ -555,21 +949,24 @@ class EnhancementService:
                         print(f"✅ Created: {file_path}")
         except Exception as e:
             print(f"Error applying enhancements: {e}")
+        finally:
+            # A same-size rewrite within the filesystem's mtime granularity would
+            # look unchanged to the snapshot cache, so re-read this project next time
+            self.snapshots.invalidate(project_path)
+    
+    def shutdown(self):
+        """Release the analysis threads"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
     
     def _clean_json_response(self, response_text: str) -> Dict[str, Any]:
         """Clean and parse JSON response from Gemini"""
-        text = response_text.strip()
-        
-        if text.startswith("```json"):
-            text = text[7:-3]
-        elif text.startswith("```"):
-            text = text[3:-3]
-        
-        try:
-            return json.loads(text)
-        except json.JSONDecodeError as e:
-            print(f"JSON decode error: {e}")
-            return {"error": "Failed to parse response", "raw_response": text[:500]}
+        with span("parse_json", response_chars=len(response_text)) as current:
+            try:
+                return loads_json_response(response_text)
+            except json.JSONDecodeError as e:
+                print(f"JSON decode error: {e}")
+                current.set(parse_error=str(e))
+                return {"error": "Failed to parse response", "raw_response": response_text.strip()[:500]}
         
 # Initialize enhancement service
 enhancement_service = EnhancementService()
@@ -577,54 +974,288 @@ enhancement_service = EnhancementService()
 # Initialize service
 builder_service = AppBuilderService()
 
+# /analyze results that /generate can reuse by ID
+analysis_store = AnalysisStore()
+
+# Bounded worker pool for /jobs/* submissions
+job_manager = JobManager()
+
+# Concurrency limits per endpoint class; saturated classes answer 429
+admission = {
+    "analyze": AdmissionController.from_env("analyze", default_concurrent=8, default_waiting=32),
+    "generate": AdmissionController.from_env("generate", default_concurrent=4, default_waiting=8),
+    "enhance": AdmissionController.from_env("enhance", default_concurrent=2, default_waiting=4),
+    # /analyze-existing?mode=fast: no LLM call, but reads and parses the whole project
+    "static": AdmissionController.from_env("static", default_concurrent=4, default_waiting=16),
+}
+
+# venv/pip subprocesses are heavy and slow: they run on their own small pool, so
+# queued setups never hold threads of the shared pools (LLM cache I/O, BackgroundTasks)
+environment_setup_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("ENV_SETUP_CONCURRENCY", "2")),
+    thread_name_prefix="env-setup"
+)
+
+@app.middleware("http")
+async def observe_request(request: Request, call_next):
+    """Root trace span and per-route latency for /metrics; the trace ID is returned as X-Trace-Id"""
+    started = time.perf_counter()
+    status = 500
+    with span("http.request", method=request.method, path=request.url.path) as current:
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            response.headers["X-Trace-Id"] = current.trace_id
+            return response
+        finally:
+            # Label by route template, not raw path, to keep job IDs out of the labels
+            route = getattr(request.scope.get("route"), "path", "unmatched")
+            current.set(route=route, status=status)
+            HTTP_REQUEST_SECONDS.labels(request.method, route, str(status)).observe(time.perf_counter() - started)
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+@app.exception_handler(TokenBudgetExceeded)
+async def token_budget_handler(request: Request, exc: TokenBudgetExceeded):
+    return JSONResponse(
+        status_code=413,
+        content={"detail": exc.detail, "scope": exc.scope, "tokens": exc.tokens, "limit": exc.limit}
+    )
+
+def project_key(project_path) -> str:
+    """Token usage is tracked per resolved project directory (shared by generate and enhance)"""
+    return str(Path(project_path).resolve())
+
 @app.post("/analyze")
 async def analyze_request(request: AppRequest):
     """Analyze user prompt and return project analysis"""
-    try:
-        analysis = await builder_service.analyze_prompt(request.prompt)
-        return {"status": "success", "analysis": analysis}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    if not request.prompt:
+        raise HTTPException(status_code=400, detail="prompt is required")
+    
+    async with admission["analyze"].slot():
+        try:
+            degraded = set()
+            with usage_scope(endpoint="/analyze"):
+                analysis = await builder_service.analyze_prompt(request.prompt, degraded)
+            analysis_id = analysis_store.save(analysis)
+            return {
+                "status": "success",
+                "analysis_id": analysis_id,
+                "expires_in": analysis_store.ttl_seconds,
+                "analysis": analysis,
+                # True when the generic fallback analysis was returned
+                "degraded": bool(degraded)
+            }
+        except (HTTPException, TokenBudgetExceeded):
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+def attach_stored_analysis(request: AppRequest) -> AppRequest:
+    """Resolve analysis_id now, so an unknown or expired ID is a 404 rather than a failed stream or job"""
+    if request.analysis is not None or not request.analysis_id:
+        return request
+    
+    analysis = analysis_store.get(request.analysis_id)
+    if analysis is None:
+        raise HTTPException(status_code=404, detail="Analysis not found or expired")
+    return request.model_copy(update={"analysis": analysis})
+
+async def resolve_analysis(request: AppRequest, degraded: Optional[Set[str]] = None) -> ProjectAnalysis:
+    """Use the supplied analysis or analysis_id when present, otherwise analyze the prompt"""
+    request = attach_stored_analysis(request)
+    if request.analysis is not None:
+        return request.analysis
+    
+    if not request.prompt:
+        raise HTTPException(status_code=400, detail="Either prompt, analysis_id or analysis is required")
+    
+    return await builder_service.analyze_prompt(request.prompt, degraded)
+
+async def run_generation(request: AppRequest, endpoint: str = "/generate") -> Dict[str, Any]:
+    """Analyze, generate and write a project; shared by /generate and generate jobs"""
+    # Generate project name if not provided
+    project_name = request.project_name or f"generated_app_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    project_path = builder_service.output_base / project_name
+    
+    with usage_scope(project_key(project_path), endpoint):
+        # Analyze prompt (skipped when the client already has an analysis)
+        degraded = set()
+        analysis = await resolve_analysis(request, degraded)
+        
+        # Generate project structure
+        files = await builder_service.generate_project_structure(analysis, project_name, degraded=degraded)
+    
+    # Create project directory
+    project_path.mkdir(exist_ok=True)
+    
+    # Write all files
+    with stage("write_files"), span("write_files", files=len(files)):
+        for file_path, content in files.items():
+            with span("write_file", file=file_path, bytes=len(content)):
+                full_path = project_path / file_path
+                full_path.parent.mkdir(parents=True, exist_ok=True)
+                full_path.write_text(content, encoding='utf-8')
+    
+    return {
+        "status": "success",
+        "project_name": project_name,
+        "project_path": str(project_path),
+        "files_generated": len(files),
+        "analysis": analysis,
+        # True when the analysis or some files came from fallbacks (LLM unavailable)
+        "degraded": bool(degraded),
+        "degraded_files": sorted(degraded)
+    }
 
 @app.post("/generate")
 async def generate_app(request: AppRequest, background_tasks: BackgroundTasks):
     """Generate complete application"""
+    async with admission["generate"].slot():
+        try:
+            result = await run_generation(request)
+            
+            # Add background task to setup environment
+            background_tasks.add_task(queue_environment_setup, result["project_path"])
+            
+            return result
+            
+        except (HTTPException, TokenBudgetExceeded):
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Encode one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@app.post("/generate/stream")
+async def generate_app_stream(request: AppRequest):
+    """Generate complete application, streaming progress as server-sent events
+    
+    Events: started, analysis, file_started, file_chunk, file_degraded,
+    file_written, environment_setup_queued, done (or error).
+    """
+    if not (request.prompt or request.analysis_id or request.analysis):
+        raise HTTPException(status_code=400, detail="Either prompt, analysis_id or analysis is required")
+    request = attach_stored_analysis(request)
+    
+    # Reject up front; the slot itself is held while the stream is produced
+    admission["generate"].check()
+    
+    project_name = request.project_name or f"generated_app_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    events: asyncio.Queue = asyncio.Queue()
+    
+    async def produce():
+        try:
+            async with admission["generate"].slot(enforce_queue_limit=False):
+                degraded = set()
+                analysis = await resolve_analysis(request, degraded)
+                events.put_nowait(("analysis", {"analysis": analysis.model_dump(), "degraded": bool(degraded)}))
+                
+                project_path = builder_service.output_base / project_name
+                project_path.mkdir(exist_ok=True)
+                
+                def on_progress(event: str, file_name: str, data: Any):
+                    if event == "file_started":
+                        events.put_nowait(("file_started", {"file": file_name}))
+                    elif event == "file_chunk":
+                        events.put_nowait(("file_chunk", {"file": file_name, "text": data}))
+                    elif event == "file_degraded":
+                        events.put_nowait(("file_degraded", {"file": file_name, "reason": data}))
+                    elif event == "file_completed":
+                        # Write each file as soon as it is ready
+                        with stage("write_file"), span("write_file", file=file_name, bytes=len(data)):
+                            full_path = project_path / file_name
+                            full_path.parent.mkdir(parents=True, exist_ok=True)
+                            full_path.write_text(data, encoding='utf-8')
+                        events.put_nowait(("file_written", {"file": file_name, "bytes": len(data)}))
+                
+                files = await builder_service.generate_project_structure(
+                    analysis, project_name, listener=on_progress, degraded=degraded
+                )
+            
+            try:
+                queue_environment_setup(str(project_path))
+                events.put_nowait(("environment_setup_queued", {"project_path": str(project_path)}))
+            except RuntimeError as e:
+                # Setup pool already shut down; the project itself is complete
+                print(f"Could not queue environment setup for {project_path}: {e}")
+            
+            events.put_nowait(("done", {
+                "status": "success",
+                "project_name": project_name,
+                "project_path": str(project_path),
+                "files_generated": len(files),
+                "analysis": analysis.model_dump(),
+                "degraded": bool(degraded),
+                "degraded_files": sorted(degraded)
+            }))
+        except HTTPException as e:
+            events.put_nowait(("error", {"status_code": e.status_code, "detail": e.detail}))
+        except TokenBudgetExceeded as e:
+            events.put_nowait(("error", {"status_code": 413, "detail": e.detail}))
+        except Exception as e:
+            events.put_nowait(("error", {"status_code": 500, "detail": str(e)}))
+        finally:
+            events.put_nowait(None)
+    
+    async def stream():
+        # The producer task inherits the usage scope
+        with usage_scope(project_key(builder_service.output_base / project_name), "/generate/stream"):
+            producer = asyncio.ensure_future(produce())
+        try:
+            yield format_sse("started", {"project_name": project_name})
+            while True:
+                item = await events.get()
+                if item is None:
+                    break
+                yield format_sse(*item)
+        finally:
+            # Client went away: stop generating
+            producer.cancel()
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def queue_environment_setup(project_path: str):
+    """Queue setup_project_environment on its dedicated pool and return immediately
+    
+    At most ENV_SETUP_CONCURRENCY setups run at once; the rest wait in the
+    pool's queue without occupying a thread.
+    """
+    # Keep the caller's trace for the setup span
+    environment_setup_executor.submit(contextvars.copy_context().run, setup_project_environment, project_path)
+
+def setup_project_environment(project_path: str):
+    """Setup virtual environment and install dependencies
+
+    Blocking (venv/pip subprocesses); run it through queue_environment_setup.
+    Set SETUP_PROJECT_ENVIRONMENT=0 to skip it (benchmarks, CI).
+    """
+    if os.getenv("SETUP_PROJECT_ENVIRONMENT", "1") == "0":
+        print(f"⏭️  Skipping environment setup for {project_path}")
+        return
+    
+    started = time.perf_counter()
+    outcome = "error"
     try:
-        # Analyze prompt
-        analysis = await builder_service.analyze_prompt(request.prompt)
-        
-        # Generate project name if not provided
-        project_name = request.project_name or f"generated_app_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-        
-        # Generate project structure
-        files = await builder_service.generate_project_structure(analysis, project_name)
-        
-        # Create project directory
-        project_path = builder_service.output_base / project_name
-        project_path.mkdir(exist_ok=True)
-        
-        # Write all files
-        for file_path, content in files.items():
-            full_path = project_path / file_path
-            full_path.parent.mkdir(parents=True, exist_ok=True)
-            full_path.write_text(content, encoding='utf-8')
-        
-        # Add background task to setup environment
-        background_tasks.add_task(setup_project_environment, str(project_path))
-        
-        return {
-            "status": "success",
-            "project_name": project_name,
-            "project_path": str(project_path),
-            "files_generated": len(files),
-            "analysis": analysis
-        }
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        with span("setup_environment", project_path=project_path):
+            _setup_project_environment(project_path)
+        outcome = "ok"
+    finally:
+        BACKGROUND_TASK_SECONDS.labels("setup_environment", outcome).observe(time.perf_counter() - started)
 
-async def setup_project_environment(project_path: str):
-    """Setup virtual environment and install dependencies"""
+def _setup_project_environment(project_path: str):
     try:
         print(f"🔧 Setting up environment for {project_path}")
         
@@ -711,44 +1342,224 @@ async def list_projects():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "service": "AI App Builder with Gemini"}
+    return {
+        "status": "healthy",
+        "service": "AI App Builder with Gemini",
+        # "open" means generations are being served from fallback templates
+        "llm_circuit": llm_client.breaker.state
+    }
+
+@app.get("/usage")
+async def token_usage(project_path: Optional[str] = None):
+    """LLM token usage per project (current budget window) and endpoint, or for one project"""
+    if project_path:
+        return {"project": project_key(project_path), "usage": llm_client.usage.stats(project_key(project_path))}
+    return llm_client.usage.stats()
+
+@app.delete("/usage")
+async def reset_token_usage(project_path: Optional[str] = None):
+    """Reset one project's token budget window, or all usage counters"""
+    if project_path:
+        llm_client.usage.reset(project_key(project_path))
+        return {"status": "reset", "project": project_key(project_path)}
+    llm_client.usage.reset()
+    return {"status": "reset"}
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """LLM response cache hit/miss counters"""
+    return {"cache": llm_client.cache_stats()}
+
+def analysis_report(report: Dict[str, Any]) -> Dict[str, Any]:
+    """Response fields telling a full LLM analysis from a partial or ast-only one"""
+    return {
+        "analysis_source": report["source"],
+        "analysis_chunks": report["chunks"],
+        "failed_chunks": report["failed_chunks"],
+        # True when some or all chunks fell back to the static analysis
+        "degraded": report["source"] != "llm"
+    }
 
 @app.post("/analyze-existing")
-async def analyze_existing_code(request: EnhancementRequest):
-    """Analyze existing codebase"""
-    try:
-        if not Path(request.project_path).exists():
-            raise HTTPException(status_code=404, detail="Project path not found")
-        
-        analysis = await enhancement_service.analyze_existing_code(request.project_path)
-        return {"status": "success", "analysis": analysis}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+async def analyze_existing_code(request: EnhancementRequest, mode: str = "slow"):
+    """Analyze existing codebase; mode=fast returns the static analysis without calling the LLM"""
+    if not Path(request.project_path).exists():
+        raise HTTPException(status_code=404, detail="Project path not found")
+    if mode not in ("fast", "slow"):
+        raise HTTPException(status_code=400, detail="mode must be 'fast' or 'slow'")
+    
+    if mode == "fast":
+        async with admission["static"].slot():
+            try:
+                analysis = await enhancement_service.analyze_static(request.project_path)
+                return {"status": "success", "mode": mode, "analysis": analysis, "analysis_source": "static"}
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=str(e))
+    
+    async with admission["enhance"].slot():
+        try:
+            report = {}
+            with usage_scope(project_key(request.project_path), "/analyze-existing"):
+                analysis = await enhancement_service.analyze_existing_code(request.project_path, report=report)
+            return {"status": "success", "mode": mode, "analysis": analysis, **analysis_report(report)}
+        except TokenBudgetExceeded:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/enhance-app")
-async def enhance_application(request: EnhancementRequest):
-    """Enhance existing application"""
-    try:
-        if not Path(request.project_path).exists():
-            raise HTTPException(status_code=404, detail="Project path not found")
+async def run_enhancement(request: EnhancementRequest, endpoint: str = "/enhance-app") -> Dict[str, Any]:
+    """Analyze then enhance an existing project; shared by /enhance-app and enhance jobs"""
+    if not Path(request.project_path).exists():
+        raise HTTPException(status_code=404, detail="Project path not found")
+    
+    with usage_scope(project_key(request.project_path), endpoint):
+        # Both phases see the same files
+        snapshot = await enhancement_service.snapshot(request.project_path)
         
         # First analyze
-        analysis = await enhancement_service.analyze_existing_code(request.project_path)
+        report = {}
+        analysis = await enhancement_service.analyze_existing_code(request.project_path, snapshot, report)
         
         # Then enhance
         result = await enhancement_service.generate_enhancement(
             request.project_path, 
             request.enhancement_request, 
-            analysis
+            analysis,
+            snapshot
         )
-        
-        return {
-            "status": "success",
-            "analysis": analysis,
-            "enhancements": result
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    
+    return {
+        "status": "success",
+        "snapshot_hash": snapshot.content_hash,
+        "analysis": analysis,
+        **analysis_report(report),
+        "enhancements": result
+    }
+
+@app.post("/enhance-app")
+async def enhance_application(request: EnhancementRequest):
+    """Enhance existing application"""
+    async with admission["enhance"].slot():
+        try:
+            return await run_enhancement(request)
+        except (HTTPException, TokenBudgetExceeded):
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+def submit_job(kind: str, factory) -> Dict[str, Any]:
+    """Queue a job and return its handle; a full queue raises Overloaded (429)"""
+    try:
+        job = job_manager.submit(kind, factory)
+    except JobQueueFull:
+        raise Overloaded("jobs", job_manager.estimate_wait())
+    
+    return {**job.to_dict(), "status_url": f"/jobs/{job.id}", "result_url": f"/jobs/{job.id}/result"}
+
+@app.post("/jobs/generate", status_code=202)
+async def submit_generate_job(request: AppRequest):
+    """Queue a /generate run and return a job ID immediately"""
+    if not (request.prompt or request.analysis_id or request.analysis):
+        raise HTTPException(status_code=400, detail="Either prompt, analysis_id or analysis is required")
+    request = attach_stored_analysis(request)
+    
+    async def generate_job():
+        # Accepted jobs wait for a generate slot rather than being rejected
+        async with admission["generate"].slot(enforce_queue_limit=False):
+            result = await run_generation(request, "/jobs/generate")
+        queue_environment_setup(result["project_path"])
+        return result
+    
+    return submit_job("generate", generate_job)
+
+@app.post("/jobs/enhance-app", status_code=202)
+async def submit_enhance_job(request: EnhancementRequest):
+    """Queue an /enhance-app run and return a job ID immediately"""
+    if not Path(request.project_path).exists():
+        raise HTTPException(status_code=404, detail="Project path not found")
+    
+    async def enhance_job():
+        async with admission["enhance"].slot(enforce_queue_limit=False):
+            return await run_enhancement(request, "/jobs/enhance-app")
+    
+    return submit_job("enhance-app", enhance_job)
+
+@app.get("/admission")
+async def admission_stats():
+    """Current load per endpoint class plus Gemini rate limiting and retry stats"""
+    stats = {name: controller.stats() for name, controller in admission.items()}
+    stats["llm_rate_limit"] = llm_client.rate_limiter.stats()
+    stats["llm_resilience"] = llm_client.resilience_stats()
+    return stats
+
+@app.get("/jobs")
+async def list_jobs():
+    """List known jobs and queue state"""
+    return {
+        "queued": job_manager.queue_depth,
+        "running": job_manager.running,
+        "workers": job_manager.workers,
+        "jobs": [job.to_dict() for job in job_manager.jobs.values()]
+    }
+
+def get_job_or_404(job_id: str) -> Job:
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Job status"""
+    return get_job_or_404(job_id).to_dict()
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    """Job result once it has succeeded"""
+    job = get_job_or_404(job_id)
+    
+    if job.status == JobStatus.SUCCEEDED:
+        return job.result
+    if job.status == JobStatus.FAILED:
+        # The job failed, not this request; like a cancelled job it has no result
+        raise HTTPException(status_code=409, detail={"status": job.status.value, "error": job.error})
+    if job.status == JobStatus.CANCELLED:
+        raise HTTPException(status_code=410, detail="Job was cancelled")
+    raise HTTPException(status_code=409, detail=f"Job is {job.status.value}")
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job"""
+    get_job_or_404(job_id)
+    return job_manager.cancel(job_id).to_dict()
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus scrape endpoint"""
+    content, content_type = metrics.render()
+    return Response(content=content, media_type=content_type)
+
+# Live queue depths, cache and limiter state, read on each scrape
+metrics.collector.add("admission", lambda: {name: c.stats() for name, c in admission.items()}, label="endpoint")
+metrics.collector.add("llm_cache", llm_client.cache_stats)
+metrics.collector.add("llm_rate_limit", llm_client.rate_limiter.stats)
+metrics.collector.add("llm_resilience", llm_client.resilience_stats)
+metrics.collector.add("project_snapshots", enhancement_service.snapshots.stats)
+metrics.collector.add("jobs", lambda: {
+    "queued": job_manager.queue_depth,
+    "running": job_manager.running,
+    "workers": job_manager.workers,
+    "avg_duration_seconds": job_manager.avg_duration,
+})
+
+
+@app.on_event("shutdown")
+async def shutdown_services():
+    await job_manager.shutdown()
+    llm_client.shutdown()
+    enhancement_service.shutdown()
+    environment_setup_executor.shutdown(wait=False, cancel_futures=True)
 
 
 if __name__ == "__main__":
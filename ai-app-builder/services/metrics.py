@@ -0,0 +1,116 @@
+"""Prometheus metrics, exported in text format at /metrics.
+
+Timings and counters are recorded where the work happens; queue depths,
+cache counters and other state the services already keep in their
+``stats()`` dicts are read at scrape time by :class:`StatsCollector`.
+"""
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+
+# LLM calls and generations take seconds to minutes; the default buckets stop at 10 s
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "app_builder_http_request_seconds",
+    "HTTP request duration (until the response headers for streams)",
+    ["method", "route", "status"],
+    buckets=DURATION_BUCKETS,
+)
+STAGE_SECONDS = Histogram(
+    "app_builder_stage_seconds",
+    "Duration of one pipeline stage",
+    ["stage"],
+    buckets=DURATION_BUCKETS,
+)
+LLM_CALL_SECONDS = Histogram(
+    "app_builder_llm_call_seconds",
+    "Latency of one provider call attempt",
+    ["method", "model", "outcome"],
+    buckets=DURATION_BUCKETS,
+)
+LLM_REQUESTS = Counter(
+    "app_builder_llm_requests_total",
+    "LLM requests by where the answer came from (memory, disk, coalesced, provider)",
+    ["method", "source"],
+)
+LLM_TOKENS = Counter(
+    "app_builder_llm_tokens_total",
+    "Tokens sent to (prompt) and received from (output) the provider",
+    ["method", "model", "direction"],
+)
+BACKGROUND_TASK_SECONDS = Histogram(
+    "app_builder_background_task_seconds",
+    "Duration of background work (environment setup, queued jobs)",
+    ["task", "outcome"],
+    buckets=DURATION_BUCKETS,
+)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time the enclosed block as pipeline stage ``name``"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.labels(name).observe(time.perf_counter() - started)
+
+
+StatsSource = Callable[[], Dict[str, Any]]
+
+
+class StatsCollector:
+    """Expose existing ``stats()`` dicts as gauges, read at scrape time.
+
+    Numeric and boolean values become ``app_builder_<source>_<key>`` gauges;
+    nested dicts are flattened with ``_`` and strings are skipped. A source
+    registered with ``label`` returns ``{label_value: stats}`` instead, e.g.
+    one entry per admission class.
+    """
+
+    def __init__(self, prefix: str = "app_builder"):
+        self.prefix = prefix
+        self._sources: Dict[str, Tuple[StatsSource, Optional[str]]] = {}
+
+    def add(self, name: str, source: StatsSource, label: Optional[str] = None):
+        self._sources[name] = (source, label)
+
+    def _flatten(self, stats: Dict[str, Any], prefix: str = "") -> Iterator[Tuple[str, float]]:
+        for key, value in stats.items():
+            if isinstance(value, dict):
+                yield from self._flatten(value, f"{prefix}{key}_")
+            elif isinstance(value, (bool, int, float)):
+                yield f"{prefix}{key}", float(value)
+
+    def collect(self):
+        for name, (source, label) in self._sources.items():
+            try:
+                stats = source()
+            except Exception as e:
+                print(f"⚠️  Metrics source {name} failed: {e}")
+                continue
+
+            families: Dict[str, GaugeMetricFamily] = {}
+            groups = stats.items() if label else [(None, stats)]
+            for label_value, group in groups:
+                for key, value in self._flatten(group):
+                    metric = f"{self.prefix}_{name}_{key}"
+                    if metric not in families:
+                        families[metric] = GaugeMetricFamily(
+                            metric, f"{name} {key}", labels=[label] if label else None
+                        )
+                    families[metric].add_metric([label_value] if label else [], value)
+            yield from families.values()
+
+
+collector = StatsCollector()
+REGISTRY.register(collector)
+
+
+def render() -> Tuple[bytes, str]:
+    """Current metrics in Prometheus text format, with their content type"""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,137 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from project_walker import walk_project
+
+# Non-Python files read from the project root
+ROOT_FILE_PATTERNS = ["*.txt", "*.md", "*.yml", "*.yaml", "Dockerfile"]
+
+# A NUL byte in this many leading bytes marks a file as binary
+BINARY_SNIFF_BYTES = 8192
+
+
+def iter_project_files(project_dir: Path) -> Iterator[Tuple[str, os.DirEntry]]:
+    """Python files anywhere in the project plus notable files at its root, skipping ignored paths"""
+    for relative_path, entry in walk_project(project_dir):
+        if relative_path.endswith(".py") or (
+            "/" not in relative_path and any(fnmatch(entry.name, pattern) for pattern in ROOT_FILE_PATTERNS)
+        ):
+            yield relative_path, entry
+
+
+@dataclass
+class FileEntry:
+    key: Tuple[int, int, int]  # (mtime_ns, size, inode) when the file was read
+    content: Optional[str]  # None for binary files, remembered so they are not re-read
+    digest: str
+
+
+@dataclass
+class ProjectSnapshot:
+    """Contents of a project's files at one point in time; treat ``files`` as read-only"""
+    files: Dict[str, str]
+    content_hash: str
+    files_read: int
+    files_reused: int
+
+
+class SnapshotCache:
+    """Per-project file contents, re-reading only files whose (mtime, size, inode) changed.
+
+    Every snapshot still stats the candidate files, so edits made outside
+    the service are picked up; unchanged files are served from memory and
+    an unchanged project shares the previous snapshot's files and hash. Projects are
+    evicted least recently used beyond ``max_projects``.
+    """
+
+    def __init__(self, max_projects: int = None):
+        self.max_projects = max_projects or int(os.getenv("PROJECT_SNAPSHOT_CACHE_PROJECTS", "32"))
+        self._projects: "OrderedDict[str, Tuple[Dict[str, FileEntry], ProjectSnapshot]]" = OrderedDict()
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._counters = {"snapshots": 0, "unchanged": 0, "files_read": 0, "files_reused": 0, "evictions": 0}
+
+    def _project_lock(self, root: str) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(root, threading.Lock())
+
+    def snapshot(self, project_path: str) -> ProjectSnapshot:
+        project_dir = Path(project_path).resolve()
+        root = str(project_dir)
+        if not project_dir.exists():
+            return ProjectSnapshot(files={}, content_hash=hashlib.sha256().hexdigest(), files_read=0, files_reused=0)
+
+        # One refresh per project at a time; different projects proceed in parallel
+        with self._project_lock(root):
+            with self._lock:
+                previous_entries, previous = self._projects.get(root, ({}, None))
+
+            entries: Dict[str, FileEntry] = {}
+            read = reused = 0
+            for relative_path, dir_entry in iter_project_files(project_dir):
+                try:
+                    stat = dir_entry.stat()
+                    key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+                    entry = previous_entries.get(relative_path)
+                    if entry is not None and entry.key == key:
+                        reused += 1
+                    else:
+                        data = Path(dir_entry.path).read_bytes()
+                        digest = hashlib.sha256(data).hexdigest()
+                        binary = b"\0" in data[:BINARY_SNIFF_BYTES]
+                        entry = FileEntry(key, None if binary else data.decode("utf-8"), digest)
+                        read += 1
+                    entries[relative_path] = entry
+                except Exception as e:
+                    print(f"Error reading {dir_entry.path}: {e}")
+
+            unchanged = previous is not None and read == 0 and entries.keys() == previous_entries.keys()
+            if unchanged:
+                snapshot = ProjectSnapshot(previous.files, previous.content_hash, files_read=0, files_reused=reused)
+            else:
+                digest = hashlib.sha256()
+                for relative_path in sorted(entries):
+                    digest.update(f"{relative_path}\0{entries[relative_path].digest}\0".encode("utf-8"))
+                snapshot = ProjectSnapshot(
+                    files={name: entry.content for name, entry in entries.items() if entry.content is not None},
+                    content_hash=digest.hexdigest(),
+                    files_read=read,
+                    files_reused=reused
+                )
+
+            with self._lock:
+                self._projects[root] = (entries, snapshot)
+                self._projects.move_to_end(root)
+                while len(self._projects) > self.max_projects:
+                    evicted, _ = self._projects.popitem(last=False)
+                    self._locks.pop(evicted, None)
+                    self._counters["evictions"] += 1
+                self._counters["snapshots"] += 1
+                self._counters["unchanged"] += unchanged
+                self._counters["files_read"] += read
+                self._counters["files_reused"] += reused
+            return snapshot
+
+    def invalidate(self, project_path: Optional[str] = None):
+        """Forget one project (or all); the next snapshot re-reads everything"""
+        with self._lock:
+            if project_path is None:
+                self._projects.clear()
+            else:
+                self._projects.pop(str(Path(project_path).resolve()), None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._counters,
+                "projects": len(self._projects),
+                "cached_chars": sum(
+                    len(entry.content or "") for entries, _ in self._projects.values() for entry in entries.values()
+                ),
+            }
@@ -0,0 +1,154 @@
+"""Walk a project tree without descending into ignored directories.
+
+Directories are pruned before they are listed, so a project's ``venv`` or
+``node_modules`` costs one ``scandir`` entry instead of a full traversal.
+Ignore rules come from a default list (PROJECT_WALK_IGNORE) and from
+``.gitignore`` files, which apply to the directory they sit in and below.
+The supported ``.gitignore`` syntax covers ``*``, ``?``, ``[...]``, ``**``,
+leading ``/`` anchors, trailing ``/`` for directories and ``!`` negation.
+"""
+import os
+import re
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+# gitignore syntax; comma-separated in PROJECT_WALK_IGNORE to override
+DEFAULT_IGNORE = (
+    "venv/", ".venv/", "env/", "node_modules/", "build/", "dist/", ".git/",
+    "__pycache__/", ".mypy_cache/", ".pytest_cache/", ".tox/", "*.egg-info/",
+)
+
+# Larger files are skipped (generated code, data dumps)
+DEFAULT_MAX_FILE_BYTES = 512 * 1024
+
+
+def _translate(pattern: str) -> str:
+    """Regex for a gitignore glob; '*' and '?' stop at '/', '**' crosses directories"""
+    regex, i = "", 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            regex += "(?:.*/)?"
+            i += 3
+        elif pattern.startswith("**", i):
+            regex += ".*"
+            i += 2
+        elif pattern[i] == "*":
+            regex += "[^/]*"
+            i += 1
+        elif pattern[i] == "?":
+            regex += "[^/]"
+            i += 1
+        elif pattern[i] == "[" and "]" in pattern[i + 2:]:
+            end = pattern.index("]", i + 2)
+            body = pattern[i + 1:end]
+            regex += "[" + ("^" + body[1:] if body[0] == "!" else body).replace("\\", "\\\\") + "]"
+            i = end + 1
+        else:
+            regex += re.escape(pattern[i])
+            i += 1
+    return regex
+
+
+class IgnoreRule:
+    """One gitignore line, relative to the directory (base) that declared it"""
+
+    def __init__(self, pattern: str, base: str = ""):
+        self.negate = pattern.startswith("!")
+        if self.negate or pattern.startswith("\\"):
+            # "\!" and "\#" are literal
+            pattern = pattern[1:]
+        self.dir_only = pattern.endswith("/")
+        pattern = pattern.rstrip("/")
+        # A slash anywhere but the end anchors the pattern to base
+        self.anchored = "/" in pattern
+        self.base = base
+        self.regex = re.compile(_translate(pattern.lstrip("/")) + r"\Z")
+
+    def matches(self, path: str, name: str, is_dir: bool) -> bool:
+        if self.dir_only and not is_dir:
+            return False
+        if not self.anchored:
+            return bool(self.regex.match(name))
+        if self.base:
+            if not path.startswith(self.base + "/"):
+                return False
+            path = path[len(self.base) + 1:]
+        return bool(self.regex.match(path))
+
+
+def parse_ignore_file(path: Path, base: str = "") -> List[IgnoreRule]:
+    try:
+        lines = path.read_text(encoding="utf-8", errors="replace").splitlines()
+    except OSError:
+        return []
+    rules = []
+    for line in lines:
+        line = line.rstrip()
+        if line and not line.startswith("#"):
+            rules.append(IgnoreRule(line, base))
+    return rules
+
+
+def is_ignored(rules: Sequence[IgnoreRule], path: str, name: str, is_dir: bool) -> bool:
+    """The last matching rule wins, as in git"""
+    ignored = False
+    for rule in rules:
+        if rule.matches(path, name, is_dir):
+            ignored = not rule.negate
+    return ignored
+
+
+def default_ignore() -> List[str]:
+    configured = os.getenv("PROJECT_WALK_IGNORE")
+    if configured is None:
+        return list(DEFAULT_IGNORE)
+    return [pattern.strip() for pattern in configured.split(",") if pattern.strip()]
+
+
+def walk_project(
+    project_dir: Path,
+    ignore: Optional[Sequence[str]] = None,
+    max_file_bytes: int = None,
+    use_gitignore: bool = True
+) -> Iterator[Tuple[str, os.DirEntry]]:
+    """Yield (posix relative path, DirEntry) for each regular file that is not ignored.
+
+    Files are produced while walking, in sorted order per directory;
+    symlinked directories are not followed and oversized files are skipped.
+    """
+    max_file_bytes = max_file_bytes if max_file_bytes is not None else int(
+        os.getenv("PROJECT_MAX_FILE_KB", str(DEFAULT_MAX_FILE_BYTES // 1024))
+    ) * 1024
+    base_rules = [IgnoreRule(pattern) for pattern in (ignore if ignore is not None else default_ignore())]
+
+    # Depth-first with an explicit stack; each directory carries the rules in effect there
+    stack: List[Tuple[str, str, List[IgnoreRule]]] = [(str(project_dir), "", base_rules)]
+    while stack:
+        directory, relative, rules = stack.pop()
+        if use_gitignore:
+            gitignore = Path(directory) / ".gitignore"
+            if gitignore.is_file():
+                rules = rules + parse_ignore_file(gitignore, relative)
+
+        try:
+            with os.scandir(directory) as scan:
+                entries = sorted(scan, key=lambda entry: entry.name)
+        except OSError as e:
+            print(f"Error listing {directory}: {e}")
+            continue
+
+        subdirectories = []
+        for entry in entries:
+            path = f"{relative}/{entry.name}" if relative else entry.name
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+                if is_ignored(rules, path, entry.name, is_dir):
+                    continue
+                if is_dir:
+                    subdirectories.append((entry.path, path, rules))
+                elif entry.is_file() and (not max_file_bytes or entry.stat().st_size <= max_file_bytes):
+                    yield path, entry
+            except OSError:
+                continue
+        # Reversed so directories are visited in sorted order
+        stack.extend(reversed(subdirectories))
@@ -0,0 +1,115 @@
+import asyncio
+import os
+import time
+from typing import Any, Dict
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local token estimate (~4 characters per token for Gemini)"""
+    return max(1, len(text) // 4)
+
+
+class TokenBucket:
+    """Token bucket that may go into debt for requests larger than its capacity"""
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.level = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.refill_per_second)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until ``amount`` (capped at capacity) is available"""
+        self._refill()
+        needed = min(amount, self.capacity) - self.level
+        return max(0.0, needed / self.refill_per_second)
+
+    def consume(self, amount: float):
+        self._refill()
+        self.level = min(self.capacity, self.level - amount)
+
+
+class RateLimiter:
+    """Client-side requests-per-minute and tokens-per-minute limiter.
+
+    Callers queue (FIFO) until both buckets have room rather than hitting the
+    provider's quota and failing. Each bucket holds ``burst_fraction`` of the
+    target and refills the rest evenly over the minute, so no 60 s window
+    ever exceeds ``utilization`` of the quota. A limit of 0 disables that
+    dimension.
+    """
+
+    def __init__(self, rpm: int = None, tpm: int = None, utilization: float = None, burst_fraction: float = 0.1):
+        self.rpm = rpm if rpm is not None else int(os.getenv("GEMINI_RPM", "60"))
+        self.tpm = tpm if tpm is not None else int(os.getenv("GEMINI_TPM", "1000000"))
+        self.utilization = utilization or float(os.getenv("RATE_LIMIT_UTILIZATION", "0.95"))
+        self.requests = self._bucket(self.rpm, burst_fraction)
+        self.tokens = self._bucket(self.tpm, burst_fraction)
+        self.waiting = 0
+        self.throttled = 0
+        self.total_wait_seconds = 0.0
+        self._lock = asyncio.Lock()
+
+    def _bucket(self, per_minute: int, burst_fraction: float):
+        if per_minute <= 0:
+            return None
+        target = per_minute * self.utilization
+        return TokenBucket(
+            capacity=max(1.0, target * burst_fraction),
+            refill_per_second=target * (1 - burst_fraction) / 60
+        )
+
+    async def acquire(self, tokens: int):
+        """Wait until one request of ``tokens`` estimated tokens fits in both budgets"""
+        self.waiting += 1
+        started = time.monotonic()
+        try:
+            # The lock keeps waiters in arrival order
+            async with self._lock:
+                while True:
+                    delay = max(
+                        self.requests.wait_time(1) if self.requests else 0.0,
+                        self.tokens.wait_time(tokens) if self.tokens else 0.0
+                    )
+                    if delay <= 0:
+                        break
+                    await asyncio.sleep(delay)
+
+                if self.requests:
+                    self.requests.consume(1)
+                if self.tokens:
+                    self.tokens.consume(tokens)
+        finally:
+            self.waiting -= 1
+
+        waited = time.monotonic() - started
+        if waited > 0.01:
+            self.throttled += 1
+            self.total_wait_seconds += waited
+
+    def release(self, tokens: int):
+        """Give back a reservation whose request was never sent"""
+        if self.requests:
+            self.requests.consume(-1)
+        if self.tokens:
+            self.tokens.consume(-tokens)
+
+    def adjust(self, token_delta: int):
+        """Correct the token bucket once actual usage is known"""
+        if self.tokens and token_delta:
+            self.tokens.consume(token_delta)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rpm_limit": self.rpm,
+            "tpm_limit": self.tpm,
+            "utilization": self.utilization,
+            "waiting": self.waiting,
+            "throttled": self.throttled,
+            "total_wait_seconds": round(self.total_wait_seconds, 3),
+        }
@@ -0,0 +1,238 @@
+import asyncio
+import math
+import os
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from google.api_core import exceptions as google_exceptions
+
+T = TypeVar("T")
+
+# Transient provider/network failures worth another attempt
+RETRYABLE_EXCEPTIONS = (
+    google_exceptions.TooManyRequests,
+    google_exceptions.ResourceExhausted,
+    google_exceptions.InternalServerError,
+    google_exceptions.BadGateway,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.GatewayTimeout,
+    google_exceptions.DeadlineExceeded,
+    asyncio.TimeoutError,
+    TimeoutError,
+    ConnectionError,
+)
+
+
+def is_retryable(exc: BaseException) -> bool:
+    return isinstance(exc, RETRYABLE_EXCEPTIONS)
+
+
+class RetryPolicy:
+    """Retry transient failures with capped exponential backoff and full jitter.
+
+    The whole call, including backoff sleeps, is bounded by ``deadline``.
+    ``attempt_timeout`` is for the caller to apply around the provider call
+    itself, so time spent queued on the rate limiter does not count against it.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = None,
+        base_delay: float = None,
+        max_delay: float = None,
+        attempt_timeout: float = None,
+        deadline: float = None,
+    ):
+        self.max_attempts = max_attempts or int(os.getenv("LLM_RETRY_ATTEMPTS", "4"))
+        self.base_delay = base_delay or float(os.getenv("LLM_RETRY_BASE_DELAY", "1.0"))
+        self.max_delay = max_delay or float(os.getenv("LLM_RETRY_MAX_DELAY", "20"))
+        self.attempt_timeout = attempt_timeout or float(os.getenv("LLM_ATTEMPT_TIMEOUT", "90"))
+        self.deadline = deadline or float(os.getenv("LLM_CALL_DEADLINE", "180"))
+        self.retries = 0
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter delay before retry number ``attempt`` (1-based)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    async def run(
+        self,
+        attempt_fn: Callable[[], Awaitable[T]],
+        retry_if: Callable[[BaseException], bool] = is_retryable
+    ) -> T:
+        """Call ``attempt_fn`` until it succeeds, fails permanently, or time runs out"""
+        deadline_at = time.monotonic() + self.deadline
+        attempt = 0
+
+        while True:
+            attempt += 1
+            remaining = deadline_at - time.monotonic()
+            try:
+                return await asyncio.wait_for(attempt_fn(), timeout=remaining)
+            except Exception as e:
+                if attempt >= self.max_attempts or not retry_if(e):
+                    raise
+
+                delay = self.backoff(attempt)
+                if time.monotonic() + delay >= deadline_at:
+                    raise
+
+                self.retries += 1
+                print(f"⚠️  LLM call failed ({type(e).__name__}: {e}), retry {attempt}/{self.max_attempts - 1} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+
+class LatencyTracker:
+    """Rolling window of call latencies for percentile estimates"""
+
+    def __init__(self, window: int = 200):
+        self.samples = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(fraction * len(ordered)))
+        return ordered[index]
+
+
+class Hedger:
+    """Fire a backup request when the first has not answered by the observed p95.
+
+    Disabled unless LLM_HEDGE=1, and only active once ``min_samples``
+    latencies have been observed. The first successful result wins; the
+    loser is cancelled (its worker thread still runs to completion).
+    """
+
+    def __init__(self, latency: LatencyTracker, enabled: bool = None, min_samples: int = None):
+        self.latency = latency
+        self.enabled = enabled if enabled is not None else os.getenv("LLM_HEDGE", "0") == "1"
+        self.min_samples = min_samples or int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def delay(self) -> Optional[float]:
+        if not self.enabled or len(self.latency.samples) < self.min_samples:
+            return None
+        return self.latency.percentile(0.95)
+
+    async def run(self, call: Callable[[], Awaitable[T]]) -> T:
+        delay = self.delay()
+        primary = asyncio.ensure_future(call())
+        if delay is None:
+            return await primary
+
+        pending = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if done:
+                return primary.result()
+
+            self.hedged += 1
+            backup = asyncio.ensure_future(call())
+            pending = {primary, backup}
+
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is backup:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the provider while the circuit is open"""
+
+
+class CircuitBreaker:
+    """Stop calling a failing or very slow provider for a cool-down period.
+
+    ``failure_threshold`` consecutive failures (attempts slower than
+    ``slow_call_seconds`` count as failures) open the circuit for
+    ``open_seconds``. After that a single probe call is let through
+    (half-open); its outcome closes or re-opens the circuit.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = None, slow_call_seconds: float = None, open_seconds: float = None):
+        self.failure_threshold = failure_threshold or int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+        self.slow_call_seconds = slow_call_seconds or float(os.getenv("LLM_BREAKER_SLOW_SECONDS", "60"))
+        self.open_seconds = open_seconds or float(os.getenv("LLM_BREAKER_OPEN_SECONDS", "30"))
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.times_opened = 0
+        self.rejected = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    def before_call(self) -> bool:
+        """Raise CircuitOpenError unless a call may go through now; True if it is the half-open probe"""
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.open_seconds:
+                self.rejected += 1
+                raise CircuitOpenError("LLM circuit is open")
+            self.state = self.HALF_OPEN
+
+        if self.state == self.HALF_OPEN:
+            if self._probe_in_flight:
+                self.rejected += 1
+                raise CircuitOpenError("LLM circuit is half-open, probe in flight")
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def recheck(self, probe: bool):
+        """Raise CircuitOpenError if the circuit left the closed state while this call was queued"""
+        if not probe and self.state != self.CLOSED:
+            self.rejected += 1
+            raise CircuitOpenError(f"LLM circuit is {self.state}")
+
+    def record_success(self, latency: float):
+        if latency > self.slow_call_seconds:
+            self.record_failure()
+            return
+        self._probe_in_flight = False
+        self.consecutive_failures = 0
+        self.state = self.CLOSED
+
+    def record_failure(self):
+        self._probe_in_flight = False
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.times_opened += 1
+                print(f"🔌 LLM circuit opened after {self.consecutive_failures} failure(s)")
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+    def retry_after(self) -> int:
+        """Seconds until the circuit lets a probe through (at least 1)"""
+        if self.state != self.OPEN:
+            return 1
+        return max(1, math.ceil(self.open_seconds - (time.monotonic() - self._opened_at)))
+
+    def abandon(self):
+        """A call was cancelled without an outcome; let another probe through"""
+        self._probe_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+        }
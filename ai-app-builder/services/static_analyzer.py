@@ -0,0 +1,330 @@
+"""Deterministic project analysis from ast, no LLM involved.
+
+Finds the web framework and its routes (FastAPI/Flask decorators), the
+SQLAlchemy models, the database from engine URLs and drivers, the local
+import graph and per-function cyclomatic complexity, and turns them into a
+CodeAnalysis-shaped dict. Needs no LLM call, so it backs the fast mode
+of /analyze-existing and gives the LLM verified facts in the slow mode;
+it is still CPU-bound and linear in project size, so callers run it off
+the event loop.
+"""
+import ast
+import re
+from collections import Counter
+from pathlib import PurePosixPath
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from code_outline import RISKY_CALLS, cyclomatic_complexity, parse_source
+
+HTTP_METHODS = {"get", "post", "put", "patch", "delete", "head", "options", "websocket"}
+
+FRAMEWORKS = {"fastapi": "FastAPI", "flask": "Flask", "django": "Django", "starlette": "Starlette"}
+
+# Driver modules and URL schemes that reveal the database in use
+DATABASE_MODULES = {
+    "sqlite3": "SQLite", "aiosqlite": "SQLite",
+    "psycopg2": "PostgreSQL", "psycopg": "PostgreSQL", "asyncpg": "PostgreSQL",
+    "pymysql": "MySQL", "mysql": "MySQL", "aiomysql": "MySQL",
+    "pymongo": "MongoDB", "motor": "MongoDB", "redis": "Redis",
+}
+_DATABASE_URL = re.compile(r"\b(sqlite|postgres(?:ql)?|mysql|mariadb|mongodb(?:\+srv)?|redis)(?:\+\w+)?://", re.I)
+_URL_NAMES = {
+    "sqlite": "SQLite", "postgres": "PostgreSQL", "postgresql": "PostgreSQL", "mysql": "MySQL",
+    "mariadb": "MySQL", "mongodb": "MongoDB", "mongodb+srv": "MongoDB", "redis": "Redis",
+}
+
+# Functions above this complexity are reported as issues
+COMPLEX_FUNCTION = 10
+
+
+def _name(node: ast.AST) -> str:
+    """Dotted name of a Name/Attribute chain, '' for anything else"""
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        base = _name(node.value)
+        return f"{base}.{node.attr}" if base else node.attr
+    return ""
+
+
+def module_name(path: str) -> str:
+    """'app/routers/items.py' -> 'app.routers.items' ('pkg/__init__.py' -> 'pkg')"""
+    parts = list(PurePosixPath(path.replace("\\", "/")).with_suffix("").parts)
+    if parts and parts[-1] == "__init__":
+        parts.pop()
+    return ".".join(parts)
+
+
+def extract_routes(tree: ast.AST) -> List[str]:
+    """'METHOD /path' for FastAPI (@app.get, @router.post) and Flask (@app.route) handlers"""
+    routes = []
+    for node in ast.walk(tree):
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        for decorator in node.decorator_list:
+            if not isinstance(decorator, ast.Call) or not isinstance(decorator.func, ast.Attribute):
+                continue
+            verb = decorator.func.attr
+            path = decorator.args[0].value if (
+                decorator.args and isinstance(decorator.args[0], ast.Constant) and isinstance(decorator.args[0].value, str)
+            ) else None
+            if path is None:
+                continue
+            if verb in HTTP_METHODS:
+                routes.append(f"{verb.upper()} {path}")
+            elif verb == "route":
+                methods = ["GET"]
+                for keyword in decorator.keywords:
+                    if keyword.arg == "methods" and isinstance(keyword.value, (ast.List, ast.Tuple, ast.Set)):
+                        methods = [
+                            element.value.upper() for element in keyword.value.elts
+                            if isinstance(element, ast.Constant) and isinstance(element.value, str)
+                        ] or methods
+                routes.extend(f"{method} {path}" for method in methods)
+    return routes
+
+
+def extract_models(tree: ast.AST) -> Tuple[List[str], List[str]]:
+    """(SQLAlchemy models, pydantic schemas) defined in a module"""
+    models, schemas = [], []
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.ClassDef) or node.name == "Base":
+            continue
+        bases = {_name(base).split(".")[-1] for base in node.bases}
+        assigned = {
+            target.id for child in node.body if isinstance(child, ast.Assign)
+            for target in child.targets if isinstance(target, ast.Name)
+        }
+        columns = any(
+            isinstance(child, (ast.Assign, ast.AnnAssign)) and isinstance(child.value, ast.Call)
+            and _name(child.value.func).split(".")[-1] in ("Column", "mapped_column", "relationship")
+            for child in node.body
+        )
+        if "__tablename__" in assigned or columns or bases & {"Base", "DeclarativeBase", "Model"}:
+            models.append(node.name)
+        elif bases & {"BaseModel", "BaseSettings"}:
+            schemas.append(node.name)
+    return models, schemas
+
+
+def _is_risky(call: ast.Call) -> bool:
+    """eval/exec/os.system style calls, shell=True, and SQL built with string formatting"""
+    name = _name(call.func).split(".")[-1]
+    if any(
+        keyword.arg == "shell" and not (isinstance(keyword.value, ast.Constant) and not keyword.value.value)
+        for keyword in call.keywords
+    ):
+        return True
+    if name in ("execute", "executescript"):
+        query = call.args[0] if call.args else None
+        return isinstance(query, (ast.JoinedStr, ast.BinOp)) or (
+            isinstance(query, ast.Call) and isinstance(query.func, ast.Attribute) and query.func.attr == "format"
+        )
+    return name in RISKY_CALLS
+
+
+def _local_imports(tree: ast.AST, module: str, is_package: bool, local: Set[str]) -> Set[str]:
+    """Local modules a module imports, resolving relative imports"""
+    package = module.split(".") if is_package else module.split(".")[:-1]
+    targets = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            candidates = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                base = package[:len(package) - node.level + 1] if node.level > 1 else package
+                prefix = ".".join(base + ([node.module] if node.module else []))
+            else:
+                prefix = node.module or ""
+            # "from pkg import mod" may import a submodule rather than a name
+            candidates = [prefix] + [f"{prefix}.{alias.name}" if prefix else alias.name for alias in node.names]
+        else:
+            continue
+        for candidate in candidates:
+            # Longest local module the dotted name starts with
+            parts = candidate.split(".")
+            for end in range(len(parts), 0, -1):
+                name = ".".join(parts[:end])
+                if name in local and name != module:
+                    targets.add(name)
+                    break
+    return targets
+
+
+def find_cycles(graph: Dict[str, List[str]]) -> List[List[str]]:
+    """Import cycles, each listed once starting from its smallest module name"""
+    cycles, seen = [], set()
+    state: Dict[str, int] = {}
+    stack: List[str] = []
+
+    def visit(node: str):
+        state[node] = 1
+        stack.append(node)
+        for target in graph.get(node, []):
+            if state.get(target) == 1:
+                cycle = stack[stack.index(target):]
+                start = cycle.index(min(cycle))
+                key = tuple(cycle[start:] + cycle[:start])
+                if key not in seen:
+                    seen.add(key)
+                    cycles.append(list(key))
+            elif target not in state:
+                visit(target)
+        stack.pop()
+        state[node] = 2
+
+    for node in sorted(graph):
+        if node not in state:
+            visit(node)
+    return cycles
+
+
+def _architecture(framework: Optional[str], modules: Set[str], routes: Dict[str, List[str]]) -> str:
+    stems = {name.split(".")[-1] for name in modules}
+    layers = [layer for layer in ("models", "schemas", "crud", "services", "routers", "api") if layer in stems]
+    prefix = framework or "Python"
+    if len(layers) >= 2:
+        return f"{prefix} layered ({', '.join(layers)})"
+    if len(modules) <= 1 or len(routes) <= 1 and len(modules) <= 3:
+        return f"{prefix} single module" if framework else "Python script"
+    return f"{prefix} modular"
+
+
+def _complexity_score(functions: List[int], modules: int) -> int:
+    """1-10 from total branching, the worst function and the module count"""
+    if not functions:
+        return 1
+    score = 1 + min(4, sum(functions) // 50) + min(3, max(0, max(functions) - 5) // 5) + min(2, modules // 10)
+    return min(10, score)
+
+
+def analyze_project(files: Dict[str, str]) -> Dict[str, Any]:
+    """CodeAnalysis fields computed from the project files alone"""
+    python = {name: code for name, code in files.items() if name.endswith(".py")}
+    local = {module_name(name): name for name in python}
+
+    trees, unparsable = {}, []
+    for name, code in python.items():
+        try:
+            trees[name] = parse_source(code)
+        except (SyntaxError, ValueError):
+            unparsable.append(name)
+
+    frameworks: Counter = Counter()
+    databases: Counter = Counter()
+    routes: Dict[str, List[str]] = {}
+    models: Dict[str, List[str]] = {}
+    schemas: Dict[str, List[str]] = {}
+    graph: Dict[str, List[str]] = {}
+    functions: List[Tuple[int, str]] = []
+    risky: List[str] = []
+
+    for name, tree in trees.items():
+        module = module_name(name)
+        for node in ast.walk(tree):
+            if isinstance(node, (ast.Import, ast.ImportFrom)):
+                imported = [alias.name for alias in node.names] if isinstance(node, ast.Import) else [node.module or ""]
+                for root in (item.split(".")[0] for item in imported):
+                    if root in FRAMEWORKS:
+                        frameworks[FRAMEWORKS[root]] += 1
+                    if root in DATABASE_MODULES:
+                        databases[DATABASE_MODULES[root]] += 1
+            elif isinstance(node, ast.Constant) and isinstance(node.value, str):
+                for scheme in _DATABASE_URL.findall(node.value):
+                    databases[_URL_NAMES[scheme.lower()]] += 2
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                functions.append((cyclomatic_complexity(node), f"{name}:{node.name}"))
+            elif isinstance(node, ast.Call) and _is_risky(node):
+                risky.append(f"{name}:{node.lineno} {_name(node.func).split('.')[-1]}()")
+
+        file_routes = extract_routes(tree)
+        if file_routes:
+            routes[name] = file_routes
+        file_models, file_schemas = extract_models(tree)
+        if file_models:
+            models[name] = file_models
+        if file_schemas:
+            schemas[name] = file_schemas
+        graph[module] = sorted(_local_imports(tree, module, name.endswith("__init__.py"), set(local)))
+
+    # Models imply SQLAlchemy even when no URL or driver shows which database
+    framework = frameworks.most_common(1)[0][0] if frameworks else None
+    database = databases.most_common(1)[0][0] if databases else ("SQLAlchemy (unknown database)" if models else "none detected")
+
+    components = []
+    for name in sorted(python):
+        roles = []
+        if name in routes:
+            roles.append(f"{len(routes[name])} routes")
+        if name in models:
+            roles.append(f"models: {', '.join(models[name])}")
+        if name in schemas:
+            roles.append(f"{len(schemas[name])} schemas")
+        if roles:
+            components.append(f"{name} ({'; '.join(roles)})")
+    if not components:
+        components = sorted(python, key=lambda name: len(python[name]), reverse=True)[:5]
+
+    cycles = find_cycles(graph)
+    complex_functions = sorted((item for item in functions if item[0] > COMPLEX_FUNCTION), reverse=True)
+    route_count = sum(len(items) for items in routes.values())
+
+    issues, suggestions = [], []
+    for complexity, function in complex_functions[:5]:
+        issues.append(f"{function} has cyclomatic complexity {complexity}")
+    if complex_functions:
+        suggestions.append("Split the most complex functions into smaller helpers")
+    for call in risky[:5]:
+        issues.append(f"Risky call {call}")
+    if risky:
+        suggestions.append("Replace eval/exec/shell calls and string-built SQL with safe alternatives and bound parameters")
+    for cycle in cycles[:3]:
+        issues.append(f"Import cycle: {' -> '.join(cycle + cycle[:1])}")
+    if cycles:
+        suggestions.append("Break import cycles by moving shared code into its own module")
+    for name in unparsable:
+        issues.append(f"{name} does not parse")
+    if route_count and not any(PurePosixPath(name).name.startswith("test") for name in python):
+        issues.append("No tests found")
+        suggestions.append("Add API tests for the main routes")
+    if python and "requirements.txt" not in {PurePosixPath(name).name for name in files}:
+        suggestions.append("Pin dependencies in requirements.txt")
+
+    return {
+        "current_structure": {
+            "files_count": len(files),
+            "main_components": components,
+            "architecture_pattern": _architecture(framework, set(local), routes),
+            "database_used": database,
+            "framework": framework or "none detected",
+            "routes": routes,
+            "models": models,
+            "schemas": schemas,
+            "import_graph": {module: targets for module, targets in graph.items() if targets},
+            "import_cycles": cycles,
+            "lines": sum(len(code.splitlines()) for code in python.values()),
+            "functions": len(functions),
+            "max_function_complexity": max((item[0] for item in functions), default=0),
+        },
+        "identified_issues": issues,
+        "improvement_suggestions": suggestions,
+        "complexity_score": _complexity_score([item[0] for item in functions], len(python)),
+    }
+
+
+def prompt_facts(analysis: Dict[str, Any], max_items: int = 40) -> Dict[str, Any]:
+    """The static analysis trimmed for an LLM prompt (long route lists and the import graph cut)"""
+    structure = analysis["current_structure"]
+    routes = [route for items in structure["routes"].values() for route in items]
+    return {
+        "files_count": structure["files_count"],
+        "framework": structure["framework"],
+        "architecture_pattern": structure["architecture_pattern"],
+        "database_used": structure["database_used"],
+        "routes": routes[:max_items] + ([f"... {len(routes) - max_items} more"] if len(routes) > max_items else []),
+        "models": structure["models"],
+        "import_cycles": structure["import_cycles"],
+        "max_function_complexity": structure["max_function_complexity"],
+        "static_complexity_score": analysis["complexity_score"],
+        "static_issues": analysis["identified_issues"],
+    }
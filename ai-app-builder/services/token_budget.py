@@ -0,0 +1,181 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+
+class TokenBudgetExceeded(Exception):
+    """A prompt or project is over its token budget; maps to 413"""
+
+    def __init__(self, scope: str, tokens: int, limit: int, project: Optional[str] = None):
+        if scope == "request":
+            detail = (
+                f"Prompt is ~{tokens} tokens, over the {limit} token limit per request. "
+                "Narrow the request or split the project."
+            )
+        else:
+            detail = f"Project {project} would use ~{tokens} tokens, over its {limit} token budget."
+        super().__init__(detail)
+        self.scope = scope
+        self.tokens = tokens
+        self.limit = limit
+        self.project = project
+        self.detail = detail
+
+
+# (project, endpoint) the current LLM calls are billed to
+_usage_scope: ContextVar[Tuple[Optional[str], Optional[str]]] = ContextVar("usage_scope", default=(None, None))
+
+
+@contextmanager
+def usage_scope(project: Optional[str] = None, endpoint: Optional[str] = None) -> Iterator[None]:
+    """Bill LLM calls made in this block (and tasks it spawns) to project/endpoint"""
+    token = _usage_scope.set((project, endpoint))
+    try:
+        yield
+    finally:
+        _usage_scope.reset(token)
+
+
+class UsageLedger:
+    """Token budgets and cumulative usage per project and per endpoint.
+
+    ``max_prompt_tokens`` caps a single prompt (LLM_MAX_PROMPT_TOKENS) and
+    ``project_budget`` caps the tokens one project may use per window of
+    ``window_seconds`` (PROJECT_TOKEN_BUDGET, PROJECT_TOKEN_BUDGET_WINDOW_SECONDS,
+    a day by default); 0 disables either, and a 0 window never resets. Prompts
+    are counted with the local estimate before sending; recorded usage is what
+    the provider reports when it does. Concurrent calls for the same project
+    are checked independently, so a project can overshoot by a few calls.
+    At most ``max_tracked`` projects (and endpoints) are kept, least recently
+    used first out; an evicted project starts a fresh window.
+    """
+
+    def __init__(
+        self,
+        max_prompt_tokens: int = None,
+        project_budget: int = None,
+        window_seconds: float = None,
+        max_tracked: int = None
+    ):
+        self.max_prompt_tokens = (
+            max_prompt_tokens if max_prompt_tokens is not None else int(os.getenv("LLM_MAX_PROMPT_TOKENS", "200000"))
+        )
+        self.project_budget = (
+            project_budget if project_budget is not None else int(os.getenv("PROJECT_TOKEN_BUDGET", "2000000"))
+        )
+        self.window_seconds = (
+            window_seconds if window_seconds is not None
+            else float(os.getenv("PROJECT_TOKEN_BUDGET_WINDOW_SECONDS", "86400"))
+        )
+        self.max_tracked = max_tracked or int(os.getenv("USAGE_MAX_TRACKED", "1000"))
+        self._projects: "OrderedDict[str, Dict[str, float]]" = OrderedDict()
+        self._endpoints: "OrderedDict[str, Dict[str, int]]" = OrderedDict()
+        self._totals = self._empty()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    @staticmethod
+    def _empty() -> Dict[str, int]:
+        return {"calls": 0, "prompt_tokens": 0, "output_tokens": 0, "cached_calls": 0, "rejected": 0}
+
+    def _expired(self, entry: Dict[str, float], now: float) -> bool:
+        return bool(self.window_seconds) and now - entry["window_start"] >= self.window_seconds
+
+    def _project_usage(self, project: str) -> Dict[str, float]:
+        """Current-window usage for a project without creating or refreshing it"""
+        entry = self._projects.get(project)
+        if entry is None or self._expired(entry, time.time()):
+            return {**self._empty(), "window_start": time.time()}
+        return entry
+
+    def _touch(self, table: "OrderedDict[str, Dict[str, int]]", key: str, windowed: bool) -> Dict[str, int]:
+        entry = table.get(key)
+        now = time.time()
+        if entry is None or (windowed and self._expired(entry, now)):
+            entry = {**self._empty(), "window_start": now} if windowed else self._empty()
+            table[key] = entry
+        table.move_to_end(key)
+        while len(table) > self.max_tracked:
+            table.popitem(last=False)
+            self.evictions += 1
+        return entry
+
+    def _entries(self) -> Iterator[Dict[str, int]]:
+        project, endpoint = _usage_scope.get()
+        yield self._totals
+        if project:
+            yield self._touch(self._projects, project, windowed=True)
+        if endpoint:
+            yield self._touch(self._endpoints, endpoint, windowed=False)
+
+    def _reject(self, error: TokenBudgetExceeded):
+        with self._lock:
+            for entry in self._entries():
+                entry["rejected"] += 1
+        raise error
+
+    def check_prompt(self, prompt_tokens: int):
+        """Raise TokenBudgetExceeded if one prompt is too large to send"""
+        if self.max_prompt_tokens and prompt_tokens > self.max_prompt_tokens:
+            self._reject(TokenBudgetExceeded("request", prompt_tokens, self.max_prompt_tokens))
+
+    def check_project(self, prompt_tokens: int):
+        """Raise TokenBudgetExceeded if this call would take the current project over budget"""
+        project, _ = _usage_scope.get()
+        if not self.project_budget or not project:
+            return
+        with self._lock:
+            used = self._project_usage(project)
+            spent = used["prompt_tokens"] + used["output_tokens"]
+        if spent + prompt_tokens > self.project_budget:
+            self._reject(TokenBudgetExceeded("project", spent + prompt_tokens, self.project_budget, project))
+
+    def record(self, prompt_tokens: int, output_tokens: int):
+        """Add one provider call's usage to the current project/endpoint"""
+        with self._lock:
+            for entry in self._entries():
+                entry["calls"] += 1
+                entry["prompt_tokens"] += prompt_tokens
+                entry["output_tokens"] += output_tokens
+
+    def record_cached(self):
+        """Count a call answered from cache (no tokens spent)"""
+        with self._lock:
+            for entry in self._entries():
+                entry["cached_calls"] += 1
+
+    def stats(self, project: Optional[str] = None) -> Dict[str, Any]:
+        with self._lock:
+            if project is not None:
+                used = dict(self._project_usage(project))
+                if self.project_budget:
+                    used["budget"] = self.project_budget
+                    used["remaining"] = max(0, self.project_budget - used["prompt_tokens"] - used["output_tokens"])
+                if self.window_seconds:
+                    used["window_resets_at"] = int(used["window_start"] + self.window_seconds)
+                return used
+            return {
+                "limits": {
+                    "max_prompt_tokens": self.max_prompt_tokens,
+                    "project_budget": self.project_budget,
+                    "window_seconds": self.window_seconds,
+                },
+                "total": dict(self._totals),
+                "endpoints": {name: dict(entry) for name, entry in self._endpoints.items()},
+                "projects": {name: dict(self._project_usage(name)) for name in self._projects},
+                "evictions": self.evictions,
+            }
+
+    def reset(self, project: Optional[str] = None):
+        """Start a fresh budget window for one project, or clear all usage"""
+        with self._lock:
+            if project is not None:
+                self._projects.pop(project, None)
+                return
+            self._projects.clear()
+            self._endpoints.clear()
+            self._totals = self._empty()
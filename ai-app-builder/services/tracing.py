@@ -0,0 +1,135 @@
+"""Per-request tracing with a local JSON-lines exporter.
+
+Spans nest through a context variable, so spans opened in tasks spawned
+while handling a request (pipeline tasks, LLM attempts) join that
+request's trace. Finished spans are appended to TRACE_EXPORT_PATH, one
+JSON object per line, by a background thread. Without a path spans are
+still created (trace IDs are returned to clients) but nothing is written.
+
+    jq -c 'select(.trace_id == "<id>")' traces.jsonl
+"""
+import asyncio
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+
+class Span:
+    """One timed operation; ``set`` adds attributes while it is open"""
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes = dict(attributes)
+        self.status = "ok"
+        self.error: Optional[str] = None
+        self.start_time = time.time()
+        self.duration_ms: Optional[float] = None
+        self._started = time.perf_counter()
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def finish(self):
+        self.duration_ms = round((time.perf_counter() - self._started) * 1000, 3)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_time": self.start_time,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+class JsonLinesExporter:
+    """Appends finished spans to a file from a daemon thread, off the event loop"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                    self._thread.start()
+        self._queue.put(span.to_dict())
+
+    def _run(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a", encoding="utf-8") as f:
+            while True:
+                record = self._queue.get()
+                f.write(json.dumps(record, default=str) + "\n")
+                # Flush once the backlog is written so the file is tail-able
+                if self._queue.empty():
+                    f.flush()
+
+
+class Tracer:
+    def __init__(self, exporter: Optional[JsonLinesExporter] = None):
+        self.exporter = exporter
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span]:
+        """Open a child of the current span (or a new trace) for the enclosed block"""
+        parent = _current_span.get()
+        span = Span(
+            name,
+            trace_id=parent.trace_id if parent else uuid.uuid4().hex,
+            parent_id=parent.span_id if parent else None,
+            attributes=attributes
+        )
+        token = _current_span.set(span)
+        try:
+            yield span
+        except asyncio.CancelledError:
+            span.status = "cancelled"
+            raise
+        except BaseException as e:
+            span.status = "error"
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_span.reset(token)
+            span.finish()
+            if self.exporter is not None:
+                self.exporter.export(span)
+
+
+def create_tracer() -> Tracer:
+    path = os.getenv("TRACE_EXPORT_PATH")
+    return Tracer(JsonLinesExporter(path) if path else None)
+
+
+tracer = create_tracer()
+
+
+def span(name: str, **attributes):
+    """``with span("name", key=value) as s:`` on the process-wide tracer"""
+    return tracer.span(name, **attributes)
@@ -42,7 +42,9 @@ def start_service():
     from dotenv import load_dotenv
     load_dotenv()
     
-    if not os.getenv("GEMINI_API_KEY") or os.getenv("GEMINI_API_KEY") == "your_gemini_api_key_here":
+    # The offline stand-in provider needs no API key
+    uses_gemini = os.getenv("LLM_PROVIDER", "gemini").lower() == "gemini"
+    if uses_gemini and (not os.getenv("GEMINI_API_KEY") or os.getenv("GEMINI_API_KEY") == "your_gemini_api_key_here"):
         print("❌ Please set your GEMINI_API_KEY in .env file")
         print("🔗 Get your API key from: https://makersuite.google.com/app/apikey")
         return
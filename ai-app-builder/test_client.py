@@ -1,11 +1,18 @@
 import requests
 import json
 
+from enhancement_client import iter_sse_events
+
+# Test prompts dalam bahasa Indonesia (also the request mix used by load_test.py)
+GENERATION_PROMPT = "Buatkan backend service dengan FastAPI untuk sistem e-commerce dengan authentication JWT, PostgreSQL database, dan fitur CRUD untuk products, users, dan orders. Sertakan juga Redis untuk caching. Pastikan semua library ter input dengan benar dan pastikan aplikasi dapat berjalan dengan baik."
+ANALYSIS_PROMPT = "Buat REST API untuk blog dengan authentication dan comment system"
+STREAM_PROMPT = "Buat REST API untuk manajemen inventaris dengan PostgreSQL dan CRUD untuk products dan suppliers"
+ENHANCEMENT_REQUEST = "Tambahkan fitur search dan pagination untuk semua endpoint list"
+
 def test_app_generation():
     """Test the app generation service with Gemini"""
     
-    # Test prompt dalam bahasa Indonesia
-    prompt = "Buatkan backend service dengan FastAPI untuk sistem e-commerce dengan authentication JWT, PostgreSQL database, dan fitur CRUD untuk products, users, dan orders. Sertakan juga Redis untuk caching. Pastikan semua library ter input dengan benar dan pastikan aplikasi dapat berjalan dengan baik."
+    prompt = GENERATION_PROMPT
     
     print("🚀 Testing AI App Builder with Gemini...")
     print(f"📝 Prompt: {prompt}")
@@ -47,7 +54,7 @@ def test_app_generation():
 def test_analysis_only():
     """Test just the analysis feature"""
     
-    prompt = "Buat REST API untuk blog dengan authentication dan comment system"
+    prompt = ANALYSIS_PROMPT
     
     print("\n🔍 Testing analysis only...")
     
@@ -66,6 +73,43 @@ def test_analysis_only():
     except requests.exceptions.RequestException as e:
         print(f"❌ Connection error: {e}")
 
+def test_app_generation_stream():
+    """Test streaming generation: progress should start arriving within seconds"""
+    
+    prompt = STREAM_PROMPT
+    
+    print("\n📡 Testing streaming generation...")
+    
+    try:
+        # Read timeout applies between events, not to the whole generation
+        with requests.post("http://localhost:8000/generate/stream", json={
+            "prompt": prompt,
+            "project_name": "inventory_stream"
+        }, stream=True, timeout=(10, 60)) as response:
+            if response.status_code != 200:
+                print(f"❌ Error: {response.status_code}")
+                print(f"📝 Response: {response.text}")
+                return
+            
+            chunk_counts = {}
+            for event, data in iter_sse_events(response):
+                if event == "file_chunk":
+                    chunk_counts[data["file"]] = chunk_counts.get(data["file"], 0) + 1
+                elif event == "file_written":
+                    print(f"📄 {data['file']} ({data['bytes']} bytes, {chunk_counts.get(data['file'], 0)} chunks)")
+                elif event == "error":
+                    print(f"❌ Error: {data['detail']}")
+                    return
+                elif event == "done":
+                    print("✅ App generated successfully!")
+                    print(f"📁 Project path: {data['project_path']}")
+                else:
+                    print(f"📨 {event}")
+                    
+    except requests.exceptions.RequestException as e:
+        print(f"❌ Connection error: {e}")
+
 if __name__ == "__main__":
     test_analysis_only()
-    test_app_generation()
\ No newline at end of file
+    test_app_generation()
+    test_app_generation_stream()
\ No newline at end of file
@@ -0,0 +1,57 @@
+import os
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+# Services are imported flat, as main.py does
+for directory in (ROOT_DIR / "services", ROOT_DIR / "benchmarks"):
+    if str(directory) not in sys.path:
+        sys.path.insert(0, str(directory))
+
+
+@pytest.fixture(scope="session")
+def main_module(tmp_path_factory):
+    """services/main.py imported against the fake LLM, as the benchmarks do"""
+    from harness import load_app
+    # A fast stand-in; the tests exercise the service, not provider latency
+    os.environ.setdefault("FAKE_LLM_LATENCY_MS", "5")
+    os.environ.setdefault("FAKE_LLM_TOKENS_PER_SECOND", "1000000")
+    return load_app(tmp_path_factory.mktemp("generated_apps"))
+
+
+class FakeClock:
+    """Manual clock for time.time/time.monotonic; its sleep() advances it instead of waiting"""
+
+    def __init__(self, now: float = 0.0):
+        self.now = now
+        self.sleeps = []
+
+    def time(self) -> float:
+        return self.now
+
+    monotonic = time
+
+    async def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def fake_clock(monkeypatch):
+    """install(module, now=0.0, sleep=False): put a FakeClock behind module's time (and asyncio.sleep)"""
+    def install(module: str, now: float = 0.0, sleep: bool = False) -> FakeClock:
+        clock = FakeClock(now)
+        # Only this module sees the fake time; the event loop keeps the real clock
+        monkeypatch.setattr(f"{module}.time", SimpleNamespace(**{
+            **vars(time), "time": clock.time, "monotonic": clock.monotonic
+        }))
+        if sleep:
+            monkeypatch.setattr(f"{module}.asyncio.sleep", clock.sleep)
+        return clock
+
+    return install
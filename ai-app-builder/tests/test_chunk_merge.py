@@ -0,0 +1,142 @@
+import asyncio
+
+from code_outline import chunk_outline
+from rate_limit import estimate_tokens
+
+
+def sections_of(sizes):
+    """Outline sections named f0, f1, ... of roughly the given token sizes"""
+    return {f"f{index}": "x" * (size * 4) for index, size in enumerate(sizes)}
+
+
+def test_empty_project_still_gets_one_chunk():
+    assert chunk_outline({}, {}, 100) == [("", {})]
+
+
+def test_small_project_fits_in_one_chunk():
+    sections = sections_of([10, 20, 30])
+    chunks = chunk_outline(sections, {}, 100)
+    assert len(chunks) == 1
+    assert chunks[0][0] == "\n\n".join(sections.values())
+
+
+def test_chunks_respect_the_token_limit_and_keep_file_order():
+    sections = sections_of([40, 40, 40, 40, 40])
+    chunks = chunk_outline(sections, {}, 100)
+    assert len(chunks) == 3
+    assert all(estimate_tokens(outline) <= 100 for outline, _ in chunks)
+    assert "\n\n".join(outline for outline, _ in chunks) == "\n\n".join(sections.values())
+
+
+def test_oversized_file_gets_a_chunk_of_its_own():
+    chunks = chunk_outline(sections_of([10, 500, 10]), {}, 100)
+    assert [estimate_tokens(outline) for outline, _ in chunks] == [10, 500, 10]
+
+
+def test_hotspot_source_travels_with_its_section_and_counts_against_the_limit():
+    sections = sections_of([30, 30, 30])
+    hotspots = {"f1": "y" * 4 * 60}
+    chunks = chunk_outline(sections, hotspots, 100)
+    # f1 costs 90 tokens with its source, so it fits beside neither neighbour
+    assert chunks == [
+        (sections["f0"], {}),
+        (sections["f1"], {"f1": hotspots["f1"]}),
+        (sections["f2"], {}),
+    ]
+
+
+def analysis(main, components, pattern, database, issues, suggestions, complexity):
+    return main.CodeAnalysis(
+        current_structure={
+            "main_components": components,
+            "architecture_pattern": pattern,
+            "database_used": database,
+        },
+        identified_issues=issues,
+        improvement_suggestions=suggestions,
+        complexity_score=complexity,
+    )
+
+
+def test_merge_of_nothing_is_none(main_module):
+    assert main_module.EnhancementService._merge_analyses([], 3) is None
+
+
+def test_merge_deduplicates_and_weights_complexity(main_module):
+    merge = main_module.EnhancementService._merge_analyses
+    parts = [
+        (analysis(main_module, ["api", "models"], "layered", "sqlite", ["No tests"], ["Add tests"], 2), 300),
+        (analysis(main_module, ["API ", "crud"], "layered", "string", ["no tests", "SQL in routes"], ["Add tests"], 8), 100),
+        (analysis(main_module, [], "mvc", "", [], ["Use Alembic"], 10), 0),
+    ]
+
+    merged = merge(parts, 12)
+
+    assert merged.current_structure == {
+        "files_count": 12,
+        "main_components": ["api", "models", "crud"],
+        "architecture_pattern": "layered",
+        # Placeholder values ("string", "") do not outvote real answers
+        "database_used": "sqlite",
+        "analyzed_chunks": 3,
+    }
+    assert merged.identified_issues == ["No tests", "SQL in routes"]
+    assert merged.improvement_suggestions == ["Add tests", "Use Alembic"]
+    # (2 * 300 + 8 * 100 + 10 * 0) / 400
+    assert merged.complexity_score == 4
+
+
+def test_merge_clamps_complexity_and_reports_unknowns(main_module):
+    part = analysis(main_module, [], "", None, [], [], 0)
+    merged = main_module.EnhancementService._merge_analyses([(part, 0)], 1)
+    assert merged.complexity_score == 1
+    assert merged.current_structure["architecture_pattern"] == "unknown"
+    assert merged.current_structure["database_used"] == "unknown"
+
+
+def analyze_with_failures(main, project, failing_parts, chunk_tokens):
+    """Run analyze_existing_code with the given chunk numbers failing; return (analysis, report)"""
+    service = main.EnhancementService()
+    service.chunk_tokens = chunk_tokens
+
+    async def fake_chunk(prompt, part=None):
+        if (part or 1) in failing_parts:
+            return None
+        return analysis(main, [f"part {part}"], "layered", "sqlite", [], [], 5)
+
+    service._analyze_chunk = fake_chunk
+    report = {}
+    try:
+        result = asyncio.run(service.analyze_existing_code(str(project), report=report))
+    finally:
+        service.shutdown()
+    return result, report
+
+
+def write_modules(root, count):
+    for index in range(count):
+        body = "\n".join(f"def handler_{index}_{n}(request):\n    return request\n" for n in range(40))
+        (root / f"module_{index}.py").write_text(body)
+
+
+def test_full_analysis_reports_every_chunk(main_module, tmp_path):
+    write_modules(tmp_path, 4)
+    result, report = analyze_with_failures(main_module, tmp_path, set(), chunk_tokens=400)
+    assert report["source"] == "llm"
+    assert report["chunks"] > 1 and report["failed_chunks"] == 0
+    assert result.current_structure["analyzed_chunks"] == report["chunks"]
+
+
+def test_failed_chunks_mark_the_analysis_partial(main_module, tmp_path):
+    write_modules(tmp_path, 4)
+    result, report = analyze_with_failures(main_module, tmp_path, {2}, chunk_tokens=400)
+    assert report["source"] == "partial"
+    assert report["failed_chunks"] == 1
+    assert result.current_structure["analyzed_chunks"] == report["chunks"] - 1
+
+
+def test_all_chunks_failing_falls_back_to_static_and_says_so(main_module, tmp_path):
+    write_modules(tmp_path, 1)
+    _, report = analyze_with_failures(main_module, tmp_path, {1}, chunk_tokens=100000)
+    assert report == {"source": "static", "chunks": 1, "failed_chunks": 1}
+    assert main_module.analysis_report(report)["degraded"] is True
@@ -0,0 +1,206 @@
+import asyncio
+import time
+
+import pytest
+
+from llm_cache import LLMCache
+from llm_client import LLMClient
+from llm_providers import LLMProvider, LLMResponse
+from rate_limit import RateLimiter
+from resilience import CircuitBreaker, CircuitOpenError
+
+
+@pytest.fixture
+def clock(fake_clock):
+    return fake_clock("resilience")
+
+
+def opened(clock, open_seconds: float = 30) -> CircuitBreaker:
+    breaker = CircuitBreaker(failure_threshold=2, slow_call_seconds=10, open_seconds=open_seconds)
+    breaker.record_failure()
+    breaker.record_failure()
+    return breaker
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, slow_call_seconds=10, open_seconds=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success(0.1)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.times_opened == 1
+
+
+def test_slow_success_counts_as_failure(clock):
+    breaker = CircuitBreaker(failure_threshold=1, slow_call_seconds=10, open_seconds=30)
+    breaker.record_success(11)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_open_circuit_rejects_until_the_cool_down_ends(clock):
+    breaker = opened(clock)
+    clock.now += 29
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    assert breaker.rejected == 1
+    assert breaker.retry_after() == 1
+
+    clock.now += 1
+    assert breaker.before_call() is True
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_retry_after_counts_down_the_open_period(clock):
+    breaker = opened(clock, open_seconds=30)
+    assert breaker.retry_after() == 30
+    clock.now += 10.5
+    assert breaker.retry_after() == 20
+    assert CircuitBreaker(failure_threshold=1).retry_after() == 1
+
+
+def test_half_open_lets_one_probe_through(clock):
+    breaker = opened(clock)
+    clock.now += 30
+    assert breaker.before_call() is True
+    with pytest.raises(CircuitOpenError, match="probe in flight"):
+        breaker.before_call()
+
+
+def test_successful_probe_closes_the_circuit(clock):
+    breaker = opened(clock)
+    clock.now += 30
+    breaker.before_call()
+    breaker.record_success(0.1)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.before_call() is False
+
+
+def test_failed_probe_reopens_the_circuit(clock):
+    breaker = opened(clock)
+    clock.now += 30
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    # The new cool-down starts at the failed probe
+    assert breaker.retry_after() == 30
+
+
+def test_abandoned_probe_lets_another_through(clock):
+    breaker = opened(clock)
+    clock.now += 30
+    breaker.before_call()
+    breaker.abandon()
+    assert breaker.before_call() is True
+
+
+def test_recheck_rejects_calls_admitted_before_the_circuit_opened(clock):
+    breaker = CircuitBreaker(failure_threshold=1, slow_call_seconds=10, open_seconds=30)
+    probe = breaker.before_call()
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        breaker.recheck(probe)
+    # The probe itself is never rejected by the recheck
+    breaker.recheck(True)
+
+
+class CountingProvider(LLMProvider):
+    name = "counting"
+    model_name = "counting-model"
+
+    def __init__(self, latency: float = 0.0, error: Exception = None):
+        self.calls = 0
+        self.latency = latency
+        self.error = error
+
+    def generate(self, prompt: str, **kwargs) -> LLMResponse:
+        self.calls += 1
+        time.sleep(self.latency)
+        if self.error is not None:
+            raise self.error
+        return LLMResponse("ok", prompt_tokens=1, output_tokens=1)
+
+    def stream(self, prompt: str, **kwargs):
+        yield self.generate(prompt, **kwargs).text
+
+
+def test_open_circuit_rejects_before_spending_rate_limit_budget(tmp_path):
+    provider = CountingProvider()
+    limiter = RateLimiter(rpm=60, tpm=100000)
+    client = LLMClient(provider, cache=LLMCache(tmp_path, enabled=False), rate_limiter=limiter)
+    client.breaker.failure_threshold = 1
+    client.breaker.record_failure()
+    requests_before, tokens_before = limiter.requests.level, limiter.tokens.level
+
+    try:
+        with pytest.raises(CircuitOpenError):
+            asyncio.run(client._call_model("prompt", {}))
+    finally:
+        client.shutdown()
+    assert provider.calls == 0
+    assert limiter.requests.level >= requests_before
+    assert limiter.tokens.level >= tokens_before
+
+
+def test_circuit_opening_while_queued_releases_the_reservation(tmp_path):
+    provider = CountingProvider()
+    limiter = RateLimiter(rpm=600, tpm=100000, utilization=1.0)
+    client = LLMClient(provider, cache=LLMCache(tmp_path, enabled=False), rate_limiter=limiter)
+    client.breaker.failure_threshold = 1
+    # Empty the request bucket so the call queues for ~50 ms
+    limiter.requests.consume(limiter.requests.level - 0.55)
+
+    async def scenario():
+        call = asyncio.ensure_future(client._call_model("prompt", {}))
+        await asyncio.sleep(0.01)
+        client.breaker.record_failure()
+        await call
+
+    try:
+        with pytest.raises(CircuitOpenError):
+            asyncio.run(scenario())
+    finally:
+        client.shutdown()
+    assert provider.calls == 0
+    assert limiter.tokens.level == pytest.approx(limiter.tokens.capacity)
+
+
+def test_waiting_for_a_worker_thread_is_not_provider_latency(tmp_path):
+    provider = CountingProvider(latency=0.1)
+    client = LLMClient(
+        provider, max_workers=2, cache=LLMCache(tmp_path, enabled=False), rate_limiter=RateLimiter(rpm=0, tpm=0)
+    )
+    client.breaker.failure_threshold = 1
+    client.breaker.slow_call_seconds = 0.25
+
+    async def scenario():
+        # Distinct prompts, so single-flight does not merge them
+        return await asyncio.gather(*(client._call_model(f"prompt {index}", {}) for index in range(12)))
+
+    try:
+        assert asyncio.run(scenario()) == ["ok"] * 12
+    finally:
+        client.shutdown()
+    assert client.breaker.state == CircuitBreaker.CLOSED
+    assert provider.calls == 12
+
+
+def test_non_transient_errors_do_not_open_the_circuit(tmp_path):
+    provider = CountingProvider(error=ValueError("response blocked by safety filters"))
+    client = LLMClient(provider, cache=LLMCache(tmp_path, enabled=False), rate_limiter=RateLimiter(rpm=0, tpm=0))
+    client.breaker.failure_threshold = 1
+
+    try:
+        for _ in range(3):
+            with pytest.raises(ValueError):
+                asyncio.run(client._call_model("prompt", {}))
+    finally:
+        client.shutdown()
+    assert client.breaker.state == CircuitBreaker.CLOSED
+    assert provider.calls == 3
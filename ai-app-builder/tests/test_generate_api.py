@@ -0,0 +1,69 @@
+import asyncio
+import json
+
+from harness import make_client
+
+
+def request(main, method, path, **kwargs):
+    async def send():
+        async with make_client(main.app) as client:
+            return await client.request(method, path, **kwargs)
+    return asyncio.run(send())
+
+
+def sse_events(text):
+    """(event, data) pairs of a complete server-sent events body"""
+    events = []
+    for block in text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_stream_with_unknown_analysis_id_is_404(main_module):
+    response = request(main_module, "POST", "/generate/stream", json={"analysis_id": "missing"})
+    assert response.status_code == 404
+    assert response.headers["content-type"].startswith("application/json")
+
+
+def test_generate_job_with_unknown_analysis_id_is_404(main_module):
+    response = request(main_module, "POST", "/jobs/generate", json={"analysis_id": "missing"})
+    assert response.status_code == 404
+
+
+def test_stream_reuses_a_stored_analysis_and_queues_setup_before_done(main_module):
+    analysis = main_module.ProjectAnalysis(
+        framework="fastapi", database="sqlite", features=["crud"], endpoints=["notes"], auth_type="none"
+    )
+    analysis_id = main_module.analysis_store.save(analysis)
+
+    response = request(main_module, "POST", "/generate/stream", json={
+        "analysis_id": analysis_id, "project_name": "stream_stored_analysis"
+    })
+
+    assert response.status_code == 200
+    names = [event for event, _ in sse_events(response.text)]
+    assert names[:2] == ["started", "analysis"]
+    assert names[-2:] == ["environment_setup_queued", "done"]
+    assert dict(sse_events(response.text))["analysis"]["analysis"]["endpoints"] == ["notes"]
+
+
+def finished_job(main, status, **fields):
+    job = main.Job(id=f"test-{status.value}", kind="generate", factory=None, status=status, **fields)
+    main.job_manager.jobs[job.id] = job
+    return job
+
+
+def test_failed_job_result_reports_the_failure_without_a_server_error(main_module):
+    job = finished_job(main_module, main_module.JobStatus.FAILED, error="RuntimeError: boom")
+
+    response = request(main_module, "GET", f"/jobs/{job.id}/result")
+
+    assert response.status_code == 409
+    assert response.json()["detail"] == {"status": "failed", "error": "RuntimeError: boom"}
+
+
+def test_cancelled_job_result_is_gone(main_module):
+    job = finished_job(main_module, main_module.JobStatus.CANCELLED)
+
+    assert request(main_module, "GET", f"/jobs/{job.id}/result").status_code == 410
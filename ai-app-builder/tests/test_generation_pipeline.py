@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from generation_pipeline import GenerationPipeline, GenerationTask
+
+
+def make_task(name, depends_on=(), log=None, delay=0.0, fail=False):
+    async def run(context):
+        if log is not None:
+            log.append(("start", name, sorted(context)))
+        await asyncio.sleep(delay)
+        if fail:
+            raise RuntimeError(f"{name} failed")
+        if log is not None:
+            log.append(("end", name))
+        return f"{name}({','.join(context[dep] for dep in depends_on)})"
+    return GenerationTask(name, run, tuple(depends_on))
+
+
+def test_cycle_is_rejected_with_its_path():
+    tasks = [make_task("a", ["c"]), make_task("b", ["a"]), make_task("c", ["b"])]
+    with pytest.raises(ValueError, match="Dependency cycle: a -> c -> b -> a"):
+        GenerationPipeline(tasks)
+
+
+def test_self_dependency_is_a_cycle():
+    with pytest.raises(ValueError, match="Dependency cycle"):
+        GenerationPipeline([make_task("a", ["a"])])
+
+
+def test_unknown_dependency_is_rejected():
+    with pytest.raises(ValueError, match="unknown task"):
+        GenerationPipeline([make_task("crud", ["models", "schemas"]), make_task("models")])
+
+
+def test_order_puts_dependencies_first():
+    pipeline = GenerationPipeline([
+        make_task("main", ["crud", "database"]),
+        make_task("crud", ["models", "schemas"]),
+        make_task("models"),
+        make_task("schemas"),
+        make_task("database"),
+    ])
+    position = {name: index for index, name in enumerate(pipeline.order)}
+    for task in pipeline.tasks.values():
+        for dep in task.depends_on:
+            assert position[dep] < position[task.name]
+
+
+def test_run_passes_upstream_code_and_overlaps_independent_tasks():
+    log = []
+    pipeline = GenerationPipeline([
+        make_task("models", log=log, delay=0.01),
+        make_task("schemas", log=log, delay=0.01),
+        make_task("crud", ["models", "schemas"], log=log),
+    ])
+
+    results = asyncio.run(pipeline.run())
+
+    assert results["crud"] == "crud(models(),schemas())"
+    # Both roots start before either finishes; crud starts only after both
+    assert [entry[:2] for entry in log[:2]] == [("start", "models"), ("start", "schemas")]
+    assert log.index(("start", "crud", ["models", "schemas"])) > log.index(("end", "schemas"))
+
+
+def test_listener_sees_start_and_completion():
+    events = []
+    pipeline = GenerationPipeline(
+        [make_task("models"), make_task("crud", ["models"])],
+        listener=lambda event, name, data: events.append((event, name, data))
+    )
+    asyncio.run(pipeline.run())
+    assert events == [
+        ("file_started", "models", None),
+        ("file_completed", "models", "models()"),
+        ("file_started", "crud", None),
+        ("file_completed", "crud", "crud(models())"),
+    ]
+
+
+def test_failure_cancels_the_remaining_tasks():
+    log = []
+    pipeline = GenerationPipeline([
+        make_task("models", fail=True),
+        make_task("slow", log=log, delay=1.0),
+        make_task("crud", ["models"], log=log),
+    ])
+    with pytest.raises(RuntimeError, match="models failed"):
+        asyncio.run(pipeline.run())
+    assert ("end", "slow") not in log
+    assert not any(entry[1] == "crud" for entry in log)
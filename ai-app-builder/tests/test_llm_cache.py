@@ -0,0 +1,100 @@
+import asyncio
+
+from llm_cache import LLMCache
+from llm_client import LLMClient
+from llm_providers import LLMProvider, LLMResponse
+from rate_limit import RateLimiter
+
+
+def make_cache(tmp_path, **kwargs) -> LLMCache:
+    options = dict(ttl_seconds=60, memory_max_entries=8, memory_max_bytes=1024 * 1024, disk_max_bytes=1024 * 1024)
+    options.update(kwargs)
+    return LLMCache(directory=tmp_path, enabled=True, **options)
+
+
+def test_put_then_get_from_memory_and_disk(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put("a" * 64, "hello", latency=0.5)
+
+    assert cache.get_memory("a" * 64) == "hello"
+    # A fresh instance has an empty memory tier and reads the file
+    reopened = make_cache(tmp_path)
+    assert reopened.get_memory("a" * 64) is None
+    assert reopened.get("a" * 64) == "hello"
+    assert reopened.stats()["disk_hits"] == 1
+    assert reopened.get_memory("a" * 64) == "hello"
+
+
+def test_entries_expire_after_ttl(tmp_path, fake_clock):
+    clock = fake_clock("llm_cache", now=1000.0)
+    cache = make_cache(tmp_path, ttl_seconds=60)
+    cache.put("b" * 64, "value")
+
+    clock.now += 59
+    assert cache.get("b" * 64) == "value"
+
+    clock.now += 2
+    assert cache.get_memory("b" * 64) is None
+    assert cache.get("b" * 64) is None
+    assert not cache._path("b" * 64).exists()
+    assert cache.stats()["expired"] == 2
+
+
+def test_memory_tier_evicts_least_recently_used(tmp_path):
+    cache = make_cache(tmp_path, memory_max_entries=2)
+    cache.put("1" * 64, "one")
+    cache.put("2" * 64, "two")
+    cache.get_memory("1" * 64)
+    cache.put("3" * 64, "three")
+
+    assert cache.get_memory("2" * 64) is None
+    assert cache.get_memory("1" * 64) == "one"
+    assert cache.get_memory("3" * 64) == "three"
+    assert cache.stats()["memory_evictions"] == 1
+
+
+def test_disk_tier_stays_under_budget(tmp_path):
+    cache = make_cache(tmp_path, disk_max_bytes=2048)
+    for index in range(20):
+        # Incompressible enough that a few entries fill the budget
+        cache.put(f"{index:064d}", "".join(chr(33 + (index * 7919 + i * 104729) % 90) for i in range(600)))
+
+    stats = cache.stats()
+    assert stats["disk_evictions"] > 0
+    assert stats["disk_bytes"] <= 2048
+    assert stats["disk_bytes"] == sum(path.stat().st_size for path in tmp_path.glob("*/*.z"))
+
+
+class CountingProvider(LLMProvider):
+    name = "counting"
+    model_name = "counting-model"
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def generate(self, prompt: str, **kwargs) -> LLMResponse:
+        self.calls += 1
+        return LLMResponse(self.responses.pop(0), prompt_tokens=1, output_tokens=1)
+
+    def stream(self, prompt: str, **kwargs):
+        yield self.generate(prompt, **kwargs).text
+
+
+def test_rejected_responses_are_not_cached(tmp_path):
+    provider = CountingProvider(["not json", '{"ok": true}', "unused"])
+    client = LLMClient(provider, cache=make_cache(tmp_path), rate_limiter=RateLimiter(rpm=0, tpm=0))
+    is_json = lambda text: text.startswith("{")
+
+    async def scenario():
+        first = await client.generate("prompt", validate=is_json)
+        second = await client.generate("prompt", validate=is_json)
+        third = await client.generate("prompt", validate=is_json)
+        return first, second, third
+
+    try:
+        assert asyncio.run(scenario()) == ("not json", '{"ok": true}', '{"ok": true}')
+    finally:
+        client.shutdown()
+    assert provider.calls == 2
+    assert client.cache_stats()["rejected_responses"] == 1
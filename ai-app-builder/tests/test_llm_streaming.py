@@ -0,0 +1,63 @@
+import asyncio
+import threading
+import time
+
+from llm_cache import LLMCache
+from llm_client import LLMClient
+from llm_providers import LLMProvider, LLMResponse
+from rate_limit import RateLimiter
+from resilience import RetryPolicy
+
+
+class StallingStreamProvider(LLMProvider):
+    """The first attempt stalls before its first chunk; later attempts stream at once"""
+
+    name = "stalling"
+    model_name = "stalling-model"
+
+    def __init__(self, stall: float, chunks: int = 5):
+        self.stall = stall
+        self.chunks = chunks
+        self.attempts = 0
+        self.produced = []
+        self._lock = threading.Lock()
+
+    def generate(self, prompt: str, **kwargs) -> LLMResponse:
+        return LLMResponse("".join(self.stream(prompt, **kwargs)))
+
+    def stream(self, prompt: str, **kwargs):
+        with self._lock:
+            attempt = self.attempts = self.attempts + 1
+        if attempt == 1:
+            time.sleep(self.stall)
+        for index in range(self.chunks):
+            self.produced.append((attempt, index))
+            yield f"[attempt{attempt}:{index}]"
+            time.sleep(0.01)
+
+
+def test_abandoned_stream_attempt_stops_and_sends_no_chunks(tmp_path):
+    provider = StallingStreamProvider(stall=0.2)
+    client = LLMClient(
+        provider,
+        cache=LLMCache(tmp_path, enabled=False),
+        rate_limiter=RateLimiter(rpm=0, tpm=0),
+        retry_policy=RetryPolicy(max_attempts=2, base_delay=0.01, attempt_timeout=0.1, deadline=10)
+    )
+    received = []
+
+    async def scenario():
+        text = await client.generate("prompt", on_chunk=received.append)
+        # Give the abandoned first attempt time to wake up and try to stream
+        await asyncio.sleep(0.4)
+        return text
+
+    try:
+        text = asyncio.run(scenario())
+    finally:
+        client.shutdown()
+    expected = [f"[attempt2:{index}]" for index in range(5)]
+    assert received == expected
+    assert text == "".join(expected)
+    # The abandoned attempt stopped pulling from the provider after at most one chunk
+    assert len([entry for entry in provider.produced if entry[0] == 1]) <= 1
@@ -0,0 +1,94 @@
+import asyncio
+import os
+
+from project_snapshot import SnapshotCache
+
+
+def write(root, relative, text):
+    path = root / relative
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    return path
+
+
+def make_project(root):
+    write(root, "main.py", "app = None\n")
+    write(root, "models.py", "class Item:\n    pass\n")
+    write(root, "README.md", "# demo\n")
+
+
+def test_unchanged_tree_reuses_the_previous_snapshot(tmp_path):
+    make_project(tmp_path)
+    cache = SnapshotCache(max_projects=4)
+
+    first = cache.snapshot(str(tmp_path))
+    second = cache.snapshot(str(tmp_path))
+
+    assert (first.files_read, first.files_reused) == (3, 0)
+    assert (second.files_read, second.files_reused) == (0, 3)
+    assert second.content_hash == first.content_hash
+    # Unchanged projects share the file map instead of copying it
+    assert second.files is first.files
+    assert cache.stats()["unchanged"] == 1
+
+
+def test_modified_file_is_re_read(tmp_path):
+    make_project(tmp_path)
+    cache = SnapshotCache(max_projects=4)
+    first = cache.snapshot(str(tmp_path))
+
+    path = write(tmp_path, "models.py", "class Item:\n    name: str\n")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    second = cache.snapshot(str(tmp_path))
+
+    assert (second.files_read, second.files_reused) == (1, 2)
+    assert second.content_hash != first.content_hash
+    assert second.files["models.py"] == "class Item:\n    name: str\n"
+
+
+def test_added_and_deleted_files_change_the_snapshot(tmp_path):
+    make_project(tmp_path)
+    cache = SnapshotCache(max_projects=4)
+    first = cache.snapshot(str(tmp_path))
+
+    (tmp_path / "README.md").unlink()
+    write(tmp_path, "pkg/crud.py", "def get():\n    return 1\n")
+    second = cache.snapshot(str(tmp_path))
+
+    assert sorted(second.files) == ["main.py", "models.py", "pkg/crud.py"]
+    assert second.content_hash != first.content_hash
+    assert second.files_read == 1
+
+
+def test_invalidate_forces_a_full_re_read(tmp_path):
+    make_project(tmp_path)
+    cache = SnapshotCache(max_projects=4)
+    cache.snapshot(str(tmp_path))
+
+    cache.invalidate(str(tmp_path))
+    assert cache.snapshot(str(tmp_path)).files_read == 3
+
+
+def test_least_recently_used_projects_are_evicted(tmp_path):
+    cache = SnapshotCache(max_projects=2)
+    for name in ("a", "b", "c"):
+        make_project(tmp_path / name)
+        cache.snapshot(str(tmp_path / name))
+
+    assert cache.stats()["evictions"] == 1
+    assert cache.snapshot(str(tmp_path / "a")).files_read == 3
+    assert cache.snapshot(str(tmp_path / "c")).files_read == 0
+
+
+def test_applying_enhancements_invalidates_the_project(main_module, tmp_path):
+    make_project(tmp_path)
+    service = main_module.EnhancementService()
+    try:
+        asyncio.run(service.snapshot(str(tmp_path)))
+        asyncio.run(service._apply_enhancements(str(tmp_path), {"modifications": {"main.py": "app = 1\n"}}))
+        snapshot = asyncio.run(service.snapshot(str(tmp_path)))
+    finally:
+        service.shutdown()
+    assert snapshot.files_read == 3
+    assert snapshot.files["main.py"] == "app = 1\n"
@@ -0,0 +1,98 @@
+from project_walker import IgnoreRule, is_ignored, walk_project
+
+
+def ignored(patterns, path, is_dir=False, base=""):
+    rules = [IgnoreRule(pattern, base) for pattern in patterns]
+    return is_ignored(rules, path, path.rsplit("/", 1)[-1], is_dir)
+
+
+def test_unanchored_pattern_matches_the_name_at_any_depth():
+    assert ignored(["*.pyc"], "a.pyc")
+    assert ignored(["*.pyc"], "pkg/sub/a.pyc")
+    assert not ignored(["*.pyc"], "pkg/a.py")
+
+
+def test_star_and_question_mark_stop_at_slashes():
+    assert ignored(["docs/*.md"], "docs/a.md")
+    assert not ignored(["docs/*.md"], "docs/sub/a.md")
+    assert ignored(["file?.txt"], "file1.txt")
+    assert not ignored(["file?.txt"], "file10.txt")
+
+
+def test_leading_or_middle_slash_anchors_to_the_base():
+    assert ignored(["/build"], "build", is_dir=True)
+    assert not ignored(["/build"], "src/build", is_dir=True)
+    assert ignored(["src/gen"], "src/gen", is_dir=True)
+    assert not ignored(["src/gen"], "lib/src/gen", is_dir=True)
+
+
+def test_anchored_rule_from_a_nested_gitignore_is_relative_to_its_directory():
+    assert ignored(["/out"], "app/out", is_dir=True, base="app")
+    assert not ignored(["/out"], "out", is_dir=True, base="app")
+    assert not ignored(["/out"], "other/out", is_dir=True, base="app")
+
+
+def test_trailing_slash_matches_directories_only():
+    assert ignored(["logs/"], "logs", is_dir=True)
+    assert not ignored(["logs/"], "logs", is_dir=False)
+
+
+def test_double_star_crosses_directories():
+    assert ignored(["**/fixtures"], "fixtures", is_dir=True)
+    assert ignored(["**/fixtures"], "tests/unit/fixtures", is_dir=True)
+    assert ignored(["data/**"], "data/a/b.csv")
+    assert ignored(["a/**/b.txt"], "a/b.txt")
+    assert ignored(["a/**/b.txt"], "a/x/y/b.txt")
+
+
+def test_character_classes_and_their_negation():
+    assert ignored(["*.py[co]"], "a.pyc")
+    assert not ignored(["*.py[co]"], "a.py")
+    assert ignored(["v[!0-9]"], "vx")
+    assert not ignored(["v[!0-9]"], "v1")
+
+
+def test_negation_re_includes_and_the_last_match_wins():
+    patterns = ["*.log", "!keep.log"]
+    assert ignored(patterns, "debug.log")
+    assert not ignored(patterns, "keep.log")
+    assert ignored(patterns + ["keep.log"], "keep.log")
+
+
+def test_escaped_bang_is_a_literal():
+    rule = IgnoreRule("\\!important")
+    assert not rule.negate
+    assert rule.matches("!important", "!important", False)
+
+
+def write(root, relative, text="x"):
+    path = root / relative
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+
+def test_walk_prunes_ignored_directories_and_applies_nested_gitignores(tmp_path):
+    write(tmp_path, "main.py")
+    write(tmp_path, "venv/lib/site.py")
+    write(tmp_path, ".gitignore", "*.log\n!keep.log\n/secret.py\n")
+    write(tmp_path, "debug.log")
+    write(tmp_path, "keep.log")
+    write(tmp_path, "secret.py")
+    write(tmp_path, "app/secret.py")
+    write(tmp_path, "app/.gitignore", "generated/\n")
+    write(tmp_path, "app/generated/models.py")
+    write(tmp_path, "app/big.py", "x" * 2048)
+
+    paths = [path for path, _ in walk_project(tmp_path, max_file_bytes=1024)]
+
+    assert paths == [".gitignore", "keep.log", "main.py", "app/.gitignore", "app/secret.py"]
+
+
+def test_walk_can_skip_gitignore_and_override_defaults(tmp_path):
+    write(tmp_path, ".gitignore", "*.log\n")
+    write(tmp_path, "debug.log")
+    write(tmp_path, "node_modules/pkg/index.js")
+
+    paths = [path for path, _ in walk_project(tmp_path, ignore=[], use_gitignore=False)]
+
+    assert paths == [".gitignore", "debug.log", "node_modules/pkg/index.js"]
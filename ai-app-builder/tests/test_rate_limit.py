@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from rate_limit import RateLimiter, TokenBucket, estimate_tokens
+
+
+@pytest.fixture
+def clock(fake_clock):
+    return fake_clock("rate_limit", now=100.0, sleep=True)
+
+
+def test_estimate_tokens_is_about_four_characters_per_token():
+    assert estimate_tokens("") == 1
+    assert estimate_tokens("x" * 400) == 100
+
+
+def test_bucket_refills_at_its_rate_up_to_capacity(clock):
+    bucket = TokenBucket(capacity=10, refill_per_second=2)
+    bucket.consume(10)
+    assert bucket.wait_time(4) == pytest.approx(2.0)
+
+    clock.now += 1
+    assert bucket.wait_time(4) == pytest.approx(1.0)
+
+    clock.now += 60
+    bucket._refill()
+    assert bucket.level == 10
+
+
+def test_oversized_request_waits_for_a_full_bucket_then_goes_into_debt(clock):
+    bucket = TokenBucket(capacity=10, refill_per_second=1)
+    assert bucket.wait_time(50) == 0
+    bucket.consume(50)
+    assert bucket.level == -40
+    # Debt is repaid before the next request fits
+    assert bucket.wait_time(1) == pytest.approx(41.0)
+
+
+def test_buckets_hold_the_burst_and_refill_the_rest_over_a_minute():
+    limiter = RateLimiter(rpm=60, tpm=100000, utilization=0.5, burst_fraction=0.1)
+    assert limiter.requests.capacity == pytest.approx(3.0)
+    assert limiter.requests.refill_per_second == pytest.approx(0.45)
+    assert limiter.tokens.capacity == pytest.approx(5000)
+    # Burst plus a minute of refill never exceeds the utilization target
+    assert limiter.tokens.capacity + 60 * limiter.tokens.refill_per_second == pytest.approx(50000)
+
+
+def test_zero_limit_disables_that_dimension(clock):
+    limiter = RateLimiter(rpm=0, tpm=0)
+    assert limiter.requests is None and limiter.tokens is None
+    asyncio.run(limiter.acquire(10 ** 9))
+    limiter.release(10)
+    limiter.adjust(-10)
+    assert clock.sleeps == []
+
+
+def test_acquire_waits_once_the_burst_is_spent(clock):
+    limiter = RateLimiter(rpm=60, tpm=0, utilization=1.0, burst_fraction=0.1)
+
+    async def scenario():
+        for _ in range(8):
+            await limiter.acquire(1)
+
+    asyncio.run(scenario())
+    # 6 requests of burst, then one every 1/0.9 seconds
+    assert len(clock.sleeps) == 2
+    assert sum(clock.sleeps) == pytest.approx(2 / 0.9)
+    assert limiter.throttled == 2
+
+
+def test_adjust_and_release_give_budget_back(clock):
+    limiter = RateLimiter(rpm=60, tpm=6000, utilization=1.0, burst_fraction=0.1)
+    asyncio.run(limiter.acquire(500))
+    assert limiter.tokens.level == pytest.approx(100)
+
+    # The call used 200 tokens fewer than reserved
+    limiter.adjust(-200)
+    assert limiter.tokens.level == pytest.approx(300)
+
+    requests_before = limiter.requests.level
+    limiter.release(300)
+    assert limiter.tokens.level == pytest.approx(600)
+    assert limiter.requests.level == pytest.approx(min(6, requests_before + 1))
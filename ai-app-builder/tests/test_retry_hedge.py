@@ -0,0 +1,208 @@
+import asyncio
+import time
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+from llm_cache import LLMCache
+from llm_client import LLMClient
+from llm_providers import LLMProvider, LLMResponse
+from rate_limit import RateLimiter
+from resilience import Hedger, LatencyTracker, RetryPolicy, is_retryable
+
+
+@pytest.fixture
+def clock(fake_clock, monkeypatch):
+    clock = fake_clock("resilience", sleep=True)
+    # Take the top of the jitter range so delays are predictable
+    monkeypatch.setattr("resilience.random.uniform", lambda low, high: high)
+    return clock
+
+
+def failing(errors, result="ok"):
+    """Attempt function raising the given errors in turn, then returning result"""
+    errors = list(errors)
+    calls = []
+
+    async def attempt():
+        calls.append(len(calls))
+        if errors:
+            raise errors.pop(0)
+        return result
+
+    return attempt, calls
+
+
+def test_transient_errors_are_retryable_and_others_are_not():
+    assert is_retryable(google_exceptions.ResourceExhausted("quota"))
+    assert is_retryable(asyncio.TimeoutError())
+    assert is_retryable(ConnectionError())
+    assert not is_retryable(google_exceptions.InvalidArgument("bad"))
+    assert not is_retryable(ValueError())
+
+
+def test_backoff_doubles_and_is_capped(clock):
+    policy = RetryPolicy(base_delay=1, max_delay=5)
+    assert [policy.backoff(attempt) for attempt in range(1, 6)] == [1, 2, 4, 5, 5]
+
+
+def test_retries_transient_errors_until_success(clock):
+    policy = RetryPolicy(max_attempts=4, base_delay=1, max_delay=20, deadline=100)
+    attempt, calls = failing([ConnectionError(), google_exceptions.ServiceUnavailable("down")])
+
+    assert asyncio.run(policy.run(attempt)) == "ok"
+    assert len(calls) == 3
+    assert clock.sleeps == [1, 2]
+    assert policy.retries == 2
+
+
+def test_permanent_error_is_not_retried(clock):
+    policy = RetryPolicy(max_attempts=4, deadline=100)
+    attempt, calls = failing([ValueError("bad request")])
+
+    with pytest.raises(ValueError):
+        asyncio.run(policy.run(attempt))
+    assert len(calls) == 1
+
+
+def test_gives_up_after_max_attempts(clock):
+    policy = RetryPolicy(max_attempts=3, base_delay=1, deadline=100)
+    attempt, calls = failing([ConnectionError()] * 5)
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(policy.run(attempt))
+    assert len(calls) == 3
+
+
+def test_does_not_sleep_past_the_deadline(clock):
+    policy = RetryPolicy(max_attempts=10, base_delay=4, max_delay=20, deadline=10)
+    attempt, calls = failing([ConnectionError()] * 10)
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(policy.run(attempt))
+    # Sleeps of 4 then 8 would end at 12 s, past the 10 s deadline
+    assert clock.sleeps == [4]
+    assert len(calls) == 2
+
+
+def test_retry_if_overrides_the_default(clock):
+    policy = RetryPolicy(max_attempts=3, base_delay=1, deadline=100)
+    attempt, calls = failing([ConnectionError()])
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(policy.run(attempt, retry_if=lambda e: False))
+    assert len(calls) == 1
+
+
+def test_latency_percentile():
+    latency = LatencyTracker(window=100)
+    assert latency.percentile(0.95) is None
+    for value in range(1, 101):
+        latency.record(value / 100)
+    assert latency.percentile(0.95) == pytest.approx(0.96)
+    assert latency.percentile(1.0) == pytest.approx(1.0)
+
+
+def tracker(seconds: float, samples: int = 20) -> LatencyTracker:
+    latency = LatencyTracker()
+    for _ in range(samples):
+        latency.record(seconds)
+    return latency
+
+
+def test_hedger_waits_for_enough_samples():
+    assert Hedger(tracker(0.01, samples=5), enabled=True, min_samples=20).delay() is None
+    assert Hedger(tracker(0.01), enabled=False, min_samples=20).delay() is None
+    assert Hedger(tracker(0.01), enabled=True, min_samples=20).delay() == pytest.approx(0.01)
+
+
+def test_fast_primary_is_not_hedged():
+    hedger = Hedger(tracker(0.05), enabled=True, min_samples=20)
+    calls = []
+
+    async def call():
+        calls.append(1)
+        return "primary"
+
+    assert asyncio.run(hedger.run(call)) == "primary"
+    assert calls == [1]
+    assert hedger.hedged == 0
+
+
+def test_slow_primary_is_hedged_and_the_backup_wins():
+    hedger = Hedger(tracker(0.01), enabled=True, min_samples=20)
+    started = []
+
+    async def call():
+        index = len(started)
+        started.append(index)
+        await asyncio.sleep(1.0 if index == 0 else 0.0)
+        return f"call {index}"
+
+    assert asyncio.run(hedger.run(call)) == "call 1"
+    assert hedger.hedged == 1
+    assert hedger.hedge_wins == 1
+
+
+def test_hedge_falls_back_to_the_other_call_when_one_fails():
+    hedger = Hedger(tracker(0.01), enabled=True, min_samples=20)
+    started = []
+
+    async def call():
+        index = len(started)
+        started.append(index)
+        if index == 0:
+            await asyncio.sleep(0.05)
+            return "primary"
+        raise ConnectionError("backup failed")
+
+    assert asyncio.run(hedger.run(call)) == "primary"
+    assert hedger.hedge_wins == 0
+
+
+def test_hedge_raises_when_both_calls_fail():
+    hedger = Hedger(tracker(0.01), enabled=True, min_samples=20)
+
+    async def call():
+        await asyncio.sleep(0.02)
+        raise ConnectionError("down")
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(hedger.run(call))
+
+
+class SlowProvider(LLMProvider):
+    name = "slow"
+    model_name = "slow-model"
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def generate(self, prompt: str, **kwargs) -> LLMResponse:
+        time.sleep(self.latency)
+        return LLMResponse("ok", prompt_tokens=1, output_tokens=1)
+
+    def stream(self, prompt: str, **kwargs):
+        yield self.generate(prompt, **kwargs).text
+
+
+def test_queueing_for_a_worker_neither_times_out_nor_inflates_latency(tmp_path):
+    client = LLMClient(
+        SlowProvider(0.05),
+        max_workers=2,
+        cache=LLMCache(tmp_path, enabled=False),
+        rate_limiter=RateLimiter(rpm=0, tpm=0),
+        retry_policy=RetryPolicy(max_attempts=1, attempt_timeout=0.2, deadline=30)
+    )
+
+    async def scenario():
+        # 12 calls on 2 workers queue for ~0.3 s, longer than the attempt timeout
+        return await asyncio.gather(*(client.generate(f"prompt {index}") for index in range(12)))
+
+    try:
+        assert asyncio.run(scenario()) == ["ok"] * 12
+    finally:
+        client.shutdown()
+    assert client.retry_policy.retries == 0
+    assert len(client.latency.samples) == 12
+    assert client.latency.percentile(0.95) < 0.15
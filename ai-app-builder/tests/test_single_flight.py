@@ -0,0 +1,92 @@
+import asyncio
+import threading
+
+from llm_cache import LLMCache
+from llm_client import LLMClient
+from llm_providers import LLMProvider, LLMResponse
+from rate_limit import RateLimiter
+
+
+class GatedProvider(LLMProvider):
+    """Answers once released, numbering its calls"""
+
+    name = "gated"
+    model_name = "gated-model"
+
+    def __init__(self):
+        self.calls = 0
+        self.release = threading.Event()
+
+    def generate(self, prompt: str, **kwargs) -> LLMResponse:
+        self.calls += 1
+        call = self.calls
+        self.release.wait(5)
+        return LLMResponse(f"answer {call}", prompt_tokens=1, output_tokens=1)
+
+    def stream(self, prompt: str, **kwargs):
+        yield self.generate(prompt, **kwargs).text
+
+
+def make_client(tmp_path, provider):
+    return LLMClient(provider, cache=LLMCache(tmp_path, enabled=False), rate_limiter=RateLimiter(rpm=0, tpm=0))
+
+
+def test_identical_concurrent_calls_share_one_provider_call(tmp_path):
+    provider = GatedProvider()
+    client = make_client(tmp_path, provider)
+
+    async def scenario():
+        calls = [asyncio.ensure_future(client.generate("prompt")) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        provider.release.set()
+        return await asyncio.gather(*calls)
+
+    try:
+        assert asyncio.run(scenario()) == ["answer 1"] * 3
+    finally:
+        client.shutdown()
+    assert provider.calls == 1
+    assert client.coalesced == 2
+    assert client.cache_stats()["inflight"] == 0
+
+
+def test_cancelling_one_waiter_keeps_the_call_for_the_others(tmp_path):
+    provider = GatedProvider()
+    client = make_client(tmp_path, provider)
+
+    async def scenario():
+        first = asyncio.ensure_future(client.generate("prompt"))
+        second = asyncio.ensure_future(client.generate("prompt"))
+        await asyncio.sleep(0.05)
+        first.cancel()
+        await asyncio.sleep(0.01)
+        provider.release.set()
+        return await second, first.cancelled()
+
+    try:
+        assert asyncio.run(scenario()) == ("answer 1", True)
+    finally:
+        client.shutdown()
+    assert provider.calls == 1
+
+
+def test_last_waiter_cancelled_cancels_the_call_and_a_new_caller_starts_fresh(tmp_path):
+    provider = GatedProvider()
+    client = make_client(tmp_path, provider)
+
+    async def scenario():
+        first = asyncio.ensure_future(client.generate("prompt"))
+        await asyncio.sleep(0.05)
+        first.cancel()
+        # Let the cancelled waiter run its cleanup, but not the shared task's callbacks
+        await asyncio.sleep(0)
+        assert client.cache_stats()["inflight"] == 0
+        provider.release.set()
+        return await client.generate("prompt")
+
+    try:
+        assert asyncio.run(scenario()) == "answer 2"
+    finally:
+        client.shutdown()
+    assert provider.calls == 2
+    assert client.cache_stats()["inflight"] == 0
@@ -0,0 +1,108 @@
+import pytest
+
+from token_budget import TokenBudgetExceeded, UsageLedger, usage_scope
+
+
+@pytest.fixture
+def clock(fake_clock):
+    return fake_clock("token_budget", now=1_000_000.0)
+
+
+def test_oversized_prompt_is_rejected():
+    ledger = UsageLedger(max_prompt_tokens=100, project_budget=0)
+    ledger.check_prompt(100)
+    with pytest.raises(TokenBudgetExceeded) as error:
+        ledger.check_prompt(101)
+    assert error.value.scope == "request"
+    assert ledger.stats()["total"]["rejected"] == 1
+
+
+def test_usage_is_billed_to_the_scope():
+    ledger = UsageLedger(project_budget=0)
+    with usage_scope("/tmp/app", "/generate"):
+        ledger.record(10, 5)
+        ledger.record_cached()
+    ledger.record(1, 1)
+
+    stats = ledger.stats()
+    assert stats["total"]["calls"] == 2
+    assert stats["projects"]["/tmp/app"]["prompt_tokens"] == 10
+    assert stats["projects"]["/tmp/app"]["cached_calls"] == 1
+    assert stats["endpoints"]["/generate"]["output_tokens"] == 5
+
+
+def test_project_over_budget_is_rejected(clock):
+    ledger = UsageLedger(project_budget=100, window_seconds=60)
+    with usage_scope("app"):
+        ledger.record(60, 30)
+        ledger.check_project(10)
+        with pytest.raises(TokenBudgetExceeded) as error:
+            ledger.check_project(11)
+    assert error.value.scope == "project"
+    assert error.value.tokens == 101
+    assert ledger.stats("app")["remaining"] == 10
+
+    # Calls outside a project are never checked against a project budget
+    ledger.check_project(10 ** 6)
+
+
+def test_budget_resets_when_the_window_ends(clock):
+    ledger = UsageLedger(project_budget=100, window_seconds=60)
+    with usage_scope("app"):
+        ledger.record(100, 0)
+        clock.now += 59
+        with pytest.raises(TokenBudgetExceeded):
+            ledger.check_project(1)
+
+        clock.now += 1
+        ledger.check_project(100)
+        assert ledger.stats("app")["remaining"] == 100
+        ledger.record(40, 0)
+    stats = ledger.stats("app")
+    assert stats["prompt_tokens"] == 40
+    assert stats["window_resets_at"] == int(clock.now + 60)
+
+
+def test_zero_window_never_resets(clock):
+    ledger = UsageLedger(project_budget=100, window_seconds=0)
+    with usage_scope("app"):
+        ledger.record(100, 0)
+        clock.now += 10 ** 7
+        with pytest.raises(TokenBudgetExceeded):
+            ledger.check_project(1)
+
+
+def test_explicit_reset(clock):
+    ledger = UsageLedger(project_budget=100, window_seconds=60)
+    for project in ("a", "b"):
+        with usage_scope(project, "/enhance-app"):
+            ledger.record(100, 0)
+
+    ledger.reset("a")
+    assert ledger.stats("a")["remaining"] == 100
+    assert ledger.stats("b")["remaining"] == 0
+
+    ledger.reset()
+    stats = ledger.stats()
+    assert stats["projects"] == {} and stats["endpoints"] == {}
+    assert stats["total"]["calls"] == 0
+
+
+def test_least_recently_used_projects_are_evicted(clock):
+    ledger = UsageLedger(project_budget=100, window_seconds=60, max_tracked=2)
+    for project in ("a", "b", "a", "c"):
+        with usage_scope(project):
+            ledger.record(1, 0)
+
+    stats = ledger.stats()
+    assert sorted(stats["projects"]) == ["a", "c"]
+    assert stats["evictions"] == 1
+    assert stats["projects"]["a"]["calls"] == 2
+
+
+def test_stats_do_not_create_entries(clock):
+    ledger = UsageLedger(project_budget=100)
+    assert ledger.stats("unknown")["remaining"] == 100
+    with usage_scope("unknown"):
+        ledger.check_project(1)
+    assert ledger.stats()["projects"] == {}